@@ -1,14 +1,13 @@
 # Gnu General Public License - see LICENSE.TXT
 
-import xbmcaddon
-
 from resources.lib.simple_logging import SimpleLogging
 from resources.lib.functions import mainEntryPoint
 from resources.lib.tracking import set_timing_enabled
+from resources.lib.settings_snapshot import get_settings
 
 log = SimpleLogging('default')
 
-settings = xbmcaddon.Addon()
+settings = get_settings()
 log_timing_data = settings.getSetting('log_timing') == "true"
 if log_timing_data:
     set_timing_enabled(True)
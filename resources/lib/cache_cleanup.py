@@ -0,0 +1,121 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import threading
+import time
+
+import xbmc
+
+from .simple_logging import SimpleLogging
+from .cache_store import get_cache_store
+from .tracking import log_timing
+
+log = SimpleLogging(__name__)
+
+cleanup_thread = None
+
+
+class CacheCleanupThread(threading.Thread):
+    """
+        Removes the old and least recently used lists and responses from the cache store
+        it only reads the metadata columns, deletes in small batches with a pause between them
+        and waits while anything is playing
+    """
+    batch_size = 50
+    batch_pause = 0.2
+    exit_now = False
+
+    def __init__(self, start_delay=0):
+        threading.Thread.__init__(self)
+        self.start_delay = start_delay
+        self.monitor = xbmc.Monitor()
+        self.work_time = 0.0
+
+    def stop(self):
+        self.exit_now = True
+
+    def wait(self, seconds):
+        # returns False when the thread has to stop
+        if self.exit_now or self.monitor.waitForAbort(seconds):
+            return False
+        return not self.exit_now
+
+    def wait_for_idle(self):
+        if not self.wait(self.batch_pause):
+            return False
+        while xbmc.Player().isPlaying():
+            if not self.wait(5):
+                return False
+        return True
+
+    def run_batch(self, func, *args):
+        started = time.time()
+        result = func(*args)
+        self.work_time += time.time() - started
+        return result
+
+    def delete_entries(self, cache_store, entries):
+        deleted = 0
+        reclaimed = 0
+        for index in range(0, len(entries), self.batch_size):
+            if not self.wait_for_idle():
+                break
+            batch = entries[index:index + self.batch_size]
+            reclaimed += self.run_batch(cache_store.delete_entries, batch)
+            deleted += len(batch)
+        return deleted, reclaimed
+
+    def run(self):
+        log.debug("CacheCleanupThread : Started")
+        if self.start_delay and not self.wait(self.start_delay):
+            return
+        try:
+            self.clean_up()
+        except Exception as error:
+            log.error("CacheCleanupThread : cleanup failed : {0}", error)
+        log.debug("CacheCleanupThread : Exited")
+
+    def clean_up(self):
+        started = time.time()
+        cache_store = get_cache_store()
+
+        old_entries = self.run_batch(cache_store.get_old_entries, cache_store.max_age)
+        old_deleted, old_reclaimed = self.delete_entries(cache_store, old_entries)
+
+        evict_entries = []
+        if not self.exit_now:
+            evict_entries = self.run_batch(cache_store.get_evict_entries, cache_store.max_size)
+        evict_deleted, evict_reclaimed = self.delete_entries(cache_store, evict_entries)
+
+        items_deleted = 0
+        items_reclaimed = 0
+        while self.wait_for_idle():
+            count, reclaimed = self.run_batch(cache_store.remove_unused_items_batch, self.batch_size)
+            items_deleted += count
+            items_reclaimed += reclaimed
+            if count < self.batch_size:
+                break
+
+        ended = time.time()
+        reclaimed = old_reclaimed + evict_reclaimed + items_reclaimed
+        log.info("CacheCleanupThread : removed {0} old and {1} evicted lists and responses and {2} unused items, "
+                 "reclaimed {3} bytes in {4:.3f} sec ({5:.3f} sec working){6}",
+                 old_deleted, evict_deleted, items_deleted, reclaimed, ended - started, self.work_time,
+                 " stopped early" if self.exit_now else "")
+        log_timing("cache_cleanup", started, ended, "reclaimed=%s" % reclaimed)
+
+
+def start_cache_cleanup(start_delay=0):
+    """
+        start a cleanup unless one is still running
+    """
+    global cleanup_thread
+    if cleanup_thread is not None and cleanup_thread.is_alive():
+        log.debug("start_cache_cleanup : cleanup already running")
+        return
+    cleanup_thread = CacheCleanupThread(start_delay)
+    cleanup_thread.start()
+
+
+def stop_cache_cleanup():
+    if cleanup_thread is not None:
+        cleanup_thread.stop()
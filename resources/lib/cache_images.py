@@ -11,7 +11,6 @@ import time
 import xbmcgui
 import xbmcplugin
 import xbmc
-import xbmcaddon
 
 from .downloadutils import DownloadUtils
 from .simple_logging import SimpleLogging
@@ -20,6 +19,7 @@ from .translation import string_load
 from .datamanager import DataManager
 from .utils import getArt, double_urlencode
 from .kodi_utils import HomeWindow
+from .settings_snapshot import get_settings
 
 downloadUtils = DownloadUtils()
 log = SimpleLogging(__name__)
@@ -41,7 +41,7 @@ class CacheArtwork(threading.Thread):
         log.debug("CacheArtwork background thread started")
         last_update = 0
         home_window = HomeWindow()
-        settings = xbmcaddon.Addon()
+        settings = get_settings()
         latest_content_hash = "never"
         check_interval = int(settings.getSetting('cacheImagesOnScreenSaver_interval'))
         check_interval = check_interval * 60
@@ -0,0 +1,45 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import re
+
+
+class CachePolicy():
+    """
+        How a cached response is used
+        ttl is how many seconds it is used as it is without asking the server,
+        after that revalidate "background" shows it and checks it with the server in a CacheManagerThread
+        and revalidate "before" checks it with the server before it is shown,
+        past max_stale seconds it is not used at all, None leaves it to the store to drop it
+    """
+
+    def __init__(self, ttl, revalidate, max_stale=None):
+        self.ttl = ttl
+        self.revalidate = revalidate
+        self.max_stale = max_stale
+
+    def __repr__(self):
+        return "CachePolicy(ttl=%s, revalidate=%s, max_stale=%s)" % (self.ttl, self.revalidate, self.max_stale)
+
+
+# the first pattern that matches the canonical url is used, see url_keys.canonical_url()
+cache_policies = [
+    # what is being watched changes all the time, showing an old copy first would only flicker
+    ("Filters=[^&]*IsResumable|/Shows/NextUp|SortBy=[^&]*DatePlayed", CachePolicy(0, "before", 3600 * 24)),
+    ("/Items/Latest", CachePolicy(60, "background")),
+    # lists of names and the library views only change when the library does
+    ("/emby/(Genres|MusicGenres|Studios|Years|Tags|Items/Prefixes)(\\?|$)|/Users/[^/?]+/(Views|Items/Root)(\\?|$)",
+     CachePolicy(3600 * 6, "background")),
+    # a single item is mostly asked for to show its watched and favorite state
+    ("/Users/[^/?]+/Items/[^/?]+(\\?|$)", CachePolicy(20, "before")),
+]
+
+default_policy = CachePolicy(20, "background")
+
+compiled_policies = [(re.compile(pattern), policy) for pattern, policy in cache_policies]
+
+
+def get_cache_policy(url_key):
+    for pattern, policy in compiled_policies:
+        if pattern.search(url_key):
+            return policy
+    return default_policy
@@ -0,0 +1,652 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+import hashlib
+import cPickle
+from cStringIO import StringIO
+
+import xbmc
+
+from .simple_logging import SimpleLogging
+from .settings_snapshot import get_settings
+from .tracking import count_event
+from .list_cache_server import get_memory_list, put_memory_list, delete_memory_list, delete_memory_lists
+from .columnar_cache import pack_item_record, unpack_item_record, get_shared_strings
+
+log = SimpleLogging(__name__)
+
+store = None
+
+
+def get_item_key(user_id, server, record_variant, item_id):
+    m = hashlib.md5()
+    m.update("%s|%s|%s|%s" % (user_id, server, record_variant, item_id))
+    return m.hexdigest()
+
+
+def find_cache_item_class(module_name, name):
+    """
+        the one class a list from the service may hold, any other global could run code as it is loaded
+    """
+    module = sys.modules.get(module_name)
+    if name == "CacheItem" and module_name.endswith("datamanager") and module is not None:
+        return module.CacheItem
+    raise cPickle.UnpicklingError("%s.%s is not allowed in a list from the service" % (module_name, name))
+
+
+def load_memory_list(data):
+    unpickler = cPickle.Unpickler(StringIO(data))
+    unpickler.find_global = find_cache_item_class
+    return unpickler.load()
+
+
+class ListCacheStore():
+    """
+        The cached item lists of all users in one SQLite file in the profile dir,
+        the metadata columns can be scanned and cleaned up without reading the pickled list data
+        lists are also handed to the service so warm loads come from its memory instead of the disk
+        every list carries a version stamp, the time its data was read from the server,
+        a save only replaces a row with an older stamp so a slow background save never undoes a newer one
+        a list row only holds the ordered item keys, each item is stored once in item_cache
+        and shared by every list it is in, so changing an item changes it in all of them
+        the strings that repeat from item to item are kept once in shared_strings and the item records refer to them
+        the raw json of cached GetContent() responses is kept in content_cache with its validators
+    """
+    max_size = 100 * 1024 * 1024
+    max_age = 3600 * 24 * 7
+    # sqlite allows 999 parameters in one statement
+    keys_per_query = 500
+
+    def __init__(self):
+        profile_dir = xbmc.translatePath(get_settings().getAddonInfo('profile'))
+        self.db_path = os.path.join(profile_dir, "list_cache.db")
+        self.profile_dir = profile_dir
+        self.local = threading.local()
+        # lists loaded from the disk that the service does not hold yet
+        self.memory_missing = set()
+        # shared_strings by id and the ids by (type, string) so str and unicode stay apart
+        self.strings = {}
+        self.string_ids = {}
+
+        new_store = not os.path.exists(self.db_path)
+        db = self.get_db()
+        with db:
+            db.execute("CREATE TABLE IF NOT EXISTS list_cache ("
+                       "url_hash TEXT PRIMARY KEY, "
+                       "user_id TEXT, "
+                       "server TEXT, "
+                       "items_url TEXT, "
+                       "date_saved REAL, "
+                       "date_last_used REAL, "
+                       "item_list_hash TEXT, "
+                       "version REAL, "
+                       "date_checked REAL, "
+                       "data_size INTEGER, "
+                       "data BLOB)")
+            columns = [row[1] for row in db.execute("PRAGMA table_info(list_cache)")]
+            for column in ("version", "date_checked"):
+                if column not in columns:
+                    db.execute("ALTER TABLE list_cache ADD COLUMN %s REAL" % column)
+            db.execute("CREATE INDEX IF NOT EXISTS list_cache_last_used ON list_cache (date_last_used)")
+            db.execute("CREATE INDEX IF NOT EXISTS list_cache_user ON list_cache (user_id)")
+
+            db.execute("CREATE TABLE IF NOT EXISTS list_items ("
+                       "url_hash TEXT, "
+                       "position INTEGER, "
+                       "item_key TEXT, "
+                       "PRIMARY KEY (url_hash, position))")
+            db.execute("CREATE INDEX IF NOT EXISTS list_items_item ON list_items (item_key)")
+
+            db.execute("CREATE TABLE IF NOT EXISTS item_cache ("
+                       "item_key TEXT PRIMARY KEY, "
+                       "user_id TEXT, "
+                       "server TEXT, "
+                       "item_id TEXT, "
+                       "etag TEXT, "
+                       "item_hash BLOB, "
+                       "version REAL, "
+                       "data_size INTEGER, "
+                       "data BLOB)")
+            db.execute("CREATE INDEX IF NOT EXISTS item_cache_item ON item_cache (user_id, item_id)")
+
+            # the pickled string is the value so a str and a unicode with the same text are two rows
+            db.execute("CREATE TABLE IF NOT EXISTS shared_strings ("
+                       "string_id INTEGER PRIMARY KEY, "
+                       "value BLOB UNIQUE)")
+
+            db.execute("CREATE TABLE IF NOT EXISTS content_cache ("
+                       "url_hash TEXT PRIMARY KEY, "
+                       "user_id TEXT, "
+                       "server TEXT, "
+                       "content_url TEXT, "
+                       "date_saved REAL, "
+                       "date_last_used REAL, "
+                       "version REAL, "
+                       "date_checked REAL, "
+                       "validators TEXT, "
+                       "data_size INTEGER, "
+                       "data BLOB)")
+            db.execute("CREATE INDEX IF NOT EXISTS content_cache_user ON content_cache (user_id)")
+
+            if db.execute("PRAGMA user_version").fetchone()[0] < 1:
+                # the list sizes used to count the shared items of each list as well
+                db.execute("UPDATE list_cache SET data_size = length(data)")
+                db.execute("PRAGMA user_version = 1")
+
+        if new_store:
+            self.remove_pickle_files()
+
+    def get_db(self):
+        # sqlite connections can not be shared between threads
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=10)
+            db.text_factory = str
+            try:
+                db.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.Error as error:
+                log.debug("ListCacheStore : WAL not available : {0}", error)
+            self.local.db = db
+        return db
+
+    def remove_pickle_files(self):
+        # the one file per list cache used before the store existed
+        del_count = 0
+        for filename in os.listdir(self.profile_dir):
+            if filename.startswith("cache_") and filename.endswith(".pickle"):
+                try:
+                    os.remove(os.path.join(self.profile_dir, filename))
+                    del_count += 1
+                except OSError:
+                    pass
+        log.debug("ListCacheStore : removed {0} old pickle cache files", del_count)
+
+    def load(self, url_hash):
+        db = self.get_db()
+        cache_item = None
+        data = get_memory_list(url_hash)
+        if data is not None:
+            try:
+                cache_item = load_memory_list(data)
+            except Exception as error:
+                log.error("ListCacheStore : bad list {0} from the service : {1}", url_hash, error)
+                cache_item = None
+        if cache_item is not None:
+            # a check that found no change only touches the row, the copy in memory is not put again
+            row = db.execute("SELECT date_checked FROM list_cache WHERE url_hash = ?", (url_hash,)).fetchone()
+            if row is not None and row[0] > cache_item.date_checked:
+                cache_item.date_checked = row[0]
+            return cache_item
+
+        row = db.execute("SELECT data, date_checked FROM list_cache WHERE url_hash = ?", (url_hash,)).fetchone()
+        if row is None:
+            return None
+        cache_item = cPickle.loads(str(row[0]))
+        if row[1] > cache_item.date_checked:
+            cache_item.date_checked = row[1]
+
+        # lists saved before the items were shared still have their own item list
+        if cache_item.item_list is None:
+            item_list = []
+            item_hashes = []
+            for data, item_hash in db.execute("SELECT item_cache.data, item_cache.item_hash "
+                                              "FROM list_items LEFT JOIN item_cache "
+                                              "ON item_cache.item_key = list_items.item_key "
+                                              "WHERE list_items.url_hash = ? ORDER BY list_items.position",
+                                              (url_hash,)):
+                if data is None:
+                    log.debug("ListCacheStore : list {0} is missing an item", url_hash)
+                    return None
+                item = self.load_item_record(data)
+                item.baseline_itemname = cache_item.baseline_itemname
+                item_list.append(item)
+                item_hashes.append(str(item_hash))
+            cache_item.item_list = item_list
+            # another list or a user data change might have changed some items since this list was saved
+            cache_item.item_hashes = item_hashes
+
+        # packing the list for the service is left to the cache thread, see put_memory()
+        self.memory_missing.add(url_hash)
+        return cache_item
+
+    def put_memory(self, cache_item):
+        """
+            hand a list that was loaded from the disk to the service
+        """
+        if cache_item.url_hash in self.memory_missing:
+            self.memory_missing.discard(cache_item.url_hash)
+            put_memory_list(cache_item.url_hash, cPickle.dumps(cache_item, protocol=cPickle.HIGHEST_PROTOCOL),
+                            cache_item.version)
+
+    def load_shared_strings(self, db):
+        max_id = max(self.strings) if self.strings else 0
+        for string_id, value in db.execute("SELECT string_id, value FROM shared_strings WHERE string_id > ?",
+                                           (max_id,)):
+            string = cPickle.loads(str(value))
+            self.strings[string_id] = string
+            self.string_ids[(string.__class__, string)] = string_id
+
+    def add_shared_strings(self, db, strings):
+        for string in strings:
+            if (string.__class__, string) in self.string_ids:
+                continue
+            value = sqlite3.Binary(cPickle.dumps(string, protocol=cPickle.HIGHEST_PROTOCOL))
+            db.execute("INSERT OR IGNORE INTO shared_strings (value) VALUES (?)", (value,))
+            string_id = db.execute("SELECT string_id FROM shared_strings WHERE value = ?", (value,)).fetchone()[0]
+            self.strings[string_id] = string
+            self.string_ids[(string.__class__, string)] = string_id
+
+    def forget_shared_strings(self):
+        # after a write that did not commit, the ids of the strings it added would point at nothing
+        self.strings.clear()
+        self.string_ids.clear()
+
+    def get_string_id(self, value):
+        # called by the pickler for every value, only the shared strings are written as their id
+        value_class = value.__class__
+        if value_class is str or value_class is unicode:
+            return self.string_ids.get((value_class, value))
+        return None
+
+    def dump_item_record(self, db, item):
+        record = pack_item_record(item)
+        self.add_shared_strings(db, get_shared_strings(record))
+        data = StringIO()
+        pickler = cPickle.Pickler(data, cPickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = self.get_string_id
+        pickler.dump(record)
+        return data.getvalue()
+
+    def load_item_record(self, data):
+        data = str(data)
+        try:
+            unpickler = cPickle.Unpickler(StringIO(data))
+            unpickler.persistent_load = self.strings.__getitem__
+            record = unpickler.load()
+        except KeyError:
+            # a string another process added since they were read
+            self.load_shared_strings(self.get_db())
+            unpickler = cPickle.Unpickler(StringIO(data))
+            unpickler.persistent_load = self.strings.__getitem__
+            record = unpickler.load()
+        return unpack_item_record(record)
+
+    def get_stored_items(self, db, item_keys):
+        stored = {}
+        for index in range(0, len(item_keys), self.keys_per_query):
+            key_chunk = item_keys[index:index + self.keys_per_query]
+            query = ("SELECT item_key, item_hash, version, data_size FROM item_cache WHERE item_key IN (%s)" %
+                     ",".join("?" * len(key_chunk)))
+            for item_key, item_hash, version, data_size in db.execute(query, key_chunk):
+                stored[item_key] = (str(item_hash), version, data_size)
+        return stored
+
+    def write_items(self, db, user_id, items, version, stored):
+        """
+            write the (item key, server, item, item hash) records that are new, or changed and not newer in the store
+            returns the keys of the items that were already stored and changed
+        """
+        rows = []
+        changed_keys = []
+        for item_key, server, item, item_hash in items:
+            stored_item = stored.get(item_key)
+            if stored_item is not None:
+                stored_hash, stored_version, stored_size = stored_item
+                if stored_hash == item_hash:
+                    continue
+                if stored_version is not None and version is not None and stored_version > version:
+                    continue
+                changed_keys.append(item_key)
+            data = self.dump_item_record(db, item)
+            stored[item_key] = (item_hash, version, len(data))
+            rows.append((item_key, user_id, server, item.id, item.etag,
+                         sqlite3.Binary(item_hash), version, len(data), sqlite3.Binary(data)))
+        db.executemany("INSERT OR REPLACE INTO item_cache "
+                       "(item_key, user_id, server, item_id, etag, item_hash, version, data_size, data) "
+                       "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        log.debug("ListCacheStore : wrote {0} of {1} items", len(rows), len(items))
+        return changed_keys
+
+    def get_lists_with_items(self, db, item_keys):
+        """
+            the url hashes of the lists that hold any of the items
+        """
+        url_hashes = set()
+        for index in range(0, len(item_keys), self.keys_per_query):
+            key_chunk = item_keys[index:index + self.keys_per_query]
+            query = ("SELECT DISTINCT url_hash FROM list_items WHERE item_key IN (%s)" %
+                     ",".join("?" * len(key_chunk)))
+            for row in db.execute(query, key_chunk):
+                url_hashes.add(row[0])
+        return url_hashes
+
+    def delete_user_lists(self, user_id, url_pattern):
+        """
+            delete the lists of the user with a url that url_pattern matches, returns the number deleted
+        """
+        url_hashes = [url_hash for url_hash, items_url in
+                      self.get_db().execute("SELECT url_hash, items_url FROM list_cache WHERE user_id = ?", (user_id,))
+                      if items_url and url_pattern.search(items_url)]
+        for url_hash in url_hashes:
+            self.delete(url_hash)
+        return len(url_hashes)
+
+    def save(self, cache_item):
+        """
+            write the list if the stored copy is not newer, returns False if the save was dropped as stale
+        """
+        item_list = cache_item.item_list
+        item_keys = [get_item_key(cache_item.user_id, cache_item.server, cache_item.record_variant, item_id)
+                     for item_id in cache_item.item_ids]
+
+        # the list row only keeps the item order, the items go in item_cache
+        cache_item.item_list = None
+        try:
+            list_data = cPickle.dumps(cache_item, protocol=cPickle.HIGHEST_PROTOCOL)
+        finally:
+            cache_item.item_list = item_list
+
+        changed_lists = set()
+        db = self.get_db()
+        # everything is one transaction so readers see the old list or the new one, never a mix
+        try:
+            with db:
+                db.execute("BEGIN IMMEDIATE")
+                values = (cache_item.user_id,
+                          cache_item.server,
+                          cache_item.items_url,
+                          cache_item.date_saved,
+                          cache_item.date_last_used,
+                          cache_item.item_list_hash,
+                          cache_item.version,
+                          cache_item.date_checked,
+                          len(list_data),
+                          sqlite3.Binary(list_data),
+                          cache_item.url_hash)
+                saved = db.execute("UPDATE list_cache SET "
+                                   "user_id = ?, server = ?, items_url = ?, date_saved = ?, date_last_used = ?, "
+                                   "item_list_hash = ?, version = ?, date_checked = ?, data_size = ?, data = ? "
+                                   "WHERE url_hash = ? AND (version IS NULL OR version <= ?)",
+                                   values + (cache_item.version,)).rowcount
+                if saved == 0:
+                    saved = db.execute("INSERT OR IGNORE INTO list_cache "
+                                       "(user_id, server, items_url, date_saved, date_last_used, "
+                                       "item_list_hash, version, date_checked, data_size, data, url_hash) "
+                                       "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                       values).rowcount
+
+                if saved:
+                    stored = self.get_stored_items(db, item_keys)
+                    items = [(item_key, cache_item.server, item, item_hash)
+                             for item_key, item, item_hash in zip(item_keys, item_list, cache_item.item_hashes)]
+                    changed_keys = self.write_items(db, cache_item.user_id, items, cache_item.version, stored)
+                    changed_lists = self.get_lists_with_items(db, changed_keys)
+                    changed_lists.discard(cache_item.url_hash)
+                    db.execute("DELETE FROM list_items WHERE url_hash = ?", (cache_item.url_hash,))
+                    db.executemany("INSERT INTO list_items (url_hash, position, item_key) VALUES (?, ?, ?)",
+                                   [(cache_item.url_hash, position, item_key)
+                                    for position, item_key in enumerate(item_keys)])
+        except Exception:
+            self.forget_shared_strings()
+            raise
+
+        if saved == 0:
+            log.debug("ListCacheStore : not saving {0}, the stored list is newer", cache_item.url_hash)
+            count_event("list_cache_stale_save", cache_item.url_hash)
+            return False
+
+        if changed_lists:
+            # the lists held by the service that share a changed item have to be put together again
+            delete_memory_lists(changed_lists)
+        self.memory_missing.discard(cache_item.url_hash)
+        put_memory_list(cache_item.url_hash, cPickle.dumps(cache_item, protocol=cPickle.HIGHEST_PROTOCOL),
+                        cache_item.version)
+        self.evict_to_size(self.max_size)
+        return True
+
+    def load_items(self, user_id, item_id):
+        """
+            every stored copy of an item for a user as (item key, server, item)
+        """
+        items = []
+        for item_key, server, data in self.get_db().execute("SELECT item_key, server, data FROM item_cache "
+                                                            "WHERE user_id = ? AND item_id = ?", (user_id, item_id)):
+            items.append((item_key, server, self.load_item_record(data)))
+        return items
+
+    def save_items(self, user_id, items, version):
+        """
+            store changed (item key, server, item, item hash) records,
+            every list they are in shows the change the next time it is loaded
+        """
+        db = self.get_db()
+        try:
+            with db:
+                db.execute("BEGIN IMMEDIATE")
+                stored = self.get_stored_items(db, [item[0] for item in items])
+                changed_keys = self.write_items(db, user_id, items, version, stored)
+                changed_lists = self.get_lists_with_items(db, changed_keys)
+        except Exception:
+            self.forget_shared_strings()
+            raise
+        if changed_lists:
+            delete_memory_lists(changed_lists)
+
+    def touch(self, url_hash, date_last_used=None, date_checked=None):
+        if date_last_used is None:
+            date_last_used = time.time()
+        db = self.get_db()
+        with db:
+            if date_checked is None:
+                db.execute("UPDATE list_cache SET date_last_used = ? WHERE url_hash = ?", (date_last_used, url_hash))
+            else:
+                db.execute("UPDATE list_cache SET date_last_used = ?, date_checked = ? WHERE url_hash = ?",
+                           (date_last_used, date_checked, url_hash))
+
+    def load_content(self, url_hash):
+        """
+            a cached response as (json data, date checked, validators) or None
+        """
+        row = self.get_db().execute("SELECT data, date_checked, validators FROM content_cache WHERE url_hash = ?",
+                                    (url_hash,)).fetchone()
+        if row is None:
+            return None
+        return str(row[0]), row[1] or 0, json.loads(row[2] or "{}")
+
+    def save_content(self, url_hash, user_id, server, content_url, data, validators, version):
+        """
+            write a response if the stored copy is not newer, returns False if the save was dropped as stale
+        """
+        validators = json.dumps(validators)
+        now = time.time()
+        values = (user_id, server, content_url, now, now, version, version, validators,
+                  len(data) + len(validators), sqlite3.Binary(data), url_hash)
+        db = self.get_db()
+        with db:
+            saved = db.execute("UPDATE content_cache SET "
+                               "user_id = ?, server = ?, content_url = ?, date_saved = ?, date_last_used = ?, "
+                               "version = ?, date_checked = ?, validators = ?, data_size = ?, data = ? "
+                               "WHERE url_hash = ? AND (version IS NULL OR version <= ?)",
+                               values + (version,)).rowcount
+            if saved == 0:
+                saved = db.execute("INSERT OR IGNORE INTO content_cache "
+                                   "(user_id, server, content_url, date_saved, date_last_used, "
+                                   "version, date_checked, validators, data_size, data, url_hash) "
+                                   "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                   values).rowcount
+        if saved == 0:
+            log.debug("ListCacheStore : not saving content {0}, the stored copy is newer", url_hash)
+            count_event("content_cache_stale_save", url_hash)
+            return False
+        self.evict_to_size(self.max_size)
+        return True
+
+    def touch_content(self, url_hash, date_checked=None):
+        db = self.get_db()
+        with db:
+            if date_checked is None:
+                db.execute("UPDATE content_cache SET date_last_used = ? WHERE url_hash = ?", (time.time(), url_hash))
+            else:
+                db.execute("UPDATE content_cache SET date_last_used = ?, date_checked = ? WHERE url_hash = ?",
+                           (time.time(), date_checked, url_hash))
+
+    def expire_content(self, user_id=None):
+        """
+            have the cached responses checked with the server the next time they are used,
+            they can not be patched item by item like the lists
+        """
+        db = self.get_db()
+        with db:
+            if user_id is None:
+                return db.execute("UPDATE content_cache SET date_checked = 0").rowcount
+            return db.execute("UPDATE content_cache SET date_checked = 0 WHERE user_id = ?", (user_id,)).rowcount
+
+    def remove_unused_items(self, db):
+        db.execute("DELETE FROM list_items WHERE url_hash NOT IN (SELECT url_hash FROM list_cache)")
+        return db.execute("DELETE FROM item_cache WHERE item_key NOT IN (SELECT item_key FROM list_items)").rowcount
+
+    def delete(self, url_hash):
+        db = self.get_db()
+        with db:
+            db.execute("DELETE FROM list_cache WHERE url_hash = ?", (url_hash,))
+            db.execute("DELETE FROM content_cache WHERE url_hash = ?", (url_hash,))
+            self.remove_unused_items(db)
+        delete_memory_list(url_hash)
+
+    def clear_all(self):
+        delete_memory_list()
+        db = self.get_db()
+        with db:
+            db.execute("DELETE FROM list_items")
+            db.execute("DELETE FROM item_cache")
+            del_count = db.execute("DELETE FROM content_cache").rowcount
+            return del_count + db.execute("DELETE FROM list_cache").rowcount
+
+    def clear_unused(self, max_age=None):
+        if max_age is None:
+            max_age = self.max_age
+        db = self.get_db()
+        with db:
+            del_count = db.execute("DELETE FROM list_cache WHERE date_last_used IS NULL OR date_last_used < ?",
+                                   (time.time() - max_age,)).rowcount
+            del_count += db.execute("DELETE FROM content_cache WHERE date_last_used IS NULL OR date_last_used < ?",
+                                    (time.time() - max_age,)).rowcount
+            self.remove_unused_items(db)
+        return del_count
+
+    def get_evict_entries(self, max_size):
+        """
+            the (table, url hash) of the least recently used lists and responses
+            that have to go to get the store under max_size bytes, only the metadata columns are read
+            each stored item is counted once, a list frees its own row and the items no other list holds
+        """
+        db = self.get_db()
+        total_size = db.execute("SELECT (SELECT COALESCE(SUM(data_size), 0) FROM list_cache) + "
+                                "(SELECT COALESCE(SUM(data_size), 0) FROM content_cache) + "
+                                "(SELECT COALESCE(SUM(data_size), 0) FROM item_cache)").fetchone()[0]
+        if total_size <= max_size:
+            return []
+
+        entries = []
+        for table, url_hash, data_size, date_last_used in db.execute(
+                "SELECT 'list_cache', url_hash, data_size, date_last_used FROM list_cache UNION ALL "
+                "SELECT 'content_cache', url_hash, data_size, date_last_used FROM content_cache "
+                "ORDER BY date_last_used").fetchall():
+            if total_size <= max_size:
+                break
+            entries.append((table, url_hash))
+            total_size -= data_size or 0
+            if table == "list_cache":
+                total_size -= self.get_own_items_size(db, url_hash)
+        return entries
+
+    def get_own_items_size(self, db, url_hash):
+        # the items of the list that no other list holds, the lists picked to go before it are not
+        # left out so this can be less than what is freed, never more
+        return db.execute("SELECT COALESCE(SUM(item_cache.data_size), 0) FROM list_items "
+                          "JOIN item_cache ON item_cache.item_key = list_items.item_key "
+                          "WHERE list_items.url_hash = ? AND NOT EXISTS "
+                          "(SELECT 1 FROM list_items AS other WHERE other.item_key = list_items.item_key "
+                          "AND other.url_hash != list_items.url_hash)", (url_hash,)).fetchone()[0]
+
+    def get_old_entries(self, max_age):
+        """
+            the (table, url hash) of the lists and responses not used for max_age seconds
+        """
+        cutoff = time.time() - max_age
+        return self.get_db().execute(
+            "SELECT 'list_cache', url_hash FROM list_cache WHERE date_last_used IS NULL OR date_last_used < ? "
+            "UNION ALL "
+            "SELECT 'content_cache', url_hash FROM content_cache WHERE date_last_used IS NULL OR date_last_used < ?",
+            (cutoff, cutoff)).fetchall()
+
+    def delete_entries(self, entries):
+        """
+            delete a batch of (table, url hash) in one short transaction, returns the bytes reclaimed,
+            the items only these lists used are left for remove_unused_items_batch()
+        """
+        list_hashes = [(url_hash,) for table, url_hash in entries if table == "list_cache"]
+        content_hashes = [(url_hash,) for table, url_hash in entries if table == "content_cache"]
+        reclaimed = 0
+        db = self.get_db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            for url_hash in list_hashes:
+                row = db.execute("SELECT data_size FROM list_cache WHERE url_hash = ?", url_hash).fetchone()
+                if row is not None:
+                    reclaimed += row[0] or 0
+            for url_hash in content_hashes:
+                row = db.execute("SELECT data_size FROM content_cache WHERE url_hash = ?", url_hash).fetchone()
+                if row is not None:
+                    reclaimed += row[0] or 0
+            db.executemany("DELETE FROM list_cache WHERE url_hash = ?", list_hashes)
+            db.executemany("DELETE FROM list_items WHERE url_hash = ?", list_hashes)
+            db.executemany("DELETE FROM content_cache WHERE url_hash = ?", content_hashes)
+        if list_hashes:
+            delete_memory_lists([url_hash for url_hash, in list_hashes])
+        return reclaimed
+
+    def remove_unused_items_batch(self, batch_size):
+        """
+            delete up to batch_size items that are in no list, returns (items deleted, bytes reclaimed)
+        """
+        db = self.get_db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            rows = db.execute("SELECT item_key, data_size FROM item_cache WHERE NOT EXISTS "
+                              "(SELECT 1 FROM list_items WHERE list_items.item_key = item_cache.item_key) "
+                              "LIMIT ?", (batch_size,)).fetchall()
+            db.executemany("DELETE FROM item_cache WHERE item_key = ?", [(row[0],) for row in rows])
+        return len(rows), sum(row[1] or 0 for row in rows)
+
+    def evict_to_size(self, max_size):
+        """
+            drop the least recently used lists and responses until the store is under max_size bytes
+        """
+        entries = self.get_evict_entries(max_size)
+        if not entries:
+            return 0
+
+        list_hashes = [url_hash for table, url_hash in entries if table == "list_cache"]
+        db = self.get_db()
+        with db:
+            db.executemany("DELETE FROM list_cache WHERE url_hash = ?", [(url_hash,) for url_hash in list_hashes])
+            db.executemany("DELETE FROM content_cache WHERE url_hash = ?",
+                           [(url_hash,) for table, url_hash in entries if table == "content_cache"])
+            self.remove_unused_items(db)
+        if list_hashes:
+            delete_memory_lists(list_hashes)
+        log.debug("ListCacheStore : evicted {0} lists and responses to get under {1} bytes", len(entries), max_size)
+        return len(entries)
+
+
+def get_cache_store():
+    global store
+    if store is None:
+        store = ListCacheStore()
+    return store
@@ -1,12 +1,12 @@
 # Gnu General Public License - see LICENSE.TXT
 
 from uuid import uuid4 as uuid4
-import xbmcaddon
 import xbmc
 import xbmcvfs
 
 from .kodi_utils import HomeWindow
 from .simple_logging import SimpleLogging
+from .settings_snapshot import get_settings
 
 log = SimpleLogging(__name__)
 
@@ -40,8 +40,7 @@ class ClientInformation():
         return client_id
 
     def getVersion(self):
-        addon = xbmcaddon.Addon()
-        version = addon.getAddonInfo("version")
+        version = get_settings().getAddonInfo("version")
         return version
 
     def getClient(self):
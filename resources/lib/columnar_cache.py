@@ -0,0 +1,244 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import re
+
+from .simple_logging import SimpleLogging
+from .item_functions import ItemDetails, item_defaults
+
+log = SimpleLogging(__name__)
+
+FORMAT_VERSION = 1
+
+# the artwork urls built by DownloadUtils.getArtwork()
+art_url_pattern = re.compile("^(.*)/emby/Items/([^/]+)/Images/([^/]+)/([^/?]+)\\?Format=original&Tag=([^|]*)(.*)$")
+
+
+def pack_art(art, art_bases, strings):
+    """
+        art dict -> (keys with no image, (key, base index, (item id, art type, index, tag)) entries,
+        (key, url) entries for urls that are not ours)
+    """
+    if art is None:
+        return None
+    empty_keys = []
+    entries = []
+    other_urls = []
+    for key, url in art.iteritems():
+        key = strings.setdefault(key, key)
+        if not url:
+            empty_keys.append(key)
+            continue
+        match = art_url_pattern.match(url)
+        if match is None:
+            other_urls.append((key, url))
+            continue
+        server, item_id, art_type, index, tag, suffix = match.groups()
+        base = (server, suffix)
+        base_index = art_bases.get(base)
+        if base_index is None:
+            base_index = len(art_bases)
+            art_bases[base] = base_index
+        url_args = (strings.setdefault(item_id, item_id),
+                    strings.setdefault(art_type, art_type),
+                    strings.setdefault(index, index),
+                    strings.setdefault(tag, tag))
+        entries.append((key, base_index, strings.setdefault(url_args, url_args)))
+    empty_keys = tuple(empty_keys)
+    return strings.setdefault(empty_keys, empty_keys), tuple(entries), tuple(other_urls)
+
+
+def get_art_templates(art_bases):
+    templates = []
+    for server, suffix in art_bases:
+        templates.append(server.replace("%", "%%") +
+                         "/emby/Items/%s/Images/%s/%s?Format=original&Tag=%s" +
+                         suffix.replace("%", "%%"))
+    return templates
+
+
+def unpack_art(packed, art_templates):
+    if packed is None:
+        return None
+    empty_keys, entries, other_urls = packed
+    art = dict.fromkeys(empty_keys, '')
+    for key, base_index, url_args in entries:
+        art[key] = art_templates[base_index] % url_args
+    if other_urls:
+        art.update(other_urls)
+    return art
+
+
+def intern_value(value, strings):
+    """
+        share equal strings, also inside the lists of strings used for genres
+        and the tuples of the compact cast and media streams
+    """
+    if isinstance(value, basestring):
+        return strings.setdefault(value, value)
+    if isinstance(value, list):
+        return [intern_value(entry, strings) for entry in value]
+    if isinstance(value, tuple):
+        return tuple([intern_value(entry, strings) for entry in value])
+    if isinstance(value, dict):
+        interned = {}
+        for key, entry in value.iteritems():
+            interned[strings.setdefault(key, key)] = intern_value(entry, strings)
+        return interned
+    return value
+
+
+def pack_item_list(item_list):
+    """
+        a list of ItemDetails as one column per field, repeated strings are shared so they are pickled once
+    """
+    field_names = []
+    known_fields = set()
+    for item in item_list:
+        for name in item.get_values():
+            if name not in known_fields:
+                known_fields.add(name)
+                field_names.append(name)
+
+    strings = {}
+    art_bases = {}
+    columns = []
+    for name in field_names:
+        if name == "art":
+            column = [pack_art(item.art, art_bases, strings) for item in item_list]
+        else:
+            column = [intern_value(getattr(item, name), strings) for item in item_list]
+        columns.append(column)
+
+    base_list = [None] * len(art_bases)
+    for base, base_index in art_bases.iteritems():
+        base_list[base_index] = base
+
+    return {"format_version": FORMAT_VERSION,
+            "count": len(item_list),
+            "field_names": field_names,
+            "columns": columns,
+            "art_bases": base_list}
+
+
+def unpack_item_list(packed):
+    if packed.get("format_version") != FORMAT_VERSION:
+        log.debug("unpack_item_list : unknown format version {0}", packed.get("format_version"))
+        return None
+    return LazyItemList(packed)
+
+
+class LazyItemList():
+    """
+        The rows of a packed item list, each ItemDetails is only built the first time it is used
+    """
+
+    def __init__(self, packed):
+        self.field_names = packed["field_names"]
+        self.columns = packed["columns"]
+        self.art_templates = get_art_templates(packed["art_bases"])
+        self.count = packed["count"]
+        self.rows = [None] * self.count
+        self.has_art = "art" in self.field_names
+
+    def materialise(self, index):
+        item = ItemDetails()
+        for name, column in zip(self.field_names, self.columns):
+            setattr(item, name, column[index])
+        if self.has_art:
+            item.art = unpack_art(item.art, self.art_templates)
+        self.rows[index] = item
+        return item
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[row] for row in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if index < 0 or index >= self.count:
+            raise IndexError("LazyItemList index out of range")
+        item = self.rows[index]
+        if item is None:
+            item = self.materialise(index)
+        return item
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+
+# set for each list the item is shown in so they are not part of the shared item record
+list_fields = ("baseline_itemname", "total_items")
+
+
+def pack_item_record(item):
+    """
+        the values of one ItemDetails that differ from the class defaults,
+        the form an item is stored in once for all the cached lists it is in
+    """
+    record = {}
+    for name, value in item.get_values().iteritems():
+        if name in list_fields:
+            continue
+        default = item_defaults.get(name, record)
+        # 0 and 0.0 and False are equal but do not format the same
+        if value != default or type(value) is not type(default):
+            record[name] = value
+
+    art = record.get("art")
+    if art is not None:
+        art_bases = {}
+        packed_art = pack_art(art, art_bases, {})
+        base_list = [None] * len(art_bases)
+        for base, base_index in art_bases.iteritems():
+            base_list[base_index] = base
+        record["art"] = (packed_art, base_list)
+    return record
+
+
+# the fields of an item record with values that repeat from item to item
+shared_value_fields = ("genres", "studio", "item_type", "location_type", "mode", "overlay", "mpaa", "rating",
+                       "streams")
+
+
+def collect_strings(value, strings):
+    if isinstance(value, basestring):
+        strings.append(value)
+    elif isinstance(value, (list, tuple)):
+        for entry in value:
+            collect_strings(entry, strings)
+
+
+def get_shared_strings(record):
+    """
+        the strings of an item record that are stored once for all the items like the columns of a list share them,
+        the field names, the art keys and url parts, the cast thumbnail template and the values of shared_value_fields
+    """
+    strings = list(record)
+    art = record.get("art")
+    if art is not None:
+        (empty_keys, entries, other_urls), base_list = art
+        strings.extend(empty_keys)
+        for key, base_index, (item_id, art_type, index, tag) in entries:
+            strings.extend((key, art_type, index))
+        strings.extend([key for key, url in other_urls])
+        for base in base_list:
+            collect_strings(base, strings)
+    people = record.get("people")
+    if people and isinstance(people[0], basestring):
+        strings.append(people[0])
+    for name in shared_value_fields:
+        collect_strings(record.get(name), strings)
+    return strings
+
+
+def unpack_item_record(record):
+    art = record.get("art")
+    if art is not None:
+        packed_art, base_list = art
+        record["art"] = unpack_art(packed_art, get_art_templates(base_list))
+    item = ItemDetails()
+    item.set_values(record)
+    return item
@@ -1,25 +1,27 @@
 # Gnu General Public License - see LICENSE.TXT
 
 import json
-from collections import defaultdict
 import threading
 import hashlib
-import os
-import cPickle
 import time
+import re
+from datetime import datetime
+from email.utils import parsedate_tz, mktime_tz
 #import copy
 #import urllib
 
-from .downloadutils import DownloadUtils
+from .downloadutils import DownloadUtils, request_executor
 from .simple_logging import SimpleLogging
-from .item_functions import extract_item_info
+from .item_functions import extract_items, set_user_data
 from .kodi_utils import HomeWindow
 from .translation import string_load
-from .tracking import timer
+from .tracking import timer, count_event
+from .json_stream import ItemsStreamReader, JsonObject
+from .cache_store import get_cache_store
+from .cache_policy import get_cache_policy
+from .columnar_cache import pack_item_list, unpack_item_list
 
 import xbmc
-import xbmcaddon
-import xbmcvfs
 import xbmcgui
 
 log = SimpleLogging(__name__)
@@ -32,30 +34,327 @@ class CacheItem:
     date_last_used = None
     last_action = None
     items_url = None
-    file_path = None
+    url_hash = None
     user_id = None
+    server = None
+    validators = None
+    item_ids = None
+    item_hashes = None
+    sync_date = None
+    version = None
+    record_variant = None
+    baseline_itemname = None
+    date_checked = None
 
     def __init__(self, *args):
         pass
 
+    def __getstate__(self):
+        # the item list is stored in the packed columnar form
+        state = self.__dict__.copy()
+        if self.item_list is not None:
+            state["item_list"] = pack_item_list(self.item_list)
+        return state
+
+    def __setstate__(self, state):
+        item_list = state.get("item_list")
+        if isinstance(item_list, dict):
+            state["item_list"] = unpack_item_list(item_list)
+        self.__dict__.update(state)
+
+
+def get_sync_date(validators):
+    """
+        the server time of a response, used to ask for the changes since then
+    """
+    server_date = validators.get("server_date")
+    if server_date:
+        parsed_date = parsedate_tz(server_date)
+        if parsed_date is not None:
+            return mktime_tz(parsed_date)
+    return time.time()
+
+
+def get_item_diff(old_ids, old_hashes, new_ids, new_hashes):
+    """
+        compare two lists by the per item hashes, returns the added, removed and changed ids
+        and whether the items are in a different order
+    """
+    old_fingerprints = dict(zip(old_ids, old_hashes))
+    new_fingerprints = dict(zip(new_ids, new_hashes))
+
+    added = [item_id for item_id in new_ids if item_id not in old_fingerprints]
+    removed = [item_id for item_id in old_ids if item_id not in new_fingerprints]
+    changed = [item_id for item_id in new_ids
+               if item_id in old_fingerprints and old_fingerprints[item_id] != new_fingerprints[item_id]]
+    moved = not added and not removed and old_ids != new_ids
+
+    return {"added": added, "removed": removed, "changed": changed, "moved": moved}
+
+
+def get_url_hash(user_id, server, url_key):
+    m = hashlib.md5()
+    m.update(str(user_id) + "|" + str(server) + "|" + url_key)
+    return m.hexdigest()
+
+
+def get_record_variant(url, gui_options):
+    """
+        the url params and gui options that change what extract_item_info makes of an item,
+        lists that agree on these share their stored items
+    """
+    item_params = sorted(param.lower() for param in
+                         re.findall("(?i)[?&]((?:Fields|EnableImageTypes|ImageTypeLimit|EnableUserData)=[^&]*)", url))
+    variant = repr(("&".join(item_params), gui_options.get("name_format"), gui_options.get("name_format_type")))
+    return hashlib.md5(variant).hexdigest()
+
+
+def keep_cached_item(cache_item):
+    cache_store = get_cache_store()
+    cache_store.touch(cache_item.url_hash)
+    cache_store.put_memory(cache_item)
+
+
+# lists the user data decides the items or the order of, a watched or favorite change can add or remove items
+user_data_lists = re.compile("(?i)Filters=[^&]*(IsPlayed|IsUnplayed|IsFavorite|IsResumable)|[?&](IsPlayed|IsFavorite)="
+                             "|/Shows/NextUp|/Items/Resume|SortBy=[^&]*DatePlayed")
+
+
+def update_cached_user_data(user_id, item_id, user_data):
+    """
+        apply the UserData the server sent for a changed item to every cached copy of it,
+        returns the number of copies changed
+        the cached lists filtered or sorted on user data are loaded again, the item can join or leave them
+    """
+    cache_store = get_cache_store()
+    cache_store.delete_user_lists(user_id, user_data_lists)
+    items = []
+    for item_key, server, item in cache_store.load_items(user_id, item_id):
+        set_user_data(item, user_data)
+        items.append((item_key, server, item, CacheManagerThread.get_item_hash(item)))
+    if items:
+        cache_store.save_items(user_id, items, time.time())
+    # cached responses that might hold the item are checked before they are used again
+    cache_store.expire_content(user_id)
+    log.debug("update_cached_user_data : {0} updated {1} cached copies", item_id, len(items))
+    return len(items)
+
+
+def check_cached_content(url, url_hash, user_id, server, validators):
+    """
+        load a response with the validators of the cached copy and save it,
+        returns the new json or None if the cached copy is still current or the request failed
+        a response that was cut off or does not parse is not saved, the cached copy and its validators stay
+    """
+    version = time.time()
+    json_data = "".join(DownloadUtils().stream_url(url, validators=validators))
+    cache_store = get_cache_store()
+    if validators.get("not_modified"):
+        log.debug("check_cached_content : Server returned 304 Not Modified")
+        cache_store.touch_content(url_hash, version)
+        return None
+    if not json_data or validators.get("failed"):
+        log.debug("check_cached_content : No complete response, keeping the cached copy")
+        return None
+    try:
+        json.loads(json_data)
+    except ValueError as error:
+        log.error("check_cached_content : Bad response for {0}, keeping the cached copy : {1}", url, error)
+        return None
+    cache_store.save_content(url_hash, user_id, server, url, json_data, validators, version)
+    return json_data
+
+
+# the ItemDetails fields each SortBy value orders by, keyed lower case
+sort_fields = {
+    "sortname": "sort_name",
+    "name": "name",
+    "seriessortname": "series_name",
+    "datecreated": "date_added",
+    "premieredate": "premiere_date",
+    "productionyear": "year",
+    "communityrating": "community_rating",
+    "criticrating": "critic_rating",
+    "officialrating": "mpaa",
+    "runtime": "duration",
+    "playcount": "play_count",
+    "isfolder": "is_folder",
+    "isplayed": "play_count",
+    "indexnumber": "episode_number",
+    "parentindexnumber": "season_number",
+    "album": "album_name",
+    "albumartist": "album_artist",
+    "artist": "song_artist",
+}
+
+
+def get_sort_fields(url):
+    """
+        the fields the list of the url is ordered by, None if one of them is not known
+        only the plain Items query is taken as sorted by SortName when no SortBy is given,
+        others like Shows/NextUp and Items/Latest have their own order
+    """
+    match = re.search("(?i)[?&]SortBy=([^&]*)", url)
+    if match is None:
+        if not url.split("?")[0].rstrip("/").lower().endswith("/items"):
+            return None
+        sort_by = ["SortName"]
+    else:
+        sort_by = match.group(1).replace("%2C", ",").replace("%2c", ",").split(",")
+    fields = []
+    for name in sort_by:
+        field = sort_fields.get(name.strip().lower())
+        if field is None:
+            return None
+        fields.append(field)
+    return fields
+
+
+def add_url_param(url, name, value):
+    if url.find("?") == -1:
+        return url + "?" + name + "=" + value
+    return url + "&" + name + "=" + value
+
 
 class DataManager:
 
-    addon_dir = xbmc.translatePath(xbmcaddon.Addon().getAddonInfo('profile'))
+    ids_per_request = 20
 
     def __init__(self, *args):
         # log.debug("DataManager __init__")
         pass
 
     def loadJasonData(self, jsonData):
-        return json.loads(jsonData, object_hook=lambda d: defaultdict(lambda: None, d))
+        return json.loads(jsonData, object_hook=JsonObject)
+
+    def stream_items(self, url, validators=None):
+        # items are parsed one at a time straight off the socket into plain dicts, see extract_item_info()
+        chunks = DownloadUtils().stream_url(url, validators=validators)
+        return ItemsStreamReader(chunks)
+
+    def load_item_list(self, url, gui_options, validators=None):
+        """
+            the items of the url and the total record count, an empty list with validators["failed"] set
+            when the response was cut off or could not be parsed
+        """
+        if validators is None:
+            validators = {}
+        reader = self.stream_items(url, validators)
+        item_list = []
+        try:
+            for item_details in extract_items(reader.items(), gui_options):
+                item_list.append(item_details)
+        except ValueError as error:
+            log.error("load_item_list : Bad response for {0} : {1}", url, error)
+            validators["failed"] = True
+        if validators.get("failed"):
+            return [], 0
+
+        baseline_name = reader.header.get("BaselineItemName")
+        for item_data in item_list:
+            item_data.baseline_itemname = baseline_name
+
+        total_records = reader.header.get("TotalRecordCount", 0)
+        return item_list, total_records
 
     @timer
-    def GetContent(self, url):
-        jsonData = DownloadUtils().downloadUrl(url)
+    def GetContent(self, url, use_cache=False):
+        if use_cache:
+            jsonData = self.get_cached_content(url)
+        else:
+            jsonData = DownloadUtils().downloadUrl(url)
         result = self.loadJasonData(jsonData)
         return result
 
+    def get_cached_content(self, url):
+        """
+            the json of a response from the cache, it is used and checked with the server
+            by the same cache policy as the lists, see get_items()
+            a background check only updates the cache, the next use shows the change
+        """
+        download_utils = DownloadUtils()
+        user_id = download_utils.getUserId()
+        server = download_utils.getServer()
+        url_key = download_utils.get_url_key(url)
+        url_hash = get_url_hash(user_id, server, url_key)
+        policy = get_cache_policy(url_key)
+        cache_store = get_cache_store()
+
+        home_window = HomeWindow()
+        if home_window.getProperty("skip_cache_for_" + url):
+            log.debug("get_cached_content : Clearing cache data and loading new data")
+            home_window.clearProperty("skip_cache_for_" + url)
+            cache_store.delete(url_hash)
+
+        cached = None
+        try:
+            cached = cache_store.load_content(url_hash)
+        except Exception as err:
+            log.error("get_cached_content : Content Cache Load Failed : {0}", err)
+
+        if cached is not None:
+            json_data, date_checked, validators = cached
+            cache_age = time.time() - date_checked
+            if policy.max_stale is not None and cache_age > policy.max_stale:
+                log.debug("get_cached_content : Cached data is {0:.0f} sec old, too old to use", cache_age)
+            elif cache_age < policy.ttl:
+                log.debug("get_cached_content : Using cached data without a check, {0:.0f} sec old", cache_age)
+                count_event("content_cache_hit", url_key)
+                threading.Thread(target=cache_store.touch_content, args=(url_hash,)).start()
+                return json_data
+            elif policy.revalidate == "before":
+                log.debug("get_cached_content : Checking cached data before using it")
+                checked_data = check_cached_content(url, url_hash, user_id, server, validators)
+                if checked_data is not None:
+                    return checked_data
+                return json_data
+            else:
+                log.debug("get_cached_content : Using cached data and checking it in the background")
+                count_event("content_cache_hit", url_key)
+                threading.Thread(target=check_cached_content,
+                                 args=(url, url_hash, user_id, server, validators)).start()
+                return json_data
+
+        log.debug("get_cached_content : Loading url data from server")
+        json_data = check_cached_content(url, url_hash, user_id, server, {})
+        if json_data is None:
+            return "null"
+        return json_data
+
+    @timer
+    def get_items_by_ids(self, ids, fields=None):
+        """
+            load a list of items with a few Ids= queries run side by side,
+            the results are in the same order as ids with None for any item not found
+        """
+        id_chunks = [ids[index:index + self.ids_per_request] for index in range(0, len(ids), self.ids_per_request)]
+        chunk_results = [None] * len(id_chunks)
+
+        def load_chunk(chunk_index):
+            url = "{server}/emby/Users/{userid}/Items?Ids=" + ",".join(id_chunks[chunk_index])
+            if fields:
+                url += "&Fields=" + fields
+            url += "&format=json"
+            try:
+                chunk_results[chunk_index] = self.GetContent(url)
+            except Exception as error:
+                log.error("get_items_by_ids : chunk load failed : {0}", error)
+
+        futures = [request_executor.submit(load_chunk, chunk_index) for chunk_index in range(1, len(id_chunks))]
+        if len(id_chunks) > 0:
+            load_chunk(0)
+        for future in futures:
+            future.result()
+
+        items_by_id = {}
+        for result in chunk_results:
+            if isinstance(result, dict) and result.get("Items") is not None:
+                for item in result.get("Items"):
+                    items_by_id[item["Id"]] = item
+
+        log.debug("get_items_by_ids : {0} ids in {1} requests", len(ids), len(id_chunks))
+        return [items_by_id.get(item_id) for item_id in ids]
+
     @timer
     def get_items(self, url, gui_options, use_cache=False):
 
@@ -67,120 +366,233 @@ class DataManager:
         user_id = download_utils.getUserId()
         server = download_utils.getServer()
 
-        m = hashlib.md5()
-        m.update(user_id + "|" + str(server) + "|" + url)
-        url_hash = m.hexdigest()
-        cache_file = os.path.join(self.addon_dir, "cache_" + url_hash + ".pickle")
-
-        #changed_url = url + "&MinDateLastSavedForUser=" + urllib.unquote("2019-09-16T13:45:30")
-        #results = self.GetContent(changed_url)
-        #log.debug("DataManager Changes Since Date : {0}", results)
+        # urls that ask for the same thing share the cache, see url_keys.canonical_url()
+        url_key = download_utils.get_url_key(url)
+        url_hash = get_url_hash(user_id, server, url_key)
+        cache_store = get_cache_store()
+        record_variant = get_record_variant(url_key, gui_options)
+        policy = get_cache_policy(url_key)
+        log.debug("get_items : {0}", policy)
 
         item_list = None
         total_records = 0
-        baseline_name = None
         cache_thread = CacheManagerThread()
         cache_thread.gui_options = gui_options
 
-        home_window.setProperty(cache_file, "true")
-
         clear_cache = home_window.getProperty("skip_cache_for_" + url)
-        if clear_cache and os.path.isfile(cache_file):
+        if clear_cache:
             log.debug("Clearing cache data and loading new data")
             home_window.clearProperty("skip_cache_for_" + url)
-            os.remove(cache_file)
+            cache_store.delete(url_hash)
 
         # try to load the list item data from the cache
-        if os.path.isfile(cache_file) and use_cache:
-            log.debug("Loading url data from cached pickle data")
-
-            with open(cache_file, 'rb') as handle:
-                try:
-                    cache_item = cPickle.load(handle)
-                    cache_thread.cached_item = cache_item
-                    item_list = cache_item.item_list
-                    total_records = cache_item.total_records
-                except Exception as err:
-                    log.error("Pickle Data Load Failed : {0}", err)
-                    item_list = None
+        check_cache = True
+        cache_item = None
+        if use_cache:
+            try:
+                cache_item = cache_store.load(url_hash)
+                if cache_item is not None:
+                    cache_age = time.time() - (cache_item.date_checked or cache_item.date_saved or 0)
+                    if policy.max_stale is not None and cache_age > policy.max_stale:
+                        log.debug("Cached data is {0:.0f} sec old, too old to use", cache_age)
+                    elif cache_age < policy.ttl:
+                        log.debug("Using cached data without a check, {0:.0f} sec old", cache_age)
+                        cache_item.record_variant = record_variant
+                        item_list = cache_item.item_list
+                        total_records = cache_item.total_records
+                        check_cache = False
+                    elif policy.revalidate == "before":
+                        log.debug("Checking cached data before using it")
+                        cache_item.record_variant = record_variant
+                        cache_thread.cached_item = cache_item
+                        cache_thread.send_refresh = False
+                        check_started = time.time()
+                        cache_thread.run()
+                        if (cache_thread.cached_item.date_checked or 0) >= check_started:
+                            item_list = cache_thread.cached_item.item_list
+                            total_records = cache_thread.cached_item.total_records
+                            check_cache = False
+                    else:
+                        log.debug("Loaded url data from the list cache")
+                        cache_item.record_variant = record_variant
+                        cache_thread.cached_item = cache_item
+                        item_list = cache_item.item_list
+                        total_records = cache_item.total_records
+            except Exception as err:
+                log.error("List Cache Load Failed : {0}", err)
+                item_list = None
+                check_cache = True
 
         # we need to load the list item data form the server
         if item_list is None or len(item_list) == 0:
             log.debug("Loading url data from server")
 
-            results = self.GetContent(url)
-
-            if results is None:
-                results = []
-
-            if isinstance(results, dict):
-                total_records = results.get("TotalRecordCount", 0)
-
-            if isinstance(results, dict) and results.get("Items") is not None:
-                baseline_name = results.get("BaselineItemName")
-                results = results.get("Items", [])
-            elif isinstance(results, list) and len(results) > 0 and results[0].get("Items") is not None:
-                baseline_name = results[0].get("BaselineItemName")
-                results = results[0].get("Items")
-
-            item_list = []
-            for item in results:
-                item_data = extract_item_info(item, gui_options)
-                item_data.baseline_itemname = baseline_name
-                item_list.append(item_data)
+            validators = {}
+            version = time.time()
+            loaded_items, loaded_total = self.load_item_list(url, gui_options, validators)
+            if validators.get("failed"):
+                # a cut off response is not cached, a cached list that was too old is still better than nothing
+                log.debug("Loading url data failed, not caching it")
+                if cache_item is not None and cache_item.item_list:
+                    return cache_item.item_list, cache_item.total_records
+                return [], 0
+            item_list, total_records = loaded_items, loaded_total
 
             cache_item = CacheItem()
+            cache_item.validators = validators
             cache_item.item_list = item_list
-            cache_item.file_path = cache_file
+            cache_item.url_hash = url_hash
             cache_item.items_url = url
             cache_item.user_id = user_id
+            cache_item.server = server
             cache_item.last_action = "fresh_data"
             cache_item.date_saved = time.time()
             cache_item.date_last_used = time.time()
+            cache_item.date_checked = version
             cache_item.total_records = total_records
+            cache_item.sync_date = get_sync_date(validators)
+            cache_item.version = version
+            cache_item.record_variant = record_variant
+            if item_list:
+                cache_item.baseline_itemname = item_list[0].baseline_itemname
 
             cache_thread.cached_item = cache_item
             # copy.deepcopy(item_list)
+            check_cache = True
 
-        if use_cache:
+        if use_cache and check_cache:
             cache_thread.start()
+        elif use_cache:
+            # the list is not checked but it still counts as used
+            threading.Thread(target=keep_cached_item, args=(cache_item,)).start()
 
-        return cache_file, item_list, total_records
+        return item_list, total_records
 
 
 class CacheManagerThread(threading.Thread):
     cached_item = None
     gui_options = None
+    send_refresh = True
 
     def __init__(self, *args):
         threading.Thread.__init__(self, *args)
 
     @staticmethod
-    def get_data_hash(items):
+    def get_item_hash(item):
+        item_string = "%s_%s_%s_%s_%s_%s" % (
+            item.name,
+            item.play_count,
+            item.favorite,
+            item.resume_time,
+            item.recursive_unplayed_items_count,
+            item.etag
+        )
+        return hashlib.md5(item_string.encode("UTF-8")).digest()
 
+    @staticmethod
+    def get_data_hash(item_hashes):
+        # the list hash is built from the item hashes so changing a few items only rehashes those
         m = hashlib.md5()
-        for item in items:
-            item_string = "%s_%s_%s_%s_%s_%s" % (
-                item.name,
-                item.play_count,
-                item.favorite,
-                item.resume_time,
-                item.recursive_unplayed_items_count,
-                item.etag
-            )
-            item_string = item_string.encode("UTF-8")
-            m.update(item_string)
-
+        m.update("".join(item_hashes))
         return m.hexdigest()
 
-    def wait_for_save(self, home_window, file_name):
-        loops = 0
-        wait_refresh = home_window.getProperty(file_name)
-        while wait_refresh and loops < 200 and not xbmc.Monitor().abortRequested():
-            xbmc.sleep(100)
-            loops = loops + 1
-            wait_refresh = home_window.getProperty(file_name)
-        return loops
+    def load_changes(self):
+        """
+            ask the server for the items changed since the last sync and merge them into the cached list by Id,
+            returns the diff or None if the whole list has to be loaded again
+        """
+        cached_item = self.cached_item
+        if cached_item.sync_date is None or cached_item.item_hashes is None or cached_item.item_ids is None:
+            return None
+
+        url = cached_item.items_url
+        # the position of a changed item in these lists can not be worked out from the change alone
+        if re.search("(?i)SortBy=[^&]*(DatePlayed|Random)", url):
+            return None
+
+        # a minute of overlap, merging an item that did not change is harmless
+        min_date = datetime.utcfromtimestamp(cached_item.sync_date - 60).strftime("%Y-%m-%dT%H:%M:%S")
+        changes_url = add_url_param(url, "MinDateLastSavedForUser", min_date)
+        # the limit can still be a place holder like {ItemLimit} that is filled in when the url is requested
+        count_url = add_url_param(re.sub("(?i)&?\\bLimit=[^&]*", "", url), "Limit", "0")
+
+        data_manager = DataManager()
+        version = time.time()
+        count_future = request_executor.submit(data_manager.GetContent, count_url)
+        validators = {}
+        changed_items, changed_total = data_manager.load_item_list(changes_url, self.gui_options, validators)
+        count_result = count_future.result()
+        if validators.get("failed"):
+            return None
+
+        # a different total means items were added or removed
+        if not isinstance(count_result, dict) or count_result.get("TotalRecordCount") != cached_item.total_records:
+            log.debug("CacheManagerThread : Item count changed, reloading the list")
+            return None
+        if changed_total > len(changed_items):
+            return None
+
+        item_positions = {}
+        for position, item_id in enumerate(cached_item.item_ids):
+            item_positions[item_id] = position
+
+        diff = {"added": [], "removed": [], "changed": [], "moved": False}
+        if len(changed_items) == 0:
+            return diff
+
+        # a changed item stays where it is, unless what the list is sorted by changed too
+        item_sort_fields = get_sort_fields(url)
+        if item_sort_fields is None:
+            log.debug("CacheManagerThread : List sort order not known, reloading the list")
+            return None
+
+        item_list = list(cached_item.item_list)
+        item_hashes = list(cached_item.item_hashes)
+        for item in changed_items:
+            position = item_positions.get(item.id)
+            if position is None:
+                log.debug("CacheManagerThread : Changed item not in the cached list, reloading the list")
+                return None
+            cached = item_list[position]
+            if any(getattr(item, field) != getattr(cached, field) for field in item_sort_fields):
+                log.debug("CacheManagerThread : Sort value of {0} changed, reloading the list", item.id)
+                return None
+            item_hash = self.get_item_hash(item)
+            if item_hash != item_hashes[position]:
+                diff["changed"].append(item.id)
+            item.baseline_itemname = item_list[position].baseline_itemname
+            item_list[position] = item
+            item_hashes[position] = item_hash
+
+        cached_item.item_list = item_list
+        cached_item.item_hashes = item_hashes
+        cached_item.sync_date = get_sync_date(validators)
+        cached_item.version = version
+        log.debug("CacheManagerThread : Merged {0} changed items", len(changed_items))
+        return diff
+
+    def refresh_container(self, home_window, diff):
+        """
+            refresh the container for a diff that changes what is shown,
+            only if the list is still the one being shown
+        """
+        count_event("cache_diff", "%s|added=%s|removed=%s|changed=%s|moved=%s" % (
+            self.cached_item.url_hash,
+            len(diff["added"]),
+            len(diff["removed"]),
+            len(diff["changed"]),
+            diff["moved"]))
+        log.debug("CacheManagerThread : Diff : {0}", diff)
+
+        if not (diff["added"] or diff["removed"] or diff["changed"] or diff["moved"]):
+            return
+        if not self.send_refresh:
+            return
+        if home_window.getProperty("last_content_url") != self.cached_item.items_url:
+            log.debug("CacheManagerThread : List is no longer shown, not refreshing")
+            return
+        log.debug("CacheManagerThread : Sending container refresh")
+        xbmc.executebuiltin("Container.Refresh")
 
     def run(self):
 
@@ -188,91 +600,101 @@ class CacheManagerThread(threading.Thread):
         # log.debug("CacheManagerThread : Cache Item : {0}", self.cached_item.__dict__)
 
         home_window = HomeWindow()
-        is_fresh = False
+        cache_store = get_cache_store()
 
-        # if the data is fresh then just save it
-        # if the data is to old do a reload
-        if (self.cached_item.date_saved is not None
-                and (time.time() - self.cached_item.date_saved) < 20
-                and self.cached_item.last_action == "fresh_data"):
-            is_fresh = True
+        # data just loaded from the server only has to be saved, get_items() decides when cached data is checked
+        is_fresh = self.cached_item.last_action == "fresh_data"
 
         if is_fresh and self.cached_item.item_list is not None and len(self.cached_item.item_list) > 0:
             log.debug("CacheManagerThread : Saving fresh data")
-            cached_hash = self.get_data_hash(self.cached_item.item_list)
-            self.cached_item.item_list_hash = cached_hash
+            self.cached_item.item_ids = [item.id for item in self.cached_item.item_list]
+            self.cached_item.item_hashes = [self.get_item_hash(item) for item in self.cached_item.item_list]
+            self.cached_item.item_list_hash = self.get_data_hash(self.cached_item.item_hashes)
             self.cached_item.last_action = "cached_data"
             self.cached_item.date_saved = time.time()
             self.cached_item.date_last_used = time.time()
 
-            loops = self.wait_for_save(home_window, self.cached_item.file_path)
-
-            log.debug("CacheManagerThread : Saving New Data loops({0})", loops)
-
-            with open(self.cached_item.file_path, 'wb') as handle:
-                cPickle.dump(self.cached_item, handle, protocol=cPickle.HIGHEST_PROTOCOL)
-
-            home_window.clearProperty(self.cached_item.file_path)
+            saved = cache_store.save(self.cached_item)
+            log.debug("CacheManagerThread : Saved New Data ({0})", saved)
 
         else:
-            log.debug("CacheManagerThread : Reloading to recheck data hashes")
-            cached_hash = self.cached_item.item_list_hash
-            log.debug("CacheManagerThread : Cache Hash : {0}", cached_hash)
+            log.debug("CacheManagerThread : Reloading to recheck the cached items")
 
-            data_manager = DataManager()
-            results = data_manager.GetContent(self.cached_item.items_url)
-            if results is None:
-                results = []
+            checked = time.time()
+            diff = self.load_changes()
+            if diff is not None:
+                self.cached_item.date_last_used = time.time()
+                self.cached_item.date_checked = checked
+                if diff["changed"]:
+                    self.cached_item.item_list_hash = self.get_data_hash(self.cached_item.item_hashes)
+                    self.cached_item.last_action = "cached_data"
+                    self.cached_item.date_saved = time.time()
+                    if not cache_store.save(self.cached_item):
+                        # a newer copy of the list was saved while the changes were loading
+                        return
+                else:
+                    cache_store.touch(self.cached_item.url_hash, self.cached_item.date_last_used, checked)
+                    cache_store.put_memory(self.cached_item)
+                self.refresh_container(home_window, diff)
+                log.debug("CacheManagerThread : Exited")
+                return
 
-            if isinstance(results, dict) and results.get("Items") is not None:
-                results = results.get("Items", [])
-            elif isinstance(results, list) and len(results) > 0 and results[0].get("Items") is not None:
-                results = results[0].get("Items")
+            # the validators of a response that was cut off must not be kept with the cached list
+            validators = dict(self.cached_item.validators or {})
 
-            total_records = 0
-            if isinstance(results, dict):
-                total_records = results.get("TotalRecordCount", 0)
+            data_manager = DataManager()
+            version = time.time()
+            loaded_items, total_records = data_manager.load_item_list(self.cached_item.items_url,
+                                                                      self.gui_options,
+                                                                      validators)
+            if validators.get("failed"):
+                log.debug("CacheManagerThread : Reloading the list failed, keeping the cached list")
+                return
+            self.cached_item.validators = validators
 
-            loaded_items = []
-            for item in results:
-                item_data = extract_item_info(item, self.gui_options)
-                loaded_items.append(item_data)
+            # the server says nothing changed so there is nothing to parse or compare
+            if validators.get("not_modified"):
+                log.debug("CacheManagerThread : Server returned 304 Not Modified")
+                self.cached_item.date_last_used = time.time()
+                self.cached_item.date_checked = version
+                cache_store.touch(self.cached_item.url_hash, self.cached_item.date_last_used, version)
+                cache_store.put_memory(self.cached_item)
+                log.debug("CacheManagerThread : Exited")
+                return
 
             if loaded_items is None or len(loaded_items) == 0:
                 log.debug("CacheManagerThread : loaded_items is None or Empty so not saving it")
                 return
 
-            loaded_hash = self.get_data_hash(loaded_items)
-            log.debug("CacheManagerThread : Loaded Hash : {0}", loaded_hash)
-
-            # if they dont match then save the data and trigger a content reload
-            if cached_hash != loaded_hash:
-                log.debug("CacheManagerThread : Hashes different, saving new data and reloading container")
-
-                self.cached_item.item_list = loaded_items
-                self.cached_item.item_list_hash = loaded_hash
-                self.cached_item.last_action = "fresh_data"
-                self.cached_item.date_saved = time.time()
-                self.cached_item.date_last_used = time.time()
-                self.cached_item.total_records = total_records
-
-                # we need to refresh but will wait until the main function has finished
-                loops = self.wait_for_save(home_window, self.cached_item.file_path)
+            loaded_ids = [item.id for item in loaded_items]
+            loaded_hashes = [self.get_item_hash(item) for item in loaded_items]
 
-                with open(self.cached_item.file_path, 'wb') as handle:
-                    cPickle.dump(self.cached_item, handle, protocol=cPickle.HIGHEST_PROTOCOL)
+            if self.cached_item.item_ids is not None and self.cached_item.item_hashes is not None:
+                diff = get_item_diff(self.cached_item.item_ids, self.cached_item.item_hashes, loaded_ids, loaded_hashes)
+            else:
+                # cached before the item ids were kept, treat every item as changed
+                diff = {"added": [], "removed": [], "changed": loaded_ids, "moved": False}
+
+            self.cached_item.item_list = loaded_items
+            self.cached_item.item_ids = loaded_ids
+            self.cached_item.item_hashes = loaded_hashes
+            self.cached_item.item_list_hash = self.get_data_hash(loaded_hashes)
+            self.cached_item.sync_date = get_sync_date(validators)
+            self.cached_item.date_saved = time.time()
+            self.cached_item.date_last_used = time.time()
+            self.cached_item.total_records = total_records
+            self.cached_item.version = version
+            self.cached_item.date_checked = version
+            self.cached_item.baseline_itemname = loaded_items[0].baseline_itemname
+            # the refresh loads this again inside the ttl so it is not checked again then
+            self.cached_item.last_action = "cached_data"
 
-                home_window.clearProperty(self.cached_item.file_path)
-                log.debug("CacheManagerThread : Sending container refresh ({0})", loops)
-                xbmc.executebuiltin("Container.Refresh")
+            if not cache_store.save(self.cached_item):
+                log.debug("CacheManagerThread : A newer list was saved while reloading, not refreshing")
+                return
+            log.debug("CacheManagerThread : Saved reloaded list")
 
-            else:
-                self.cached_item.date_last_used = time.time()
-                loops = self.wait_for_save(home_window, self.cached_item.file_path)
-                with open(self.cached_item.file_path, 'wb') as handle:
-                    cPickle.dump(self.cached_item, handle, protocol=cPickle.HIGHEST_PROTOCOL)
-                log.debug("CacheManagerThread : Updating last used date for cache data ({0})", loops)
-                home_window.clearProperty(self.cached_item.file_path)
+            self.refresh_container(home_window, diff)
 
         log.debug("CacheManagerThread : Exited")
 
@@ -280,56 +702,8 @@ class CacheManagerThread(threading.Thread):
 def clear_cached_server_data():
     log.debug("clear_cached_server_data() called")
 
-    addon_dir = xbmc.translatePath(xbmcaddon.Addon().getAddonInfo('profile'))
-    dirs, files = xbmcvfs.listdir(addon_dir)
-
-    del_count = 0
-    for filename in files:
-        if filename.startswith("cache_") and filename.endswith(".pickle"):
-            log.debug("Deleteing CacheFile: {0}", filename)
-            xbmcvfs.delete(os.path.join(addon_dir, filename))
-            del_count += 1
+    del_count = get_cache_store().clear_all()
 
     msg = string_load(30394) % del_count
     xbmcgui.Dialog().ok(string_load(30393), msg)
 
-
-def clear_old_cache_data():
-    log.debug("clear_old_cache_data() : called")
-
-    addon_dir = xbmc.translatePath(xbmcaddon.Addon().getAddonInfo('profile'))
-    dirs, files = xbmcvfs.listdir(addon_dir)
-
-    del_count = 0
-    for filename in files:
-        if filename.startswith("cache_") and filename.endswith(".pickle"):
-            log.debug("clear_old_cache_data() : Checking CacheFile : {0}", filename)
-
-            cache_item = None
-            for x in range(0, 5):
-                try:
-                    with open(os.path.join(addon_dir, filename), 'rb') as handle:
-                        cache_item = cPickle.load(handle)
-                    break
-                except Exception as error:
-                    log.debug("clear_old_cache_data() : Pickle load error : {0}", error)
-                    cache_item = None
-                    xbmc.sleep(1000)
-
-            if cache_item is not None:
-                item_last_used = -1
-                if cache_item.date_last_used is not None:
-                    item_last_used = time.time() - cache_item.date_last_used
-
-                log.debug("clear_old_cache_data() : Cache item last used : {0} sec ago", item_last_used)
-                if item_last_used == -1 or item_last_used > (3600 * 24 * 7):
-                    log.debug("clear_old_cache_data() : Deleting cache item age : {0}", item_last_used)
-                    xbmcvfs.delete(os.path.join(addon_dir, filename))
-                    del_count += 1
-            else:
-                log.debug("clear_old_cache_data() : Deleting unloadable cache item")
-                xbmcvfs.delete(os.path.join(addon_dir, filename))
-
-    log.debug("clear_old_cache_data() : Cache items deleted : {0}", del_count)
-
-
@@ -1,6 +1,5 @@
 # Gnu General Public License - see LICENSE.TXT
 
-import xbmcaddon
 import xbmcplugin
 import xbmcgui
 import xbmc
@@ -10,13 +9,13 @@ import sys
 import re
 
 from .datamanager import DataManager
-from .kodi_utils import HomeWindow
 from .downloadutils import DownloadUtils
 from .translation import string_load
 from .simple_logging import SimpleLogging
 from .item_functions import add_gui_item, extract_item_info, ItemDetails
 from .utils import getArt, send_event_notification
 from .tracking import timer
+from .settings_snapshot import get_settings
 
 log = SimpleLogging(__name__)
 
@@ -34,7 +33,7 @@ def getContent(url, params):
     log.debug("MediaType: {0}", media_type)
     pluginhandle = int(sys.argv[1])
 
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     # determine view type, map it from media type to view type
     view_type = ""
     content_type = ""
@@ -215,7 +214,7 @@ def processDirectory(url, progress, params, use_cache_data=False):
     log.debug("== ENTER: processDirectory ==")
 
     dataManager = DataManager()
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     downloadUtils = DownloadUtils()
     server = downloadUtils.getServer()
 
@@ -237,7 +236,7 @@ def processDirectory(url, progress, params, use_cache_data=False):
     gui_options["name_format_type"] = name_format_type
 
     use_cache = settings.getSetting("use_cache") == "true" and use_cache_data
-    cache_file, item_list, total_records = dataManager.get_items(url, gui_options, use_cache)
+    item_list, total_records = dataManager.get_items(url, gui_options, use_cache)
 
     # flatten single season
     # if there is only one result and it is a season and you have flatten signle season turned on then
@@ -296,7 +295,7 @@ def processDirectory(url, progress, params, use_cache_data=False):
             detected_type = item_details.item_type
 
         if item_details.item_type == "Season" and first_season_item is None:
-            log.debug("Setting First Season to : {0}", item_details.__dict__)
+            log.debug("Setting First Season to : {0}", item_details)
             first_season_item = item_details
 
         total_unwatched += item_details.unwatched_episodes
@@ -342,7 +341,7 @@ def processDirectory(url, progress, params, use_cache_data=False):
                 if gui_item:
                     dir_items.append(gui_item)
             else:
-                log.debug("Dropping empty folder item : {0}", item_details.__dict__)
+                log.debug("Dropping empty folder item : {0}", item_details)
 
         elif item_details.item_type == "MusicArtist":
             u = ('{server}/emby/Users/{userid}/items' +
@@ -400,6 +399,4 @@ def processDirectory(url, progress, params, use_cache_data=False):
         if gui_item:
             dir_items.append(gui_item)
 
-    HomeWindow().clearProperty(cache_file)
-
     return dir_items, detected_type, total_records
\ No newline at end of file
@@ -2,26 +2,32 @@
 
 import xbmc
 import xbmcgui
-import xbmcaddon
 import xbmcvfs
 
+import os
+import errno
 import httplib
 import hashlib
 import ssl
-import StringIO
-import gzip
+import socket
+import threading
+import time
+import zlib
 import json
+import Queue
 from urlparse import urlparse
 import urllib
 from datetime import datetime
 from base64 import b64encode
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 
 from .kodi_utils import HomeWindow
 from .clientinfo import ClientInformation
 from .simple_logging import SimpleLogging
 from .translation import string_load
-from .tracking import timer
+from .tracking import timer, count_event, log_timing
+from .url_keys import canonical_url
+from .settings_snapshot import get_settings
 
 log = SimpleLogging(__name__)
 
@@ -57,7 +63,7 @@ def load_user_details(settings):
 
 def get_details_string():
 
-    addon_settings = xbmcaddon.Addon()
+    addon_settings = get_settings()
     include_media = addon_settings.getSetting("include_media") == "true"
     include_people = addon_settings.getSetting("include_people") == "true"
     include_overview = addon_settings.getSetting("include_overview") == "true"
@@ -96,12 +102,621 @@ def get_details_string():
     return ",".join(filer_list)
 
 
+class ConnectError(socket.error):
+    """
+        The connection to the server could not be made, raised by HttpConnectionPool
+        in place of the socket.error or socket.timeout of the connect
+    """
+    pass
+
+
+class HttpConnectionPool():
+    """
+        Keep-alive connections shared by all DownloadUtils instances in this process,
+        keyed by (scheme, host, port, verify_cert)
+    """
+    max_idle_per_key = 4
+    max_idle_time = 60
+    # the methods a request is sent again for when a reused socket fails after it was written
+    retry_methods = ("GET", "HEAD", "DELETE")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.stats = {"hits": 0, "misses": 0, "handshakes": 0, "stale": 0}
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def new_connection(self, key, http_timeout):
+        scheme, host_name, port, verify_cert = key
+        server = "%s:%s" % (host_name, port)
+        if scheme == "https" and verify_cert:
+            log.debug("Connection: HTTPS, Cert checked")
+            return httplib.HTTPSConnection(server, timeout=http_timeout)
+        elif scheme == "https":
+            log.debug("Connection: HTTPS, Cert NOT checked")
+            return httplib.HTTPSConnection(server, timeout=http_timeout, context=ssl._create_unverified_context())
+        else:
+            log.debug("Connection: HTTP")
+            return httplib.HTTPConnection(server, timeout=http_timeout)
+
+    def get_connection(self, key, http_timeout):
+        conn = None
+        with self.lock:
+            idle_list = self.idle.get(key, [])
+            while idle_list and conn is None:
+                conn, released = idle_list.pop()
+                if (time.time() - released) > self.max_idle_time:
+                    self.close(conn)
+                    conn = None
+            if conn is not None:
+                self.stats["hits"] += 1
+            else:
+                self.stats["misses"] += 1
+
+        if conn is None:
+            return self.new_connection(key, http_timeout), False
+
+        conn.timeout = http_timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(http_timeout)
+        return conn, True
+
+    def release(self, key, conn):
+        with self.lock:
+            idle_list = self.idle.setdefault(key, [])
+            if len(idle_list) < self.max_idle_per_key:
+                idle_list.append((conn, time.time()))
+                return
+        self.close(conn)
+
+    @staticmethod
+    def close(conn):
+        try:
+            conn.close()
+        except:
+            pass
+
+    def clear(self):
+        with self.lock:
+            for idle_list in self.idle.values():
+                for conn, released in idle_list:
+                    self.close(conn)
+            self.idle = {}
+
+    def write_request(self, conn, method, url, body, headers):
+        if conn.sock is None:
+            try:
+                conn.connect()
+            except socket.error as error:
+                raise ConnectError(*error.args)
+            with self.lock:
+                self.stats["handshakes"] += 1
+        conn.request(method=method, url=url, body=body, headers=headers)
+
+    def send_request(self, conn, method, url, body, headers):
+        self.write_request(conn, method, url, body, headers)
+        return conn.getresponse()
+
+    def request(self, key, http_timeout, method, url, body, headers):
+        conn, reused = self.get_connection(key, http_timeout)
+        try:
+            self.write_request(conn, method, url, body, headers)
+        except socket.timeout:
+            self.close(conn)
+            raise
+        except (httplib.HTTPException, socket.error) as error:
+            # nothing reached the server, it is safe to send any method again
+            self.close(conn)
+            if not reused:
+                raise
+            self.log_stale(key, error)
+            return self.request_new(key, http_timeout, method, url, body, headers)
+
+        try:
+            return conn, conn.getresponse()
+        except socket.timeout:
+            self.close(conn)
+            raise
+        except (httplib.HTTPException, socket.error) as error:
+            self.close(conn)
+            # the server may have got the request before it dropped the socket,
+            # only send it again when doing it twice does no harm
+            if not reused or method not in self.retry_methods:
+                raise
+            self.log_stale(key, error)
+            return self.request_new(key, http_timeout, method, url, body, headers)
+
+    def log_stale(self, key, error):
+        # the server dropped the idle socket, reconnect and send it again
+        log.debug("HttpConnectionPool : stale connection {0} : {1}", key, error)
+        with self.lock:
+            self.stats["stale"] += 1
+
+    def request_new(self, key, http_timeout, method, url, body, headers):
+        conn = self.new_connection(key, http_timeout)
+        try:
+            return conn, self.send_request(conn, method, url, body, headers)
+        except:
+            self.close(conn)
+            raise
+
+
+connection_pool = HttpConnectionPool()
+
+
+class CircuitBreaker():
+    """
+        Stops every process from waiting out the http timeout when the server is down,
+        after failure_threshold failed connects in a row requests fail straight away
+        until a probe of the public system info gets through, the probes back off exponentially
+        the state lives in home window properties for each host:port so a newly entered server is not held back
+        by the old one, server_offline is set to true for skins to use
+    """
+    failure_threshold = 3
+    min_backoff = 5
+    max_backoff = 300
+    probe_timeout = 5
+
+    @staticmethod
+    def server_name(pool_key):
+        scheme, host_name, port, verify_cert = pool_key
+        return "%s:%s" % (host_name, port)
+
+    def property_name(self, pool_key, name):
+        return "circuit_%s_%s" % (self.server_name(pool_key), name)
+
+    def set_server_open(self, pool_key, is_open):
+        """
+            keep the list of servers with an open breaker, server_offline is only cleared once none are left
+        """
+        home_window = HomeWindow()
+        open_servers = set(filter(None, home_window.getProperty("circuit_open_servers").split(",")))
+        if is_open:
+            open_servers.add(self.server_name(pool_key))
+        else:
+            open_servers.discard(self.server_name(pool_key))
+        home_window.setProperty("circuit_open_servers", ",".join(sorted(open_servers)))
+        if open_servers:
+            home_window.setProperty("server_offline", "true")
+        else:
+            home_window.clearProperty("server_offline")
+
+    def allow_request(self, pool_key):
+        home_window = HomeWindow()
+        if home_window.getProperty(self.property_name(pool_key, "offline")) != "true":
+            return True
+
+        now = time.time()
+        try:
+            retry_at = float(home_window.getProperty(self.property_name(pool_key, "retry_at")))
+            backoff = float(home_window.getProperty(self.property_name(pool_key, "backoff")))
+        except ValueError:
+            retry_at = 0
+            backoff = self.min_backoff
+
+        if now < retry_at:
+            count_event("circuit_fast_fail")
+            return False
+
+        # push the next retry out first so other processes keep failing fast while this one probes
+        backoff = min(backoff * 2, self.max_backoff)
+        home_window.setProperty(self.property_name(pool_key, "backoff"), str(backoff))
+        home_window.setProperty(self.property_name(pool_key, "retry_at"), str(now + backoff))
+
+        if self.probe(pool_key):
+            self.record_success(pool_key)
+            return True
+
+        log.debug("CircuitBreaker : server {0} still offline, next probe in {1} seconds", pool_key, backoff)
+        return False
+
+    def probe(self, pool_key):
+        count_event("circuit_probe")
+        try:
+            conn, response = connection_pool.request(pool_key, self.probe_timeout, "GET",
+                                                     "/emby/System/Info/Public?format=json", None, {})
+        except Exception as error:
+            log.debug("CircuitBreaker : probe failed : {0}", error)
+            return False
+        response.read()
+        if response.will_close:
+            connection_pool.close(conn)
+        else:
+            connection_pool.release(pool_key, conn)
+        return int(response.status) == 200
+
+    def record_success(self, pool_key):
+        home_window = HomeWindow()
+        if not home_window.getProperty(self.property_name(pool_key, "failures")):
+            return
+        if home_window.getProperty(self.property_name(pool_key, "offline")) == "true":
+            log.info("CircuitBreaker : server {0} is back online", pool_key)
+            self.set_server_open(pool_key, False)
+        for name in ("failures", "offline", "retry_at", "backoff"):
+            home_window.clearProperty(self.property_name(pool_key, name))
+
+    def record_failure(self, pool_key):
+        home_window = HomeWindow()
+        try:
+            failures = int(home_window.getProperty(self.property_name(pool_key, "failures"))) + 1
+        except ValueError:
+            failures = 1
+        home_window.setProperty(self.property_name(pool_key, "failures"), str(failures))
+
+        if failures >= self.failure_threshold and home_window.getProperty(self.property_name(pool_key, "offline")) != "true":
+            log.info("CircuitBreaker : {0} failed connects, server {1} marked offline", failures, pool_key)
+            count_event("circuit_open")
+            home_window.setProperty(self.property_name(pool_key, "backoff"), str(self.min_backoff))
+            home_window.setProperty(self.property_name(pool_key, "retry_at"), str(time.time() + self.min_backoff))
+            home_window.setProperty(self.property_name(pool_key, "offline"), "true")
+            self.set_server_open(pool_key, True)
+
+
+circuit_breaker = CircuitBreaker()
+
+
+class FlightLeader():
+    """
+        Held by the request that is doing the fetch for a url, the body is kept in memory
+        and only written to the flight dir once another process has said it is waiting for it,
+        finish() with ok moves it into place for the waiters
+    """
+    # past this much body nobody gets it from this flight, a waiter that comes later fetches it itself
+    max_buffer_size = 4 * 1024 * 1024
+    check_interval = 0.2
+
+    def __init__(self, flight, lock_path, body_path, waiting_path, owner):
+        self.flight = flight
+        self.lock_path = lock_path
+        self.body_path = body_path
+        self.waiting_path = waiting_path
+        self.owner = owner
+        self.temp_path = "%s.%s" % (body_path, owner)
+        self.temp_file = None
+        self.headers = None
+        self.chunks = []
+        self.buffer_size = 0
+        self.checked = 0
+
+    def write_headers(self, headers):
+        self.headers = headers
+        self.checked = time.time()
+        if os.path.exists(self.waiting_path):
+            self.spill()
+
+    def write(self, chunk):
+        if self.temp_file is not None:
+            self.temp_file.write(chunk)
+            return
+        if self.chunks is None:
+            return
+        self.chunks.append(chunk)
+        self.buffer_size += len(chunk)
+        if self.buffer_size > self.max_buffer_size:
+            log.debug("SingleFlight : body too big to share {0}", self.body_path)
+            self.chunks = None
+            return
+        now = time.time()
+        if now - self.checked > self.check_interval:
+            self.checked = now
+            if os.path.exists(self.waiting_path):
+                self.spill()
+
+    def spill(self):
+        # a waiter turned up, write what has been read so far and the rest as it comes
+        if self.headers is None or self.chunks is None:
+            return
+        try:
+            self.temp_file = open(self.temp_path, "wb")
+            self.temp_file.write(json.dumps(self.headers) + "\n")
+            for chunk in self.chunks:
+                self.temp_file.write(chunk)
+        except (IOError, OSError) as error:
+            log.debug("SingleFlight : can not write {0} : {1}", self.temp_path, error)
+            self.temp_file = None
+        self.chunks = None
+
+    def is_owner(self):
+        # a waiter takes over a lock it thinks is stale, that lock is not this leader's to remove
+        try:
+            with open(self.lock_path, "rb") as lock_file:
+                return lock_file.read() == self.owner
+        except (IOError, OSError):
+            return False
+
+    def finish(self, ok):
+        if ok and self.temp_file is None and os.path.exists(self.waiting_path):
+            self.spill()
+        spilled = self.temp_file is not None
+        try:
+            if self.temp_file is not None:
+                self.temp_file.close()
+                if ok and self.is_owner():
+                    if os.path.exists(self.body_path):
+                        os.remove(self.body_path)
+                    os.rename(self.temp_path, self.body_path)
+                else:
+                    os.remove(self.temp_path)
+        except OSError as error:
+            log.debug("SingleFlight : can not save {0} : {1}", self.body_path, error)
+        finally:
+            self.temp_file = None
+            self.chunks = None
+            if self.is_owner():
+                for path in (self.waiting_path, self.lock_path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+        if spilled:
+            self.flight.clean_up()
+
+
+class SingleFlight():
+    """
+        Coalesces identical GET requests made at the same moment by different plugin processes,
+        the first one takes a lock file in the profile dir and fetches the url,
+        the others say they are waiting, wait for the lock to go and then read the body it left behind
+        the key is the url and the user and token it is asked for with, so users do not share responses
+    """
+    wait_step = 0.05
+    body_max_age = 60
+
+    def __init__(self):
+        self.flight_dir = None
+
+    def get_flight_dir(self):
+        if self.flight_dir is None:
+            profile_dir = xbmc.translatePath(get_settings().getAddonInfo('profile'))
+            flight_dir = os.path.join(profile_dir, "inflight")
+            if not os.path.isdir(flight_dir):
+                try:
+                    os.makedirs(flight_dir)
+                except OSError as error:
+                    if error.errno != errno.EEXIST:
+                        raise
+            self.flight_dir = flight_dir
+        return self.flight_dir
+
+    def start(self, url, auth_key, http_timeout):
+        """
+            returns (shared, leader), shared is (headers, body) fetched by another request,
+            leader is a FlightLeader when this request has to do the fetch, both are None if neither works out
+        """
+        try:
+            flight_dir = self.get_flight_dir()
+        except OSError as error:
+            log.debug("SingleFlight : no flight dir : {0}", error)
+            return None, None
+
+        key = url + "|" + auth_key
+        key = hashlib.md5(key.encode("utf-8") if isinstance(key, unicode) else key).hexdigest()
+        lock_path = os.path.join(flight_dir, key + ".lock")
+        body_path = os.path.join(flight_dir, key + ".body")
+        waiting_path = os.path.join(flight_dir, key + ".waiting")
+        owner = "%s.%s.%s" % (os.getpid(), threading.current_thread().ident, os.urandom(6).encode("hex"))
+
+        for attempt in range(2):
+            try:
+                lock_file = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except OSError as error:
+                if error.errno != errno.EEXIST:
+                    log.debug("SingleFlight : can not create lock {0} : {1}", lock_path, error)
+                    return None, None
+            else:
+                try:
+                    os.write(lock_file, owner)
+                finally:
+                    os.close(lock_file)
+                # a body or waiter left from an older flight is not for this one
+                for path in (body_path, waiting_path):
+                    if os.path.exists(path):
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                return None, FlightLeader(self, lock_path, body_path, waiting_path, owner)
+
+            try:
+                open(waiting_path, "ab").close()
+            except (IOError, OSError) as error:
+                log.debug("SingleFlight : can not wait for {0} : {1}", lock_path, error)
+                return None, None
+
+            if not self.wait_for_lock(lock_path, http_timeout):
+                continue
+
+            shared = self.read_body(body_path)
+            if shared is not None:
+                count_event("single_flight_shared", url)
+                return shared, None
+
+        return None, None
+
+    def wait_for_lock(self, lock_path, http_timeout):
+        """
+            wait for the leader to finish, a lock older than the http timeout is left by a dead process and removed
+        """
+        while True:
+            try:
+                lock_age = time.time() - os.path.getmtime(lock_path)
+            except OSError:
+                return True
+            if lock_age > http_timeout + 5:
+                log.debug("SingleFlight : removing stale lock {0}", lock_path)
+                try:
+                    os.remove(lock_path)
+                except OSError:
+                    pass
+                return False
+            if xbmc.abortRequested:
+                return False
+            time.sleep(self.wait_step)
+
+    def read_body(self, body_path):
+        try:
+            with open(body_path, "rb") as body_file:
+                headers = json.loads(body_file.readline())
+                body = body_file.read()
+        except (IOError, OSError, ValueError):
+            return None
+        return headers, body
+
+    def clean_up(self):
+        """
+            remove bodies no waiter is going to read any more
+        """
+        flight_dir = self.flight_dir
+        if flight_dir is None:
+            return
+        now = time.time()
+        try:
+            for filename in os.listdir(flight_dir):
+                file_path = os.path.join(flight_dir, filename)
+                max_age = self.body_max_age
+                if not filename.endswith(".body"):
+                    # locks and temp files of a fetch that might still be running
+                    max_age = 3600
+                if (now - os.path.getmtime(file_path)) > max_age:
+                    os.remove(file_path)
+        except OSError:
+            pass
+
+
+single_flight = SingleFlight()
+
+
+class RequestFuture():
+    """
+        The result of a call handed to the RequestExecutor,
+        result() waits for it and gives up if Kodi is shutting down
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.finished = threading.Event()
+        self.started = False
+        self.cancelled = False
+        self.value = None
+        self.error = None
+
+    def done(self):
+        return self.finished.is_set()
+
+    def cancel(self):
+        # only calls still waiting in the queue can be cancelled
+        if self.started:
+            return False
+        self.cancelled = True
+        self.finished.set()
+        return True
+
+    def set_result(self, value, error):
+        self.value = value
+        self.error = error
+        self.finished.set()
+
+    def result(self, timeout=None):
+        started = time.time()
+        while not self.finished.wait(0.1):
+            if xbmc.abortRequested:
+                log.debug("RequestFuture : abort requested, cancelling {0}", self.name)
+                request_executor.cancel_all()
+                self.cancel()
+                return None
+            if timeout is not None and (time.time() - started) > timeout:
+                log.debug("RequestFuture : timed out waiting for {0}", self.name)
+                return None
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class RequestExecutor():
+    """
+        A few worker threads shared by this process for running independent server calls side by side,
+        submit() returns a RequestFuture, the workers are only started on first use
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queue = Queue.Queue()
+        self.workers = []
+
+    def start_workers(self):
+        with self.lock:
+            if self.workers:
+                return
+            try:
+                worker_count = int(get_settings().getSetting("request_threads"))
+            except ValueError:
+                worker_count = 4
+            worker_count = max(1, worker_count)
+            log.debug("RequestExecutor : starting {0} workers", worker_count)
+            for index in range(worker_count):
+                worker = threading.Thread(target=self.run_worker, name="RequestExecutor-%s" % index)
+                worker.daemon = True
+                worker.start()
+                self.workers.append(worker)
+
+    def submit(self, func, *args, **kwargs):
+        self.start_workers()
+        future = RequestFuture(func.__name__)
+        self.queue.put((future, func, args, kwargs))
+        return future
+
+    def map(self, func, values):
+        futures = [self.submit(func, value) for value in values]
+        return [future.result() for future in futures]
+
+    def cancel_all(self):
+        while True:
+            try:
+                future, func, args, kwargs = self.queue.get_nowait()
+            except Queue.Empty:
+                return
+            future.cancel()
+
+    def run_worker(self):
+        while True:
+            future, func, args, kwargs = self.queue.get()
+            if future.cancelled:
+                continue
+            future.started = True
+            value = None
+            error = None
+            started = time.time()
+            try:
+                value = func(*args, **kwargs)
+            except Exception as err:
+                log.error("RequestExecutor : {0} failed : {1}", future.name, err)
+                error = err
+            ended = time.time()
+            log.debug("RequestExecutor : {0} took {1:.3f}", future.name, ended - started)
+            log_timing(future.name, started, ended, "executor")
+            future.set_result(value, error)
+
+
+request_executor = RequestExecutor()
+
+# request headers for one user and token, rebuilt when either of them changes
+AuthContext = namedtuple("AuthContext", ["user_id", "token", "device_name", "headers"])
+auth_context = None
+public_auth_context = None
+
+# the artwork url templates keyed by server and suffix, see DownloadUtils.get_artwork_template()
+artwork_templates = {}
+
+
 class DownloadUtils:
     use_https = False
     verify_cert = False
 
     def __init__(self, *args):
-        settings = xbmcaddon.Addon()
+        settings = get_settings()
 
         self.use_https = False
         if settings.getSetting('protocol') == "1":
@@ -277,7 +892,7 @@ class DownloadUtils:
         return play_info_result
 
     def getServer(self):
-        settings = xbmcaddon.Addon()
+        settings = get_settings()
         host = settings.getSetting('ipaddress')
 
         if len(host) == 0 or host == "<none>":
@@ -347,38 +962,75 @@ class DownloadUtils:
 
         return all_art
 
-    def getArtwork(self, data, art_type, parent=False, index=0, server=None):
+    def getArtwork(self, data, art_type, parent=False, index=0, server=None, art_urls=None):
+        """
+            art_urls is a dict of the urls already made for this server, an image that is asked for
+            again, by another art key or another item of the same series, gets the same string
+        """
 
-        id = data["Id"]
-        item_type = data["Type"]
+        source = self.get_artwork_source(data, art_type, parent, index)
+        if source is None:
+            return ""
+        id, imageTag = source
+
+        url_args = (id, art_type, index, imageTag)
+        if art_urls is not None:
+            artwork = art_urls.get(url_args)
+            if artwork is not None:
+                return artwork
+
+        artwork = self.get_artwork_template(server) % url_args
+
+        # log.debug("getArtwork: request:{0} item:{1} parent:{2} link:{3}", art_type, item_type, parent, artwork)
+
+        '''
+        # do not return non-existing images
+        if (    (art_type != "Backdrop" and imageTag == "") |
+                (art_type == "Backdrop" and data.get("BackdropImageTags") != None and len(data.get("BackdropImageTags")) == 0) |
+                (art_type == "Backdrop" and data.get("BackdropImageTag") != None and len(data.get("BackdropImageTag")) == 0)
+                ):
+            artwork = ''
+        '''
+
+        if art_urls is not None:
+            art_urls[url_args] = artwork
+        return artwork
+
+    def get_artwork_source(self, data, art_type, parent=False, index=0):
+        """
+            the (image item id, image tag) getArtwork() makes the url from, None when there is no image
+        """
+
+        id = data.get("Id")
+        item_type = data.get("Type")
 
         if item_type in ["Episode", "Season"]:
             if art_type != "Primary" or parent == True:
-                id = data["SeriesId"]
+                id = data.get("SeriesId")
 
         imageTag = ""
         # "e3ab56fe27d389446754d0fb04910a34" # a place holder tag, needs to be in this format
 
         # for episodes always use the parent BG
         if item_type == "Episode" and art_type == "Backdrop":
-            id = data["ParentBackdropItemId"]
-            bgItemTags = data["ParentBackdropImageTags"]
+            id = data.get("ParentBackdropItemId")
+            bgItemTags = data.get("ParentBackdropImageTags")
             if bgItemTags is not None and len(bgItemTags) > 0:
                 imageTag = bgItemTags[0]
         elif art_type == "Backdrop" and parent is True:
-            id = data["ParentBackdropItemId"]
-            bgItemTags = data["ParentBackdropImageTags"]
+            id = data.get("ParentBackdropItemId")
+            bgItemTags = data.get("ParentBackdropImageTags")
             if bgItemTags is not None and len(bgItemTags) > 0:
                 imageTag = bgItemTags[0]
         elif art_type == "Backdrop":
-            BGTags = data["BackdropImageTags"]
+            BGTags = data.get("BackdropImageTags")
             if BGTags is not None and len(BGTags) > index:
                 imageTag = BGTags[index]
                 # log.debug("Background Image Tag: {0}", imageTag)
         elif parent is False:
-            image_tags = data["ImageTags"]
+            image_tags = data.get("ImageTags")
             if image_tags is not None:
-                image_tag_type = image_tags[art_type]
+                image_tag_type = image_tags.get(art_type)
                 if image_tag_type is not None:
                     imageTag = image_tag_type
                     # log.debug("Image Tag: {0}", imageTag)
@@ -389,8 +1041,8 @@ class DownloadUtils:
             else:
                 tagName = 'Parent%sImageTag' % art_type
                 idName = 'Parent%sItemId' % art_type
-            parent_image_id = data[idName]
-            parent_image_tag = data[tagName]
+            parent_image_id = data.get(idName)
+            parent_image_tag = data.get(tagName)
             if parent_image_id is not None and parent_image_tag is not None:
                 id = parent_image_id
                 imageTag = parent_image_tag
@@ -399,25 +1051,26 @@ class DownloadUtils:
 
         if not imageTag and not ((art_type == 'Banner' or art_type == 'Art') and parent is True):  # ParentTag not passed for Banner and Art
             # log.debug("No Image Tag for request:{0} item:{1} parent:{2}", art_type, item_type, parent)
-            return ""
+            return None
 
-        artwork = "%s/emby/Items/%s/Images/%s/%s?Format=original&Tag=%s" % (server, id, art_type, index, imageTag)
+        return id, imageTag
 
+    def get_artwork_template(self, server):
+        """
+            the artwork url of the server as a template for (id, art type, index, tag),
+            the same url getArtwork() made with one % for each image
+        """
+        suffix = ""
         if self.use_https and not self.verify_cert:
-            artwork += "|verifypeer=false"
+            suffix = "|verifypeer=false"
 
-        # log.debug("getArtwork: request:{0} item:{1} parent:{2} link:{3}", art_type, item_type, parent, artwork)
-
-        '''
-        # do not return non-existing images
-        if (    (art_type != "Backdrop" and imageTag == "") |
-                (art_type == "Backdrop" and data.get("BackdropImageTags") != None and len(data.get("BackdropImageTags")) == 0) |
-                (art_type == "Backdrop" and data.get("BackdropImageTag") != None and len(data.get("BackdropImageTag")) == 0)
-                ):
-            artwork = ''
-        '''
-
-        return artwork
+        # a str and a unicode server are equal keys but do not make the same type of url
+        key = (server, type(server), suffix)
+        template = artwork_templates.get(key)
+        if template is None:
+            template = ("%s" % server).replace("%", "%%") + "/emby/Items/%s/Images/%s/%s?Format=original&Tag=%s" + suffix
+            artwork_templates[key] = template
+        return template
 
     def imageUrl(self, id, art_type, index, width, height, imageTag, server):
 
@@ -458,7 +1111,7 @@ class DownloadUtils:
             log.debug("EmbyCon DownloadUtils -> Returning saved UserID: {0}", userid)
             return userid
 
-        settings = xbmcaddon.Addon()
+        settings = get_settings()
         user_details = load_user_details(settings)
         user_name = user_details.get("username", "")
 
@@ -532,7 +1185,7 @@ class DownloadUtils:
             log.debug("EmbyCon DownloadUtils -> Returning saved AccessToken: {0}", token)
             return token
 
-        settings = xbmcaddon.Addon()
+        settings = get_settings()
         port = settings.getSetting("port")
         host = settings.getSetting("ipaddress")
         if host is None or host == "" or port is None or port == "":
@@ -576,16 +1229,16 @@ class DownloadUtils:
             WINDOW.setProperty("userimage", "")
             return ""
 
-    def getAuthHeader(self, authenticate=True):
+    def build_auth_context(self, user_id, token, authenticate):
         clientInfo = ClientInformation()
         txt_mac = clientInfo.getDeviceId()
         version = clientInfo.getVersion()
         client = clientInfo.getClient()
 
-        settings = xbmcaddon.Addon()
-        deviceName = settings.getSetting('deviceName')
+        settings = get_settings()
+        device_name_setting = settings.getSetting('deviceName')
         # remove none ascii chars
-        deviceName = deviceName.decode("ascii", errors='ignore')
+        deviceName = device_name_setting.decode("ascii", errors='ignore')
         # remove some chars not valid for names
         deviceName = deviceName.replace("\"", "_")
         if len(deviceName) == 0:
@@ -594,55 +1247,72 @@ class DownloadUtils:
         headers = {}
         headers["Accept-encoding"] = "gzip"
         headers["Accept-Charset"] = "UTF-8,*"
+        headers["User-Agent"] = "EmbyCon-" + version
 
         if (authenticate == False):
             authString = "MediaBrowser Client=\"" + client + "\",Device=\"" + deviceName + "\",DeviceId=\"" + txt_mac + "\",Version=\"" + version + "\""
             #headers["Authorization"] = authString
             headers['X-Emby-Authorization'] = authString
-            return headers
         else:
-            userid = self.getUserId()
-            authString = "MediaBrowser UserId=\"" + userid + "\",Client=\"" + client + "\",Device=\"" + deviceName + "\",DeviceId=\"" + txt_mac + "\",Version=\"" + version + "\""
+            authString = "MediaBrowser UserId=\"" + user_id + "\",Client=\"" + client + "\",Device=\"" + deviceName + "\",DeviceId=\"" + txt_mac + "\",Version=\"" + version + "\""
             #headers["Authorization"] = authString
             headers['X-Emby-Authorization'] = authString
 
-            authToken = self.authenticate()
-            if (authToken != ""):
-                headers["X-MediaBrowser-Token"] = authToken
+            if (token != ""):
+                headers["X-MediaBrowser-Token"] = token
 
-            log.debug("EmbyCon Authentication Header: {0}", headers)
-            return headers
+        return AuthContext(user_id, token, device_name_setting, headers)
 
-    @timer
-    def downloadUrl(self, url, suppress=False, postBody=None, method="GET", authenticate=True, headers=None):
-        log.debug("downloadUrl")
-
-        return_data = "null"
-        settings = xbmcaddon.Addon()
-        user_details = load_user_details(settings)
-        username = user_details.get("username", "")
-        server = None
-
-        http_timeout = int(settings.getSetting("http_timeout"))
+    def getAuthHeader(self, authenticate=True):
+        global auth_context
+        global public_auth_context
 
-        if authenticate and username == "":
-            return return_data
+        device_name = get_settings().getSetting('deviceName')
 
-        if settings.getSetting("suppressErrors") == "true":
-            suppress = True
+        if (authenticate == False):
+            context = public_auth_context
+            if context is None or context.device_name != device_name:
+                context = self.build_auth_context("", "", False)
+                public_auth_context = context
+            return dict(context.headers)
 
-        log.debug("Before: {0}", url)
+        # reuse the headers while the logged in user and token are unchanged
+        WINDOW = HomeWindow()
+        userid = WINDOW.getProperty("userid")
+        token = WINDOW.getProperty("AccessToken")
+        context = auth_context
+        if (context is not None
+                and userid and token
+                and context.user_id == userid
+                and context.token == token
+                and context.device_name == device_name
+                and WINDOW.getProperty("userimage")):
+            return dict(context.headers)
+
+        userid = self.getUserId()
+        authToken = self.authenticate()
+        context = self.build_auth_context(userid, authToken, True)
+        auth_context = context
+
+        log.debug("EmbyCon Authentication Header: {0}", context.headers)
+        return dict(context.headers)
+
+    def expand_url(self, url):
+        """
+            fill in the {server} {userid} etc place holders, returns None if one can not be filled
+        """
+        settings = get_settings()
 
         if url.find("{server}") != -1:
             server = self.getServer()
             if server is None:
-                return return_data
+                return None
             url = url.replace("{server}", server)
 
         if url.find("{userid}") != -1:
             userid = self.getUserId()
             if not userid:
-                return return_data
+                return None
             url = url.replace("{userid}", userid)
 
         if url.find("{ItemLimit}") != -1:
@@ -657,11 +1327,53 @@ class DownloadUtils:
             home_window = HomeWindow()
             random_movies = home_window.getProperty("random-movies")
             if not random_movies:
-                return return_data
+                return None
             url = url.replace("{random_movies}", random_movies)
 
+        return url
+
+    def get_url_key(self, url):
+        """
+            the url with the place holders filled in, in the canonical form used to key caches
+        """
+        expanded_url = self.expand_url(url)
+        if expanded_url is not None:
+            url = expanded_url
+        return canonical_url(url)
+
+    def show_error(self, msg, suppress):
+        if suppress is False and get_settings().getSetting("suppressErrors") != "true":
+            xbmcgui.Dialog().notification(string_load(30316),
+                                          msg,
+                                          icon="special://home/addons/plugin.video.embycon/icon.png")
+
+    def open_url(self, url, suppress, postBody, method, authenticate, validators=None):
+        """
+            send the request, returns (pool_key, conn, response) for a 200 response
+            the caller reads the body and then releases or closes the connection
+            validators holds the ETag and Last-Modified of the last response for this url,
+            it is sent as a conditional request and updated from the response along with the server date,
+            not_modified is set in it when the server answers 304
+        """
+        settings = get_settings()
+        user_details = load_user_details(settings)
+        username = user_details.get("username", "")
+        server = None
+
+        http_timeout = int(settings.getSetting("http_timeout"))
+
+        if authenticate and username == "":
+            return None
+
+        log.debug("Before: {0}", url)
+        url = self.expand_url(url)
+        if url is None:
+            return None
         log.debug("After: {0}", url)
 
+        conn = None
+        pool_key = None
+        keep_alive = False
         try:
 
             url_bits = urlparse(url.strip())
@@ -675,24 +1387,16 @@ class DownloadUtils:
             url_puery = url_bits.query
 
             if not host_name or host_name == "<none>":
-                return return_data
-
-            local_use_https = False
-            if protocol.lower() == "https":
-                local_use_https = True
+                return None
 
             server = "%s:%s" % (host_name, port)
             urlPath = url_path + "?" + url_puery
 
-            if local_use_https and self.verify_cert:
-                log.debug("Connection: HTTPS, Cert checked")
-                conn = httplib.HTTPSConnection(server, timeout=http_timeout)
-            elif local_use_https and not self.verify_cert:
-                log.debug("Connection: HTTPS, Cert NOT checked")
-                conn = httplib.HTTPSConnection(server, timeout=http_timeout, context=ssl._create_unverified_context())
-            else:
-                log.debug("Connection: HTTP")
-                conn = httplib.HTTPConnection(server, timeout=http_timeout)
+            pool_key = (protocol.lower(), host_name, port, self.verify_cert)
+
+            if not circuit_breaker.allow_request(pool_key):
+                log.debug("Server is offline, not requesting: {0}", url)
+                return None
 
             head = self.getAuthHeader(authenticate)
 
@@ -701,7 +1405,17 @@ class DownloadUtils:
                 userAndPass = b64encode(b"%s:%s" % (user_name, user_password)).decode("ascii")
                 head["Authorization"] = 'Basic %s' % userAndPass
 
-            head["User-Agent"] = "EmbyCon-" + ClientInformation().getVersion()
+            if validators is not None:
+                validators["not_modified"] = False
+                if validators.get("url") == url and (validators.get("etag") or validators.get("last_modified")):
+                    count_event("http_cache_hit", canonical_url(url))
+                    if validators.get("etag"):
+                        head["If-None-Match"] = validators.get("etag")
+                    if validators.get("last_modified"):
+                        head["If-Modified-Since"] = validators.get("last_modified")
+                else:
+                    count_event("http_cache_miss", canonical_url(url))
+
             log.debug("HEADERS: {0}", head)
 
             if postBody is not None:
@@ -715,33 +1429,35 @@ class DownloadUtils:
                 log.debug("Content-Type: {0}", content_type)
 
                 log.debug("POST DATA: {0}", postBody)
-                conn.request(method=method, url=urlPath, body=postBody, headers=head)
-            else:
-                conn.request(method=method, url=urlPath, headers=head)
 
-            data = conn.getresponse()
+            try:
+                conn, data = connection_pool.request(pool_key, http_timeout, method, urlPath, postBody, head)
+            except ConnectError:
+                # a slow or dropped response does not mean the server is down, only a failed connect does
+                circuit_breaker.record_failure(pool_key)
+                raise
+            circuit_breaker.record_success(pool_key)
             log.debug("HTTP response: {0} {1}", data.status, data.reason)
             log.debug("GET URL HEADERS: {0}", data.getheaders())
 
             if int(data.status) == 200:
-                retData = data.read()
-                contentType = data.getheader('content-encoding')
-                log.debug("Data Len Before: {0}", len(retData))
-                if (contentType == "gzip"):
-                    retData = StringIO.StringIO(retData)
-                    gzipper = gzip.GzipFile(fileobj=retData)
-                    return_data = gzipper.read()
-                else:
-                    return_data = retData
-                if headers is not None and isinstance(headers, dict):
-                    headers.update(data.getheaders())
-                log.debug("Data Len After: {0}", len(return_data))
-                log.debug("====== 200 returned =======")
-                log.debug("Content-Type: {0}", contentType)
-                log.debug("{0}", return_data)
-                log.debug("====== 200 finished ======")
+                if validators is not None:
+                    validators["url"] = url
+                    validators["etag"] = data.getheader("etag")
+                    validators["last_modified"] = data.getheader("last-modified")
+                    validators["server_date"] = data.getheader("date")
+                opened = (pool_key, conn, data)
+                conn = None
+                return opened
+
+            elif int(data.status) == 304 and validators is not None:
+                data.read()
+                log.debug("Not modified since last request: {0}", url)
+                count_event("http_cache_304", canonical_url(url))
+                validators["not_modified"] = True
 
             elif int(data.status) >= 400:
+                data.read()
 
                 if int(data.status) == 401:
                     # remove any saved password
@@ -753,23 +1469,177 @@ class DownloadUtils:
                     save_user_details(settings, "", "")
 
                 log.error("HTTP response error: {0} {1}", data.status, data.reason)
-                if suppress is False:
-                    xbmcgui.Dialog().notification(string_load(30316),
-                                                  string_load(30200) % str(data.reason),
-                                                  icon="special://home/addons/plugin.video.embycon/icon.png")
+                self.show_error(string_load(30200) % str(data.reason), suppress)
+
+            else:
+                data.read()
+
+            # the whole body has been read so the socket can go back to the pool
+            keep_alive = not data.will_close
 
         except Exception as msg:
             log.error("Unable to connect to {0} : {1}", server, msg)
-            if suppress is False:
-                xbmcgui.Dialog().notification(string_load(30316),
-                                              str(msg),
-                                              icon="special://home/addons/plugin.video.embycon/icon.png")
+            self.show_error(str(msg), suppress)
 
         finally:
-            try:
-                log.debug("Closing HTTP connection: {0}", conn)
-                conn.close()
-            except:
-                pass
+            if conn is not None:
+                self.release_connection(pool_key, conn, keep_alive)
+
+        return None
+
+    @staticmethod
+    def release_connection(pool_key, conn, keep_alive):
+        if keep_alive:
+            log.debug("Returning HTTP connection to pool: {0}", conn)
+            connection_pool.release(pool_key, conn)
+        else:
+            log.debug("Closing HTTP connection: {0}", conn)
+            connection_pool.close(conn)
+
+    @staticmethod
+    def read_body(response, chunk_size=65536):
+        """
+            yields the response body as it comes off the socket, gzip is decoded on the fly
+        """
+        decompressor = None
+        if response.getheader('content-encoding') == "gzip":
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        while True:
+            chunk = response.read(chunk_size)
+            if not chunk:
+                break
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk)
+            if chunk:
+                yield chunk
+
+        if decompressor is not None:
+            chunk = decompressor.flush()
+            if chunk:
+                yield chunk
+
+    def join_flight(self, url, method, postBody, validators, authenticate):
+        """
+            single flight for plain GET requests, see SingleFlight.start()
+        """
+        if method != "GET" or postBody is not None:
+            return None, None
+        if validators is not None and (validators.get("etag") or validators.get("last_modified")):
+            return None, None
+
+        url = self.expand_url(url)
+        if url is None:
+            return None, None
+
+        auth_key = ""
+        if authenticate:
+            home_window = HomeWindow()
+            auth_key = home_window.getProperty("userid") + "|" + home_window.getProperty("AccessToken")
+        shared, leader = single_flight.start(canonical_url(url), auth_key,
+                                             int(get_settings().getSetting("http_timeout")))
+        if shared is not None and validators is not None:
+            response_headers = dict(shared[0])
+            validators["not_modified"] = False
+            validators["url"] = url
+            validators["etag"] = response_headers.get("etag")
+            validators["last_modified"] = response_headers.get("last-modified")
+            validators["server_date"] = response_headers.get("date")
+        return shared, leader
+
+    @timer
+    def downloadUrl(self, url, suppress=False, postBody=None, method="GET", authenticate=True, headers=None):
+        log.debug("downloadUrl")
+
+        return_data = "null"
+
+        shared, leader = self.join_flight(url, method, postBody, None, authenticate)
+        if shared is not None:
+            log.debug("Using the response of a matching request: {0}", url)
+            response_headers, return_data = shared
+            if headers is not None and isinstance(headers, dict):
+                headers.update(response_headers)
+            return return_data
+
+        opened = self.open_url(url, suppress, postBody, method, authenticate)
+        if opened is None:
+            if leader is not None:
+                leader.finish(False)
+            return return_data
+
+        pool_key, conn, data = opened
+        keep_alive = False
+        flight_ok = False
+        try:
+            return_data = "".join(self.read_body(data))
+            if leader is not None:
+                leader.write_headers(data.getheaders())
+                leader.write(return_data)
+                flight_ok = True
+            if headers is not None and isinstance(headers, dict):
+                headers.update(data.getheaders())
+            log.debug("Data Len After: {0}", len(return_data))
+            log.debug("====== 200 returned =======")
+            log.debug("Content-Type: {0}", data.getheader('content-encoding'))
+            log.debug("{0}", return_data)
+            log.debug("====== 200 finished ======")
+            keep_alive = not data.will_close
+
+        except Exception as msg:
+            log.error("Unable to read response from {0} : {1}", pool_key, msg)
+            if validators is not None:
+                validators["failed"] = True
+            self.show_error(str(msg), suppress)
+
+        finally:
+            self.release_connection(pool_key, conn, keep_alive)
+            if leader is not None:
+                leader.finish(flight_ok)
 
         return return_data
+
+    def stream_url(self, url, suppress=False, authenticate=True, validators=None):
+        """
+            GET the url and yield the decoded body in chunks, nothing is yielded if the request fails
+            or the server answers 304 to the validators
+            validators["failed"] is set when the body could not be read to its end
+        """
+        log.debug("stream_url")
+        if validators is not None:
+            validators["failed"] = False
+
+        shared, leader = self.join_flight(url, "GET", None, validators, authenticate)
+        if shared is not None:
+            log.debug("Using the response of a matching request: {0}", url)
+            yield shared[1]
+            return
+
+        opened = self.open_url(url, suppress, None, "GET", authenticate, validators)
+        if opened is None:
+            if leader is not None:
+                leader.finish(False)
+            return
+
+        pool_key, conn, data = opened
+        keep_alive = False
+        flight_ok = False
+        try:
+            if leader is not None:
+                leader.write_headers(data.getheaders())
+            for chunk in self.read_body(data):
+                if leader is not None:
+                    leader.write(chunk)
+                yield chunk
+            keep_alive = not data.will_close
+            flight_ok = True
+
+        except Exception as msg:
+            log.error("Unable to read response from {0} : {1}", pool_key, msg)
+            if validators is not None:
+                validators["failed"] = True
+            self.show_error(str(msg), suppress)
+
+        finally:
+            self.release_connection(pool_key, conn, keep_alive)
+            if leader is not None:
+                leader.finish(flight_ok)
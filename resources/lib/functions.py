@@ -11,14 +11,13 @@ import StringIO
 
 import xbmcplugin
 import xbmcgui
-import xbmcaddon
 import xbmc
 
-from .downloadutils import DownloadUtils, load_user_details
+from .downloadutils import DownloadUtils, load_user_details, connection_pool, request_executor
 from .utils import getArt, send_event_notification, convert_size
 from .kodi_utils import HomeWindow
 from .clientinfo import ClientInformation
-from .datamanager import DataManager, clear_cached_server_data
+from .datamanager import DataManager, clear_cached_server_data, update_cached_user_data
 from .server_detect import checkServer
 from .simple_logging import SimpleLogging
 from .menu_functions import displaySections, display_main_menu, display_menu, show_movie_alpha_list, show_tvshow_alpha_list, show_genre_list, show_search, show_movie_pages
@@ -32,10 +31,10 @@ from .cache_images import CacheArtwork
 from .dir_functions import getContent, processDirectory
 from .tracking import timer
 from .skin_cloner import clone_default_skin
+from .settings_snapshot import get_settings
 
-__addon__ = xbmcaddon.Addon()
-__addondir__ = xbmc.translatePath(__addon__.getAddonInfo('profile'))
-__cwd__ = __addon__.getAddonInfo('path')
+__addondir__ = xbmc.translatePath(get_settings().getAddonInfo('profile'))
+__cwd__ = get_settings().getAddonInfo('path')
 PLUGINPATH = xbmc.translatePath(os.path.join(__cwd__))
 
 log = SimpleLogging(__name__)
@@ -50,7 +49,7 @@ dataManager = DataManager()
 def mainEntryPoint():
     log.debug("===== EmbyCon START =====")
 
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     profile_count = int(settings.getSetting('profile_count'))
     pr = None
     if profile_count > 0:
@@ -121,7 +120,7 @@ def mainEntryPoint():
     elif mode == "CLONE_SKIN":
         clone_default_skin()
     elif mode == "SHOW_SETTINGS":
-        __addon__.openSettings()
+        get_settings().openSettings()
         WINDOW = xbmcgui.getCurrentWindowId()
         if WINDOW == 10000:
             log.debug("Currently in home - refreshing to allow new settings to be taken")
@@ -185,6 +184,7 @@ def mainEntryPoint():
         with open(tabFileName, 'wb') as f:
             f.write(s.getvalue())
 
+    log.debug("Connection pool stats: {0}", connection_pool.get_stats())
     log.debug("===== EmbyCon FINISHED =====")
 
 
@@ -235,16 +235,32 @@ def toggle_watched(params):
         markUnwatched(item_id)
 
 
+def update_cached_item(item_id, response):
+    """
+        put the UserData returned by a watched or favorite change into the cached lists,
+        returns False if the response had none
+    """
+    try:
+        user_data = json.loads(response)
+    except ValueError:
+        user_data = None
+    if not isinstance(user_data, dict):
+        return False
+    update_cached_user_data(downloadUtils.getUserId(), item_id, user_data)
+    return True
+
+
 def markWatched(item_id):
     log.debug("Mark Item Watched: {0}", item_id)
     url = "{server}/emby/Users/{userid}/PlayedItems/" + item_id
-    downloadUtils.downloadUrl(url, postBody="", method="POST")
+    response = downloadUtils.downloadUrl(url, postBody="", method="POST")
     checkForNewContent()
-    home_window = HomeWindow()
-    last_url = home_window.getProperty("last_content_url")
-    if last_url:
-        log.debug("markWatched_lastUrl: {0}", last_url)
-        home_window.setProperty("skip_cache_for_" + last_url, "true")
+    if not update_cached_item(item_id, response):
+        home_window = HomeWindow()
+        last_url = home_window.getProperty("last_content_url")
+        if last_url:
+            log.debug("markWatched_lastUrl: {0}", last_url)
+            home_window.setProperty("skip_cache_for_" + last_url, "true")
 
     xbmc.executebuiltin("Container.Refresh")
 
@@ -252,13 +268,14 @@ def markWatched(item_id):
 def markUnwatched(item_id):
     log.debug("Mark Item UnWatched: {0}", item_id)
     url = "{server}/emby/Users/{userid}/PlayedItems/" + item_id
-    downloadUtils.downloadUrl(url, method="DELETE")
+    response = downloadUtils.downloadUrl(url, method="DELETE")
     checkForNewContent()
-    home_window = HomeWindow()
-    last_url = home_window.getProperty("last_content_url")
-    if last_url:
-        log.debug("markUnwatched_lastUrl: {0}", last_url)
-        home_window.setProperty("skip_cache_for_" + last_url, "true")
+    if not update_cached_item(item_id, response):
+        home_window = HomeWindow()
+        last_url = home_window.getProperty("last_content_url")
+        if last_url:
+            log.debug("markUnwatched_lastUrl: {0}", last_url)
+            home_window.setProperty("skip_cache_for_" + last_url, "true")
 
     xbmc.executebuiltin("Container.Refresh")
 
@@ -266,12 +283,13 @@ def markUnwatched(item_id):
 def markFavorite(item_id):
     log.debug("Add item to favourites: {0}", item_id)
     url = "{server}/emby/Users/{userid}/FavoriteItems/" + item_id
-    downloadUtils.downloadUrl(url, postBody="", method="POST")
+    response = downloadUtils.downloadUrl(url, postBody="", method="POST")
     checkForNewContent()
-    home_window = HomeWindow()
-    last_url = home_window.getProperty("last_content_url")
-    if last_url:
-        home_window.setProperty("skip_cache_for_" + last_url, "true")
+    if not update_cached_item(item_id, response):
+        home_window = HomeWindow()
+        last_url = home_window.getProperty("last_content_url")
+        if last_url:
+            home_window.setProperty("skip_cache_for_" + last_url, "true")
 
     xbmc.executebuiltin("Container.Refresh")
 
@@ -279,12 +297,13 @@ def markFavorite(item_id):
 def unmarkFavorite(item_id):
     log.debug("Remove item from favourites: {0}", item_id)
     url = "{server}/emby/Users/{userid}/FavoriteItems/" + item_id
-    downloadUtils.downloadUrl(url, method="DELETE")
+    response = downloadUtils.downloadUrl(url, method="DELETE")
     checkForNewContent()
-    home_window = HomeWindow()
-    last_url = home_window.getProperty("last_content_url")
-    if last_url:
-        home_window.setProperty("skip_cache_for_" + last_url, "true")
+    if not update_cached_item(item_id, response):
+        home_window = HomeWindow()
+        last_url = home_window.getProperty("last_content_url")
+        if last_url:
+            home_window.setProperty("skip_cache_for_" + last_url, "true")
 
     xbmc.executebuiltin("Container.Refresh")
 
@@ -372,12 +391,23 @@ def show_menu(params):
     log.debug("showMenu(): {0}", params)
 
     home_window = HomeWindow()
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     item_id = params["item_id"]
 
     url = "{server}/emby/Users/{userid}/Items/" + item_id + "?format=json"
     data_manager = DataManager()
-    result = data_manager.GetContent(url)
+    result_future = request_executor.submit(data_manager.GetContent, url, use_cache=True)
+
+    # read the container details while the item info loads
+    window = xbmcgui.Window(xbmcgui.getCurrentWindowId())
+    container_view_id = str(window.getFocusId())
+    container_content_type = xbmc.getInfoLabel("Container.Content")
+    view_key = "view-" + container_content_type
+    current_default_view = settings.getSetting(view_key)
+    view_match = container_view_id == current_default_view
+    log.debug("View ID:{0} Content type:{1}", container_view_id, container_content_type)
+
+    result = result_future.result()
     log.debug("Menu item info: {0}", result)
 
     if result is None:
@@ -476,14 +506,6 @@ def show_menu(params):
     li.setProperty('menu_id', 'info')
     action_items.append(li)
 
-    window = xbmcgui.Window(xbmcgui.getCurrentWindowId())
-    container_view_id = str(window.getFocusId())
-    container_content_type = xbmc.getInfoLabel("Container.Content")
-    view_key = "view-" + container_content_type
-    current_default_view = settings.getSetting(view_key)
-    view_match = container_view_id == current_default_view
-    log.debug("View ID:{0} Content type:{1}", container_view_id, container_content_type)
-
     if container_content_type in ["movies", "tvshows", "seasons", "episodes", "sets"]:
         if view_match:
             li = xbmcgui.ListItem("Unset as defalt view")
@@ -743,7 +765,7 @@ def showContent(pluginName, handle, params):
     log.debug("showContent Called: {0}", params)
 
     item_type = params.get("item_type")
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     group_movies = settings.getSetting('group_movies') == "true"
 
     if item_type.lower().find("movie") == -1:
@@ -883,7 +905,7 @@ def search_results(params):
     limit = int(params.get('limit', 20))
 
     # show a progress indicator if needed
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     progress = None
     if settings.getSetting('showLoadProgress') == "true":
         progress = xbmcgui.DialogProgress()
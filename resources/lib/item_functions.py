@@ -5,30 +5,31 @@ import urllib
 
 import time
 import calendar
+from string import Formatter
 from datetime import datetime, timedelta
 
-from collections import defaultdict
-
 import xbmc
-import xbmcaddon
 import xbmcgui
 
 from .utils import getArt, datetime_from_string
 from .simple_logging import SimpleLogging
 from .downloadutils import DownloadUtils
 from .kodi_utils import HomeWindow
+from .settings_snapshot import get_settings
 
 log = SimpleLogging(__name__)
 kodi_version = int(xbmc.getInfoLabel('System.BuildVersion')[:2])
 
-addon_instance = xbmcaddon.Addon()
-addon_path = addon_instance.getAddonInfo('path')
+addon_path = get_settings().getAddonInfo('path')
 PLUGINPATH = xbmc.translatePath(os.path.join(addon_path))
 
 download_utils = DownloadUtils()
 home_window = HomeWindow()
 
-class ItemDetails():
+class ItemDefaults():
+    """
+        The fields of ItemDetails and the value each one reads as until it is set
+    """
 
     name = None
     sort_name = None
@@ -58,10 +59,11 @@ class ItemDetails():
     play_count = 0
     director = ""
     writer = ""
-    cast = None
+    # the cast and media streams in their compact form, see the cast and media_streams properties
+    people = None
     tagline = ""
     status = None
-    media_streams = None
+    streams = None
 
     resume_time = 0
     duration = 0
@@ -94,40 +96,266 @@ class ItemDetails():
     baseline_itemname = None
 
 
+
+item_defaults = dict((name, value) for name, value in vars(ItemDefaults).items() if not name.startswith("__"))
+
+
+class ItemDetails(object):
+    """
+        The details of one item, the fields are slots so a big list does not hold a dict per item
+        a field that was never set reads as its default from ItemDefaults
+        cast and media_streams are expanded from people and streams the first time they are read
+    """
+    __slots__ = tuple(sorted(item_defaults)) + ("expanded_cast", "expanded_streams")
+
+    def __getattr__(self, name):
+        # only called for a field that was never set
+        try:
+            return item_defaults[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def get_values(self):
+        """
+            the fields that were set as a dict, what __dict__ held before the class had slots
+        """
+        values = {}
+        for name, get_slot in slot_getters:
+            try:
+                values[name] = get_slot(self)
+            except AttributeError:
+                pass
+        return values
+
+    def set_values(self, values):
+        for name, value in values.iteritems():
+            try:
+                setattr(self, name, value)
+            except AttributeError:
+                # a field the class no longer has
+                pass
+
+    def __getstate__(self):
+        return self.get_values()
+
+    def __setstate__(self, state):
+        # items pickled before the class had slots are restored from their __dict__ the same way
+        self.set_values(state)
+
+    def __repr__(self):
+        return "ItemDetails(%r)" % self.get_values()
+
+    @property
+    def cast(self):
+        try:
+            return self.expanded_cast
+        except AttributeError:
+            pass
+        cast = expand_people(self.people)
+        self.expanded_cast = cast
+        return cast
+
+    @cast.setter
+    def cast(self, cast):
+        # also how a cast list from a cache saved before the compact form is restored
+        self.people = cast
+        self.expanded_cast = cast
+
+    @property
+    def media_streams(self):
+        try:
+            return self.expanded_streams
+        except AttributeError:
+            pass
+        media_streams = expand_streams(self.streams)
+        self.expanded_streams = media_streams
+        return media_streams
+
+    @media_streams.setter
+    def media_streams(self, media_streams):
+        self.streams = media_streams
+        self.expanded_streams = media_streams
+
+
+# the slot descriptors read a field without falling back to its default,
+# the expanded cast and media streams are left out so they are not cached
+slot_getters = [(name, getattr(ItemDetails, name).__get__) for name in sorted(item_defaults)]
+
+
+def expand_people(people):
+    """
+        (thumbnail template, ((name, role, id, image tag), ...)) -> the cast list for ListItem.setCast()
+        a list is already expanded
+    """
+    if people is None or isinstance(people, list):
+        return people
+    thumbnail_template, actors = people
+    cast = []
+    for person_name, person_role, person_id, person_tag in actors:
+        if person_tag is not None:
+            person_thumbnail = thumbnail_template % (person_id, person_tag)
+        else:
+            person_thumbnail = ""
+        cast.append({"name": person_name, "role": person_role, "thumbnail": person_thumbnail})
+    return cast
+
+
+def expand_streams(streams):
+    """
+        (("video", codec, height, width, aspect), ("audio", codec, channels, language), ("sub", language), ...)
+        -> the media stream dicts add_gui_item() adds as stream info, a list is already expanded
+    """
+    if streams is None or isinstance(streams, list):
+        return streams
+    media_info_list = []
+    for stream in streams:
+        stream_type = stream[0]
+        if stream_type == "video":
+            stream_type, codec, height, width, aspect_ratio = stream
+            media_info = {"type": stream_type, "codec": codec, "height": height, "width": width, "apect": aspect_ratio}
+            if aspect_ratio is not None and len(aspect_ratio) >= 3:
+                try:
+                    aspect_width, aspect_height = aspect_ratio.split(':')
+                    media_info["apect_ratio"] = float(aspect_width) / float(aspect_height)
+                except:
+                    media_info["apect_ratio"] = 1.85
+            else:
+                media_info["apect_ratio"] = 1.85
+        elif stream_type == "audio":
+            stream_type, codec, channels, language = stream
+            media_info = {"type": stream_type, "codec": codec, "channels": channels, "language": language}
+        else:
+            stream_type, language = stream
+            media_info = {"type": stream_type, "language": language}
+        media_info_list.append(media_info)
+    return media_info_list
+
+def set_user_data(item_details, user_data):
+    """
+        the watched, favorite and resume state from an Emby UserData object,
+        also used to update cached items from the UserData the server sends on a change
+    """
+    if user_data is None:
+        user_data = {}
+
+    if user_data.get("Played") == True:
+        item_details.overlay = "6"
+        item_details.play_count = 1
+    else:
+        item_details.overlay = "7"
+        item_details.play_count = 0
+
+    if user_data.get("IsFavorite") == True:
+        item_details.overlay = "5"
+        item_details.favorite = "true"
+    else:
+        item_details.favorite = "false"
+
+    reasonableTicks = user_data.get("PlaybackPositionTicks")
+    if reasonableTicks is not None:
+        reasonableTicks = int(reasonableTicks) / 1000
+        item_details.resume_time = int(reasonableTicks / 10000)
+
+    unplayed_item_count = user_data.get("UnplayedItemCount")
+    if unplayed_item_count is not None:
+        item_details.unwatched_episodes = unplayed_item_count
+        item_details.watched_episodes = item_details.total_episodes - unplayed_item_count
+    item_details.recursive_unplayed_items_count = unplayed_item_count
+
+
+def compile_name_format(name_format):
+    """
+        the name format as a %(name)s template so it is not parsed again for every item,
+        None if it uses format specs or conversions that only format() understands
+    """
+    template = u""
+    for literal, field, spec, conversion in Formatter().parse(unicode(name_format)):
+        template += literal.replace(u"%", u"%%")
+        if field is None:
+            continue
+        if spec or conversion or not field.isalnum():
+            return None
+        template += u"%(" + field + u")s"
+    return template
+
+
+class ExtractOptions():
+    """
+        The values extract_item() needs that are the same for every item of a list, worked out once per list
+        strings holds the genre, studio, codec and other often repeated strings so the items share them
+    """
+
+    def __init__(self, gui_options):
+        self.server = gui_options["server"]
+        self.name_format = gui_options["name_format"]
+        self.name_format_type = gui_options["name_format_type"]
+        self.name_template = None
+        if self.name_format is not None:
+            self.name_format = unicode(self.name_format)
+            self.name_template = compile_name_format(self.name_format)
+        # the cast thumbnail url built by DownloadUtils.imageUrl() for a 400x400 Primary image
+        server = ("%s" % self.server).replace("%", "%%")
+        self.cast_thumbnail = download_utils.imageUrl("%s", "Primary", 0, 400, 400, "%s", server)
+        # the artwork urls made for the list, the episodes of a series share the series images
+        self.art_urls = {}
+        self.strings = {}
+
+    def share(self, value):
+        if value is None:
+            return None
+        return self.strings.setdefault(value, value)
+
+
+def extract_items(items, gui_options):
+    """
+        extract_item_info() for all the items of a list, yields each ItemDetails as its item is read
+    """
+    options = ExtractOptions(gui_options)
+    for item in items:
+        yield extract_item(item, options)
+
+
 def extract_item_info(item, gui_options):
+    return extract_item(item, ExtractOptions(gui_options))
 
-    item_details = ItemDetails()
 
-    item_details.id = item["Id"]
-    item_details.etag = item["Etag"]
-    item_details.is_folder = item["IsFolder"]
-    item_details.item_type = item["Type"]
-    item_details.location_type = item["LocationType"]
-    item_details.name = item["Name"]
-    item_details.sort_name = item["SortName"]
+def extract_item(item, options):
+
+    item_details = ItemDetails()
+    # the item is a plain dict from the json, a field it does not have reads as None
+    get = item.get
+    share = options.share
+
+    item_details.id = get("Id")
+    item_details.etag = get("Etag")
+    item_details.is_folder = get("IsFolder")
+    item_details.item_type = share(get("Type"))
+    item_details.location_type = share(get("LocationType"))
+    item_details.name = get("Name")
+    item_details.sort_name = get("SortName")
     item_details.original_title = item_details.name
 
     if item_details.item_type == "Episode":
-        item_details.episode_number = item["IndexNumber"]
-        item_details.season_number = item["ParentIndexNumber"]
-        item_details.series_id = item["SeriesId"]
+        item_details.episode_number = get("IndexNumber")
+        item_details.season_number = get("ParentIndexNumber")
+        item_details.series_id = get("SeriesId")
 
     elif item_details.item_type == "Season":
-        item_details.season_number = item["IndexNumber"]
-        item_details.series_id = item["SeriesId"]
+        item_details.season_number = get("IndexNumber")
+        item_details.series_id = get("SeriesId")
 
     elif item_details.item_type == "Series":
-        item_details.status = item["Status"]
+        item_details.status = get("Status")
 
     elif item_details.item_type == "Audio":
-        item_details.track_number = item["IndexNumber"]
-        item_details.album_name = item["Album"]
-        artists = item["Artists"]
+        item_details.track_number = get("IndexNumber")
+        item_details.album_name = get("Album")
+        artists = get("Artists")
         if artists is not None and len(artists) > 0:
             item_details.song_artist = artists[0] # get first artist
 
     elif item_details.item_type == "MusicAlbum":
-        item_details.album_artist = item["AlbumArtist"]
+        item_details.album_artist = get("AlbumArtist")
         item_details.album_name = item_details.name
 
     if item_details.season_number is None:
@@ -135,18 +363,18 @@ def extract_item_info(item, gui_options):
     if item_details.episode_number is None:
         item_details.episode_number = 0
 
-    if item["Taglines"] is not None and len(item["Taglines"]) > 0:
-        item_details.tagline = item["Taglines"][0]
+    taglines = get("Taglines")
+    if taglines is not None and len(taglines) > 0:
+        item_details.tagline = taglines[0]
 
     # set the item name
     # override with name format string from request
-    name_format = gui_options["name_format"]
-    name_format_type = gui_options["name_format_type"]
+    name_format = options.name_format
 
-    if name_format is not None and item_details.item_type == name_format_type:
+    if name_format is not None and item_details.item_type == options.name_format_type:
         nameInfo = {}
-        nameInfo["ItemName"] = item["Name"]
-        season_name = item["SeriesName"]
+        nameInfo["ItemName"] = get("Name")
+        season_name = get("SeriesName")
         if season_name:
             nameInfo["SeriesName"] = season_name
         else:
@@ -154,10 +382,13 @@ def extract_item_info(item, gui_options):
         nameInfo["SeasonIndex"] = u"%02d" % item_details.season_number
         nameInfo["EpisodeIndex"] = u"%02d" % item_details.episode_number
         log.debug("FormatName: {0} | {1}", name_format, nameInfo)
-        item_details.name = unicode(name_format).format(**nameInfo).strip()
+        if options.name_template is not None:
+            item_details.name = (options.name_template % nameInfo).strip()
+        else:
+            item_details.name = name_format.format(**nameInfo).strip()
 
-    year = item["ProductionYear"]
-    prem_date = item["PremiereDate"]
+    year = get("ProductionYear")
+    prem_date = get("PremiereDate")
 
     if year is not None:
         item_details.year = year
@@ -168,163 +399,115 @@ def extract_item_info(item, gui_options):
         tokens = prem_date.split("T")
         item_details.premiere_date = tokens[0]
 
-    create_date = item["DateCreated"]
+    create_date = get("DateCreated")
     if create_date is not None:
         item_details.date_added = create_date.split('.')[0].replace('T', " ")
 
     # add the premiered date for Upcoming TV
     if item_details.location_type == "Virtual":
-        airtime = item["AirTime"]
+        airtime = get("AirTime")
         item_details.name = item_details.name + ' - ' + item_details.premiere_date + ' - ' + str(airtime)
 
     if item_details.item_type == "Program":
-        item_details.program_channel_name = item["ChannelName"]
-        item_details.program_start_date = item["StartDate"]
-        item_details.program_end_date = item["EndDate"]
+        item_details.program_channel_name = get("ChannelName")
+        item_details.program_start_date = get("StartDate")
+        item_details.program_end_date = get("EndDate")
 
-    # Process MediaStreams
-    media_streams = item["MediaStreams"]
+    # Process MediaStreams, kept compact until media_streams is read
+    media_streams = get("MediaStreams")
     if media_streams is not None:
-        media_info_list = []
+        streams = []
         for mediaStream in media_streams:
-            stream_type = mediaStream["Type"]
+            stream_type = mediaStream.get("Type")
             if stream_type == "Video":
-                media_info = {}
-                media_info["type"] = "video"
-                media_info["codec"] = mediaStream["Codec"]
-                media_info["height"] = mediaStream["Height"]
-                media_info["width"] = mediaStream["Width"]
-                aspect_ratio = mediaStream["AspectRatio"]
-                media_info["apect"] = aspect_ratio
-                if aspect_ratio is not None and len(aspect_ratio) >= 3:
-                    try:
-                        aspect_width, aspect_height = aspect_ratio.split(':')
-                        media_info["apect_ratio"] = float(aspect_width) / float(aspect_height)
-                    except:
-                        media_info["apect_ratio"] = 1.85
-                else:
-                    media_info["apect_ratio"] = 1.85
-                media_info_list.append(media_info)
+                streams.append(("video",
+                                share(mediaStream.get("Codec")),
+                                mediaStream.get("Height"),
+                                mediaStream.get("Width"),
+                                share(mediaStream.get("AspectRatio"))))
             if stream_type == "Audio":
-                media_info = {}
-                media_info["type"] = "audio"
-                media_info["codec"] = mediaStream["Codec"]
-                media_info["channels"] = mediaStream["Channels"]
-                media_info["language"] = mediaStream["Language"]
-                media_info_list.append(media_info)
+                streams.append(("audio",
+                                share(mediaStream.get("Codec")),
+                                mediaStream.get("Channels"),
+                                share(mediaStream.get("Language"))))
             if stream_type == "Subtitle":
                 item_details.subtitle_available = True
-                media_info = {}
-                media_info["type"] = "sub"
-                media_info["language"] = mediaStream["Language"]
-                media_info_list.append(media_info)
+                streams.append(("sub", share(mediaStream.get("Language"))))
 
-        item_details.media_streams = media_info_list
+        item_details.streams = tuple(streams)
 
-    # Process People
-    people = item["People"]
+    # Process People, the cast is kept compact until it is read
+    people = get("People")
     if people is not None:
-        cast = []
+        actors = []
         for person in people:
-            person_type = person["Type"]
+            person_type = person.get("Type")
             if person_type == "Director":
-                item_details.director = item_details.director + person["Name"] + ' '
+                item_details.director = item_details.director + person.get("Name") + ' '
             elif person_type == "Writing":
-                item_details.writer = person["Name"]
+                item_details.writer = person.get("Name")
             elif person_type == "Actor":
                 #log.debug("Person: {0}", person)
-                person_name = person["Name"]
-                person_role = person["Role"]
-                person_id = person["Id"]
-                person_tag = person["PrimaryImageTag"]
-                if person_tag is not None:
-                    person_thumbnail = download_utils.imageUrl(person_id, "Primary", 0, 400, 400, person_tag, server = gui_options["server"])
-                else:
-                    person_thumbnail = ""
-                person = {"name": person_name, "role": person_role, "thumbnail": person_thumbnail}
-                cast.append(person)
-        item_details.cast = cast
+                actors.append((person.get("Name"),
+                               share(person.get("Role")),
+                               person.get("Id"),
+                               person.get("PrimaryImageTag")))
+        item_details.people = (options.cast_thumbnail, tuple(actors))
 
     # Process Studios
-    studios = item["Studios"]
+    studios = get("Studios")
     if studios is not None:
         for studio in studios:
             if item_details.studio == None:  # Just take the first one
-                studio_name = studio["Name"]
-                item_details.studio = studio_name
+                studio_name = studio.get("Name")
+                item_details.studio = share(studio_name)
                 break
 
     # production location
-    prod_location = item["ProductionLocations"]
+    prod_location = get("ProductionLocations")
     # log.debug("ProductionLocations : {0}", prod_location)
     if prod_location and len(prod_location) > 0:
         item_details.production_location = prod_location[0]
 
     # Process Genres
-    genres = item["Genres"]
+    genres = get("Genres")
     if genres is not None and len(genres) > 0:
-        item_details.genres = genres
-
-    # Process UserData
-    userData = item["UserData"]
-    if userData is None:
-        userData = defaultdict(lambda: None, {})
-
-    if userData["Played"] == True:
-        item_details.overlay = "6"
-        item_details.play_count = 1
-    else:
-        item_details.overlay = "7"
-        item_details.play_count = 0
-
-    if userData["IsFavorite"] == True:
-        item_details.overlay = "5"
-        item_details.favorite = "true"
-    else:
-        item_details.favorite = "false"
-
-    reasonableTicks = userData["PlaybackPositionTicks"]
-    if reasonableTicks is not None:
-        reasonableTicks = int(reasonableTicks) / 1000
-        item_details.resume_time = int(reasonableTicks / 10000)
+        item_details.genres = [share(genre) for genre in genres]
 
-    item_details.series_name = item["SeriesName"]
-    item_details.plot = item["Overview"]
+    item_details.series_name = share(get("SeriesName"))
+    item_details.plot = get("Overview")
 
-    runtime = item["RunTimeTicks"]
+    runtime = get("RunTimeTicks")
     if item_details.is_folder == False and runtime is not None:
         item_details.duration = long(runtime) / 10000000
 
-    child_count = item["ChildCount"]
+    child_count = get("ChildCount")
     if child_count is not None:
         item_details.total_seasons = child_count
 
-    recursive_item_count = item["RecursiveItemCount"]
+    recursive_item_count = get("RecursiveItemCount")
     if recursive_item_count is not None:
         item_details.total_episodes = recursive_item_count
 
-    unplayed_item_count = userData["UnplayedItemCount"]
-    if unplayed_item_count is not None:
-        item_details.unwatched_episodes = unplayed_item_count
-        item_details.watched_episodes = item_details.total_episodes - unplayed_item_count
-
     item_details.number_episodes = item_details.total_episodes
 
-    item_details.art = getArt(item, gui_options["server"])
-    item_details.rating = item["OfficialRating"]
-    item_details.mpaa = item["OfficialRating"]
+    # Process UserData
+    set_user_data(item_details, get("UserData"))
+
+    item_details.art = getArt(item, options.server, options.art_urls)
+    item_details.rating = share(get("OfficialRating"))
+    item_details.mpaa = item_details.rating
 
-    item_details.community_rating = item["CommunityRating"]
+    item_details.community_rating = get("CommunityRating")
     if item_details.community_rating is None:
         item_details.community_rating = 0.0
 
-    item_details.critic_rating = item["CriticRating"]
+    item_details.critic_rating = get("CriticRating")
     if item_details.critic_rating is None:
         item_details.critic_rating = 0.0
 
-    item_details.location_type = item["LocationType"]
-    item_details.recursive_item_count = item["RecursiveItemCount"]
-    item_details.recursive_unplayed_items_count = userData["UnplayedItemCount"]
+    item_details.location_type = share(get("LocationType"))
+    item_details.recursive_item_count = get("RecursiveItemCount")
 
     item_details.mode = "GET_CONTENT"
 
@@ -333,7 +516,7 @@ def extract_item_info(item, gui_options):
 
 def add_gui_item(url, item_details, display_options, folder=True, default_sort=False):
 
-    #log.debug("item_details: {0}", item_details.__dict__)
+    #log.debug("item_details: {0}", item_details)
 
     if not item_details.name:
         return None
@@ -0,0 +1,170 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import json
+
+# a C json module parses whole bodies about twice as fast as the streaming decoder, it is used when installed
+ujson_loaded = False
+try:
+    import ujson
+    ujson_loaded = True
+except Exception as err:
+    ujson_loaded = False
+
+
+class JsonObject(dict):
+    """
+        A json object where a missing key reads as None, used as the object_hook for responses
+        that are read with data["Key"], it is a type so the decoder calls it without a python frame
+    """
+
+    def __missing__(self, key):
+        return None
+
+
+class ItemsStreamReader():
+    """
+        Pulls the Items out of an Emby items response one at a time as the text arrives,
+        handles {"Items": [...], ...}, a plain list of items and a list of item sets
+        top level values other than Items end up in header once items() is finished,
+        which also reads the chunks to their end
+        with no object_hook the items are plain dicts, if ujson is installed the whole body
+        is read first and parsed by it instead
+    """
+
+    compact_size = 65536
+
+    def __init__(self, chunks, object_hook=None):
+        self.chunks = iter(chunks)
+        self.decoder = json.JSONDecoder(object_hook=object_hook)
+        self.use_ujson = ujson_loaded and object_hook is None
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.header = {}
+
+    def read_more(self):
+        if self.eof:
+            return False
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.eof = True
+            return False
+        # drop the text that has already been parsed
+        if self.pos > self.compact_size:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        self.buffer += chunk
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read_more():
+                return None
+
+    def next_char(self, allowed):
+        char = self.peek()
+        if char is None or char not in allowed:
+            raise ValueError("Expecting one of %s at %s got %s" % (allowed, self.pos, char))
+        self.pos += 1
+        return char
+
+    def decode_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # a number at the very end of the buffer might continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            self.read_more()
+
+    def read_array(self):
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            if self.next_char(",]") == "]":
+                return
+
+    def read_object(self):
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.decode_value()
+            self.next_char(":")
+            if key == "Items" and self.peek() == "[":
+                self.pos += 1
+                for item in self.read_array():
+                    yield item
+            else:
+                self.header[key] = self.decode_value()
+            if self.next_char(",}") == "}":
+                return
+
+    def items(self):
+        for item in self.read_items():
+            yield item
+        self.drain()
+
+    def drain(self):
+        # read to the end of the chunks so the request that streams them finishes as a success
+        # and its connection goes back to the pool
+        while self.read_more():
+            pass
+
+    def read_items(self):
+        if self.use_ujson:
+            body = "".join(self.chunks)
+            if body.strip():
+                for item in self.value_items(ujson.loads(body)):
+                    yield item
+            return
+
+        first = self.peek()
+        if first == "{":
+            self.pos += 1
+            for item in self.read_object():
+                yield item
+
+        elif first == "[":
+            self.pos += 1
+            values = self.read_array()
+            for value in values:
+                # a list of item sets, only the first set is used
+                if isinstance(value, dict) and value.get("Items") is not None:
+                    self.header["BaselineItemName"] = value.get("BaselineItemName")
+                    for item in value.get("Items"):
+                        yield item
+                    return
+                yield value
+                break
+            for value in values:
+                yield value
+
+        elif first is not None:
+            # null or some other value that is not a list of items
+            self.decode_value()
+
+    def value_items(self, value):
+        # the same shapes as items() for a body that was parsed in one go
+        if isinstance(value, dict):
+            items = value.pop("Items", None)
+            self.header.update(value)
+            return items or []
+        if isinstance(value, list):
+            if value and isinstance(value[0], dict) and value[0].get("Items") is not None:
+                self.header["BaselineItemName"] = value[0].get("BaselineItemName")
+                return value[0].get("Items")
+            return value
+        return []
@@ -1,15 +1,15 @@
 import xbmc
 import xbmcgui
 import xbmcplugin
-import xbmcaddon
 
 import sys
 import json
 
 from .simple_logging import SimpleLogging
+from .settings_snapshot import get_settings
 
 log = SimpleLogging(__name__)
-addon = xbmcaddon.Addon()
+
 
 class HomeWindow():
     """
@@ -41,7 +41,7 @@ def addMenuDirectoryItem(label, path, folder=True, art=None):
     li = xbmcgui.ListItem(label, path=path)
     if art is None:
         art = {}
-        art["thumb"] = addon.getAddonInfo('icon')
+        art["thumb"] = get_settings().getAddonInfo('icon')
     li.setArt(art)
 
     xbmcplugin.addDirectoryItem(handle=int(sys.argv[1]), url=path, listitem=li, isFolder=folder)
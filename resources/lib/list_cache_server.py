@@ -0,0 +1,275 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import os
+import hmac
+import time
+import threading
+import httplib
+import socket
+from collections import OrderedDict
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+from .simple_logging import SimpleLogging
+from .tracking import count_event
+from .kodi_utils import HomeWindow
+
+PORT_NUMBER = 24277
+log = SimpleLogging(__name__)
+
+# when the service could not be reached this process waits a while before it tries again,
+# the wait doubles with each failure in a row up to max_retry_backoff
+retry_at = 0
+retry_backoff = 0
+min_retry_backoff = 5
+max_retry_backoff = 120
+
+# made by the service for each run and published in the home window, a request without it is refused
+# so no other local process can read the lists or put its own data in them
+SECRET_PROPERTY = "list_cache_secret"
+SECRET_HEADER = "X-List-Cache-Secret"
+server_secret = None
+
+
+class MemoryListCache():
+    """
+        The pickled cache items most recently used, kept in the service process,
+        they are only read back with cache_store.load_memory_list() which allows no class but CacheItem,
+        the oldest are dropped once max_size bytes are held
+        a put with an older version stamp than the list held is ignored
+    """
+    max_size = 50 * 1024 * 1024
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.lists = OrderedDict()
+        self.versions = {}
+        self.size = 0
+
+    def get(self, url_hash):
+        with self.lock:
+            data = self.lists.pop(url_hash, None)
+            if data is not None:
+                self.lists[url_hash] = data
+            return data
+
+    def put(self, url_hash, data, version=None):
+        with self.lock:
+            held_version = self.versions.get(url_hash)
+            if version is not None and held_version is not None and version < held_version:
+                return False
+            self.versions[url_hash] = version
+            old_data = self.lists.pop(url_hash, None)
+            if old_data is not None:
+                self.size -= len(old_data)
+            self.lists[url_hash] = data
+            self.size += len(data)
+            while self.size > self.max_size and self.lists:
+                evicted_hash, evicted_data = self.lists.popitem(last=False)
+                self.versions.pop(evicted_hash, None)
+                self.size -= len(evicted_data)
+            return True
+
+    def delete(self, url_hash):
+        with self.lock:
+            data = self.lists.pop(url_hash, None)
+            self.versions.pop(url_hash, None)
+            if data is not None:
+                self.size -= len(data)
+
+    def clear(self):
+        with self.lock:
+            self.lists = OrderedDict()
+            self.versions = {}
+            self.size = 0
+
+
+memory_list_cache = MemoryListCache()
+
+
+class ListCacheHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        return
+
+    def get_url_hash(self):
+        path_bits = self.path.strip("/").split("/")
+        if len(path_bits) == 2 and path_bits[0] == "lists":
+            return path_bits[1]
+        return None
+
+    def send_body(self, status, body=""):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def check_secret(self):
+        secret = self.headers.get(SECRET_HEADER) or ""
+        if server_secret is None or not hmac.compare_digest(secret, server_secret):
+            self.send_body(403)
+            return False
+        return True
+
+    def do_GET(self):
+        if not self.check_secret():
+            return
+        url_hash = self.get_url_hash()
+        data = None
+        if url_hash is not None:
+            data = memory_list_cache.get(url_hash)
+        if data is None:
+            self.send_body(404)
+        else:
+            self.send_body(200, data)
+
+    def read_body(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            return None
+        if length < 0:
+            return None
+        return self.rfile.read(length)
+
+    def do_PUT(self):
+        if not self.check_secret():
+            return
+        url_hash = self.get_url_hash()
+        data = self.read_body()
+        if data is None:
+            self.send_body(400)
+            return
+        if url_hash is None:
+            self.send_body(404)
+            return
+        version = self.headers.get('X-List-Version')
+        if version is not None:
+            try:
+                version = float(version)
+            except ValueError:
+                self.send_body(400)
+                return
+        if memory_list_cache.put(url_hash, data, version):
+            self.send_body(200)
+        else:
+            self.send_body(409)
+
+    def do_DELETE(self):
+        if not self.check_secret():
+            return
+        data = self.read_body()
+        if data is None:
+            self.send_body(400)
+            return
+        url_hash = self.get_url_hash()
+        if url_hash is not None:
+            memory_list_cache.delete(url_hash)
+        elif data:
+            # a comma separated list of url hashes
+            for url_hash in data.split(","):
+                memory_list_cache.delete(url_hash)
+        else:
+            memory_list_cache.clear()
+        self.send_body(200)
+
+    def do_QUIT(self):
+        self.send_body(200)
+
+
+class ListCacheServerThread(threading.Thread):
+    keep_running = True
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+
+    def stop(self):
+        self.keep_running = False
+        log.debug("ListCacheServerThread:stop called")
+        try:
+            conn = httplib.HTTPConnection("127.0.0.1:%d" % PORT_NUMBER)
+            conn.request("QUIT", "/")
+            conn.getresponse()
+        except Exception as err:
+            pass
+
+    def run(self):
+        global server_secret
+        log.debug("ListCacheServerThread:started")
+        server = HTTPServer(('127.0.0.1', PORT_NUMBER), ListCacheHandler)
+        server_secret = os.urandom(16).encode("hex")
+        HomeWindow().setProperty(SECRET_PROPERTY, server_secret)
+        while self.keep_running:
+            server.handle_request()
+        HomeWindow().clearProperty(SECRET_PROPERTY)
+        server_secret = None
+        server.server_close()
+        memory_list_cache.clear()
+        log.debug("ListCacheServerThread:exiting")
+
+
+def list_cache_request(method, url_hash, body=None, headers=None):
+    """
+        ask the service for a list, returns the response body of a 200 or None
+    """
+    global retry_at
+    global retry_backoff
+    if retry_at and time.time() < retry_at:
+        return None
+
+    # no secret means the service is not running its list cache
+    secret = HomeWindow().getProperty(SECRET_PROPERTY)
+    if not secret:
+        return None
+
+    path = "/lists"
+    if url_hash is not None:
+        path += "/" + url_hash
+
+    headers = dict(headers or {})
+    headers[SECRET_HEADER] = secret
+
+    try:
+        conn = httplib.HTTPConnection("127.0.0.1", PORT_NUMBER, timeout=2)
+        conn.request(method, path, body, headers)
+        response = conn.getresponse()
+        data = response.read()
+        conn.close()
+    except (socket.error, httplib.HTTPException) as error:
+        retry_backoff = min(max(retry_backoff * 2, min_retry_backoff), max_retry_backoff)
+        retry_at = time.time() + retry_backoff
+        log.debug("list_cache_request : service list cache not available, retry in {0} sec : {1}",
+                  retry_backoff, error)
+        return None
+
+    retry_at = 0
+    retry_backoff = 0
+
+    if response.status != 200:
+        return None
+    return data
+
+
+def get_memory_list(url_hash):
+    data = list_cache_request("GET", url_hash)
+    if data is not None:
+        count_event("list_cache_memory_hit", url_hash)
+    return data
+
+
+def put_memory_list(url_hash, data, version=None):
+    headers = {}
+    if version is not None:
+        headers["X-List-Version"] = repr(version)
+    list_cache_request("PUT", url_hash, data, headers)
+
+
+def delete_memory_list(url_hash=None):
+    list_cache_request("DELETE", url_hash)
+
+
+def delete_memory_lists(url_hashes):
+    # an empty body would clear them all
+    url_hashes = [url_hash for url_hash in url_hashes if url_hash]
+    if url_hashes:
+        list_cache_request("DELETE", None, ",".join(url_hashes))
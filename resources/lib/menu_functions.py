@@ -7,7 +7,6 @@ import urllib
 import base64
 
 import xbmcplugin
-import xbmcaddon
 
 from .downloadutils import DownloadUtils
 from .kodi_utils import addMenuDirectoryItem, HomeWindow
@@ -15,11 +14,11 @@ from .simple_logging import SimpleLogging
 from .translation import string_load
 from .datamanager import DataManager
 from .utils import getArt, get_emby_url
+from .settings_snapshot import get_settings
 
 log = SimpleLogging(__name__)
 downloadUtils = DownloadUtils()
 
-__addon__ = xbmcaddon.Addon()
 
 def show_movie_tags(params):
     log.debug("show_movie_tags: {0}", params)
@@ -42,7 +41,7 @@ def show_movie_tags(params):
 
     url = get_emby_url("{server}/emby/Tags", url_params)
     data_manager = DataManager()
-    result = data_manager.GetContent(url)
+    result = data_manager.GetContent(url, use_cache=True)
 
     if not result:
         return
@@ -108,7 +107,7 @@ def show_movie_years(params):
     url = get_emby_url("{server}/emby/Years", url_params)
 
     data_manager = DataManager()
-    result = data_manager.GetContent(url)
+    result = data_manager.GetContent(url, use_cache=True)
 
     if not result:
         return
@@ -175,7 +174,7 @@ def show_movie_pages(params):
     log.debug("showMoviePages: {0}", params)
 
     parent_id = params.get("parent_id")
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     group_movies = settings.getSetting('group_movies') == "true"
 
     params = {}
@@ -285,14 +284,14 @@ def show_genre_list(params):
     url = get_emby_url("{server}/emby/Genres", params)
 
     data_manager = DataManager()
-    result = data_manager.GetContent(url)
+    result = data_manager.GetContent(url, use_cache=True)
 
     if result is not None:
         result = result.get("Items")
     else:
         result = []
 
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     group_movies = settings.getSetting('group_movies') == "true"
 
     collections = []
@@ -341,7 +340,7 @@ def show_movie_alpha_list(params):
 
     xbmcplugin.setContent(int(sys.argv[1]), 'movies')
 
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     server = downloadUtils.getServer()
     if server is None:
         return
@@ -362,7 +361,7 @@ def show_movie_alpha_list(params):
     prefix_url = get_emby_url("{server}/emby/Items/Prefixes", url_params)
 
     data_manager = DataManager()
-    result = data_manager.GetContent(prefix_url)
+    result = data_manager.GetContent(prefix_url, use_cache=True)
 
     if not result:
         return
@@ -415,7 +414,7 @@ def show_movie_alpha_list(params):
 def show_tvshow_alpha_list(params):
     log.debug("== ENTER: showTvShowAlphaList() ==")
 
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     server = downloadUtils.getServer()
     if server is None:
         return
@@ -434,7 +433,7 @@ def show_tvshow_alpha_list(params):
     prefix_url = get_emby_url("{server}/emby/Items/Prefixes", url_params)
 
     data_manager = DataManager()
-    result = data_manager.GetContent(prefix_url)
+    result = data_manager.GetContent(prefix_url, use_cache=True)
 
     if not result:
         return
@@ -536,7 +535,7 @@ def show_global_types(params):
 def display_homevideos_type(params, view):
     handle = int(sys.argv[1])
     view_name = view.get("Name")
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     show_x_filtered_items = settings.getSetting("show_x_filtered_items")
 
     params = {}
@@ -595,7 +594,7 @@ def display_tvshow_type(params, view):
     if view is not None:
         view_name = view.get("Name")
 
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     show_x_filtered_items = settings.getSetting("show_x_filtered_items")
 
     params = {}
@@ -682,7 +681,7 @@ def display_music_type(params, view):
     handle = int(sys.argv[1])
     view_name = view.get("Name")
 
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     show_x_filtered_items = settings.getSetting("show_x_filtered_items")
 
     params = {}
@@ -823,7 +822,7 @@ def display_movies_type(params, view):
     if view is not None:
         view_name = view.get("Name")
 
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     show_x_filtered_items = settings.getSetting("show_x_filtered_items")
     group_movies = settings.getSetting('group_movies') == "true"
 
@@ -1124,7 +1123,7 @@ def getCollections():
         return []
 
     data_manager = DataManager()
-    result = data_manager.GetContent("{server}/emby/Users/{userid}/Items/Root?format=json")
+    result = data_manager.GetContent("{server}/emby/Users/{userid}/Items/Root?format=json", use_cache=True)
     if result is None:
         return []
 
@@ -1133,7 +1132,7 @@ def getCollections():
 
     htmlpath = "{server}/emby/Users/{userid}/Views?format=json"
     # htmlpath = "{server}/emby/Users/{userid}/items?ParentId=" + parentid + "&Sortby=SortName&format=json"
-    result = data_manager.GetContent(htmlpath)
+    result = data_manager.GetContent(htmlpath, use_cache=True)
 
     if result is not None:
         result = result.get("Items")
@@ -1142,7 +1141,7 @@ def getCollections():
 
     collections = []
 
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     group_movies = settings.getSetting('group_movies') == "true"
     show_x_filtered_items = settings.getSetting("show_x_filtered_items")
 
@@ -1902,7 +1901,7 @@ def getCollections():
 
 
 def show_widgets():
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     show_x_filtered_items = settings.getSetting("show_x_filtered_items")
 
     addMenuDirectoryItem("All Movies",
@@ -1956,7 +1955,7 @@ def set_library_window_values(force=False):
 
     data_manager = DataManager()
     url = "{server}/emby/Users/{userid}/Views"
-    result = data_manager.GetContent(url)
+    result = data_manager.GetContent(url, use_cache=True)
 
     if result is None:
         return
@@ -2,7 +2,6 @@
 
 import xbmc
 import xbmcgui
-import xbmcaddon
 
 from datetime import timedelta
 import json
@@ -10,18 +9,20 @@ import os
 import base64
 
 from .simple_logging import SimpleLogging
-from .downloadutils import DownloadUtils
+from .downloadutils import DownloadUtils, request_executor
 from .resume_dialog import ResumeDialog
 from .utils import PlayUtils, getArt, id_generator, send_event_notification, convert_size
 from .kodi_utils import HomeWindow
 from .translation import string_load
-from .datamanager import DataManager, clear_old_cache_data
+from .datamanager import DataManager
+from .cache_cleanup import start_cache_cleanup
 from .item_functions import extract_item_info, add_gui_item
 from .clientinfo import ClientInformation
 from .functions import delete, markWatched, markUnwatched
 from .cache_images import CacheArtwork
 from .picture_viewer import PictureViewer
 from .tracking import timer
+from .settings_snapshot import get_settings, invalidate_settings
 
 log = SimpleLogging(__name__)
 download_utils = DownloadUtils()
@@ -111,16 +112,11 @@ def playAllFiles(items, monitor):
 def playListOfItems(id_list, monitor):
     log.debug("Loading  all items in the list")
     data_manager = DataManager()
-    items = []
 
-    for id in id_list:
-        url = "{server}/emby/Users/{userid}/Items/%s?format=json"
-        url = url % (id,)
-        result = data_manager.GetContent(url)
-        if result is None:
-            log.debug("Playfile item was None, so can not play!")
-            return
-        items.append(result)
+    items = data_manager.get_items_by_ids(id_list, fields="Overview")
+    if None in items:
+        log.debug("Playfile item was None, so can not play!")
+        return
 
     return playAllFiles(items, monitor)
 
@@ -236,13 +232,16 @@ def playFile(play_info, monitor):
 
     log.debug("playFile id({0}) resume({1}) force_transcode({2})", id, auto_resume, force_transcode)
 
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     addon_path = settings.getAddonInfo('path')
     force_auto_resume = settings.getSetting('forceAutoResume') == 'true'
     jump_back_amount = int(settings.getSetting("jump_back_amount"))
 
     server = download_utils.getServer()
 
+    # the playback info only needs the id so load it while the item details load
+    playback_info_future = request_executor.submit(download_utils.get_item_playback_info, id)
+
     url = "{server}/emby/Users/{userid}/Items/%s?format=json" % (id,)
     data_manager = DataManager()
     result = data_manager.GetContent(url)
@@ -250,11 +249,13 @@ def playFile(play_info, monitor):
 
     if result is None:
         log.debug("Playfile item was None, so can not play!")
+        playback_info_future.cancel()
         return
 
     # if this is a season, tv show or album then play all items in that parent
     if result.get("Type") in ["Season", "MusicAlbum", "Playlist"]:
         log.debug("PlayAllFiles for parent item id: {0}", id)
+        playback_info_future.cancel()
         url = ('{server}/emby/Users/{userid}/items' +
                '?ParentId=%s' +
                '&Fields=MediaSources' +
@@ -275,19 +276,25 @@ def playFile(play_info, monitor):
         url = "{server}/emby/Users/{userid}/Items/%s?format=json" % (channel_id,)
         result = data_manager.GetContent(url)
         id = result["Id"]
+        playback_info_future.cancel()
+        playback_info_future = request_executor.submit(download_utils.get_item_playback_info, id)
 
     if result.get("Type") == "Photo":
+        playback_info_future.cancel()
         play_url = "%s/emby/Items/%s/Images/Primary"
         play_url = play_url % (server, id)
 
-        plugin_path = xbmc.translatePath(os.path.join(xbmcaddon.Addon().getAddonInfo('path')))
+        plugin_path = xbmc.translatePath(os.path.join(get_settings().getAddonInfo('path')))
         action_menu = PictureViewer("PictureViewer.xml", plugin_path, "default", "720p")
         action_menu.setPicture(play_url)
         action_menu.doModal()
         return
 
+    # look for the next episode while the playback is set up
+    next_episode_future = request_executor.submit(get_next_episode, result)
+
     # get playback info from the server using the device profile
-    playback_info = download_utils.get_item_playback_info(id)
+    playback_info = playback_info_future.result()
     if playback_info is None:
         log.debug("playback_info was None, could not get MediaSources so can not play!")
         return
@@ -511,7 +518,7 @@ def playFile(play_info, monitor):
             else:
                 log.info("PlaybackResumrAction : Playback resumed")
 
-    next_episode = get_next_episode(result)
+    next_episode = next_episode_future.result()
     data["next_episode"] = next_episode
     send_next_episode_details(result, next_episode)
 
@@ -887,7 +894,7 @@ def externalSubs(media_source, list_item, item_id):
     if len(externalsubs) == 0:
         return
 
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     direct_stream_sub_select = settings.getSetting("direct_stream_sub_select")
 
     if direct_stream_sub_select == "0" or (len(externalsubs) == 1 and not direct_stream_sub_select == "2"):
@@ -971,7 +978,7 @@ def get_volume():
 def prompt_for_stop_actions(item_id, data):
     log.debug("prompt_for_stop_actions Called : {0}", data)
 
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     current_position = data.get("currentPossition", 0)
     duration = data.get("duration", 0)
     media_source_id = data.get("source_id")
@@ -1205,6 +1212,10 @@ class PlaybackService(xbmc.Monitor):
     def __init__(self, monitor):
         self.monitor = monitor
 
+    def onSettingsChanged(self):
+        log.debug("PlaybackService:onSettingsChanged")
+        invalidate_settings()
+
     def onNotification(self, sender, method, data):
         log.debug("PlaybackService:onNotification:{0}:{1}:{2}", sender, method, data)
 
@@ -1247,7 +1258,7 @@ class PlaybackService(xbmc.Monitor):
         home_screen = HomeWindow()
         home_screen.clearProperty("skip_select_user")
 
-        settings = xbmcaddon.Addon()
+        settings = get_settings()
         stop_playback = settings.getSetting("stopPlaybackOnScreensaver") == 'true'
 
         if stop_playback:
@@ -1261,7 +1272,7 @@ class PlaybackService(xbmc.Monitor):
 
         #xbmc.executebuiltin("Dialog.Close(selectdialog, true)")
 
-        clear_old_cache_data()
+        start_cache_cleanup()
 
         cache_images = settings.getSetting('cacheImagesOnScreenSaver') == 'true'
         if cache_images:
@@ -1275,7 +1286,7 @@ class PlaybackService(xbmc.Monitor):
             self.background_image_cache_thread.stop_activity()
             self.background_image_cache_thread = None
 
-        settings = xbmcaddon.Addon()
+        settings = get_settings()
         show_change_user = settings.getSetting('changeUserOnScreenSaver') == 'true'
         if show_change_user:
             home_screen = HomeWindow()
@@ -7,7 +7,6 @@ import time
 import hashlib
 from datetime import datetime
 
-import xbmcaddon
 import xbmcgui
 import xbmc
 
@@ -16,11 +15,11 @@ from .downloadutils import DownloadUtils, save_user_details, load_user_details
 from .simple_logging import SimpleLogging
 from .translation import string_load
 from .utils import datetime_from_string
+from .settings_snapshot import get_settings
 
 log = SimpleLogging(__name__)
 
-__addon__ = xbmcaddon.Addon()
-__addon_name__ = __addon__.getAddonInfo('name')
+__addon_name__ = get_settings().getAddonInfo('name')
 
 
 def check_safe_delete_available():
@@ -98,7 +97,7 @@ def getServerDetails():
 def checkServer(force=False, change_user=False, notify=False):
     log.debug("checkServer Called")
 
-    settings = xbmcaddon.Addon()
+    settings = get_settings()
     server_url = ""
     something_changed = False
     du = DownloadUtils()
@@ -115,8 +114,7 @@ def checkServer(force=False, change_user=False, notify=False):
         # scan for local server
         server_info = getServerDetails()
 
-        addon = xbmcaddon.Addon()
-        server_icon = addon.getAddonInfo('icon')
+        server_icon = settings.getAddonInfo('icon')
 
         server_list = []
         for server in server_info:
@@ -0,0 +1,57 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import xbmcaddon
+
+snapshot = None
+
+
+class SettingsSnapshot():
+    """
+        One xbmcaddon.Addon() per process with every setting read from it cached,
+        dropped by invalidate_settings() when Kodi reports a settings change
+    """
+
+    def __init__(self):
+        self.addon = xbmcaddon.Addon()
+        self.values = {}
+        self.info = {}
+
+    def getSetting(self, key):
+        value = self.values.get(key)
+        if value is None:
+            value = self.addon.getSetting(key)
+            self.values[key] = value
+        return value
+
+    def setSetting(self, key, value):
+        # only write back to Kodi when the value actually changed
+        if self.getSetting(key) == value:
+            return
+        self.addon.setSetting(key, value)
+        self.values[key] = value
+
+    def getAddonInfo(self, key):
+        value = self.info.get(key)
+        if value is None:
+            value = self.addon.getAddonInfo(key)
+            self.info[key] = value
+        return value
+
+    def getLocalizedString(self, string_id):
+        return self.addon.getLocalizedString(string_id)
+
+    def openSettings(self):
+        self.addon.openSettings()
+        invalidate_settings()
+
+
+def get_settings():
+    global snapshot
+    if snapshot is None:
+        snapshot = SettingsSnapshot()
+    return snapshot
+
+
+def invalidate_settings():
+    global snapshot
+    snapshot = None
@@ -1,8 +1,8 @@
 # Gnu General Public License - see LICENSE.TXT
 
 import xbmc
-import xbmcaddon
 from .json_rpc import json_rpc
+from .settings_snapshot import get_settings
 
 
 class SimpleLogging():
@@ -10,7 +10,7 @@ class SimpleLogging():
     enable_logging = False
 
     def __init__(self, name):
-        settings = xbmcaddon.Addon()
+        settings = get_settings()
         prefix = settings.getAddonInfo('name')
         self.name = prefix + '.' + name
         self.enable_logging = settings.getSetting('log_debug') == "true"
@@ -4,15 +4,26 @@ import sys
 import functools
 import time
 from .simple_logging import SimpleLogging
+from .url_keys import canonical_url
 
 log = SimpleLogging(__name__)
 
 enabled = False
+counters = {}
 
 def set_timing_enabled(val):
     global enabled
     enabled = val
 
+def count_event(name, data=""):
+    counters[name] = counters.get(name, 0) + 1
+    if enabled:
+        log.info("counter_data|{0}|{1}|{2}", name, counters[name], data)
+
+def log_timing(name, started, ended, data=""):
+    if enabled:
+        log.info("timing_data|{0}|{1}|{2}|{3}", name, started, ended, data)
+
 def timer(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
@@ -22,7 +33,7 @@ def timer(func):
         if enabled:
             data = ""
             if func.__name__ == "downloadUrl" and len(args) > 1:
-                data = args[1]
+                data = canonical_url(args[1])
             elif func.__name__ == "mainEntryPoint" and len(sys.argv) > 2:
                 data = sys.argv[2]
             log.info("timing_data|{0}|{1}|{2}|{3}", func.__name__ , started, ended, data)
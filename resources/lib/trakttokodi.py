@@ -34,7 +34,7 @@ def search(item_type, query):
                    '&Limit=25' +
                    '&IncludePeople=false&IncludeMedia=true&IncludeGenres=false&IncludeStudios=false&IncludeArtists=false')
 
-    result = dataManager.GetContent(content_url)
+    result = dataManager.GetContent(content_url, use_cache=True)
     return result
 
 
@@ -58,13 +58,14 @@ def get_items(video_type, item_id=None, parent_id=None):
                        '&format=json')
 
     if content_url:
-        result = dataManager.GetContent(content_url)
+        result = dataManager.GetContent(content_url, use_cache=True)
 
     return result
 
 
 def get_item(item_id):
-    result = dataManager.GetContent('{server}/emby/Users/{userid}/Items/' + item_id + '?Fields=ProviderIds&format=json')
+    result = dataManager.GetContent('{server}/emby/Users/{userid}/Items/' + item_id + '?Fields=ProviderIds&format=json',
+                                    use_cache=True)
     return result
 
 
@@ -123,8 +124,14 @@ def get_match(item_type, title, year, imdb_id):
 
     log.debug('Potential matches: {0}', potential_matches)
 
-    for item in potential_matches:
-        item_imdb_id = get_imdb_id(item.get('ItemId'))
+    # load the provider ids of all the candidates in one go
+    match_ids = [item.get('ItemId') for item in potential_matches]
+    match_details = dataManager.get_items_by_ids(match_ids, fields='ProviderIds')
+
+    for item, details in zip(potential_matches, match_details):
+        if details is None:
+            continue
+        item_imdb_id = (details.get('ProviderIds') or {}).get('Imdb')
         if item_imdb_id == imdb_id:
             log.debug('Found match: {0}', item)
             return item
@@ -0,0 +1,96 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import urllib
+
+# the server matches path parts and param names without case, these are written the one way
+known_path_parts = [
+    "emby", "Users", "Items", "Shows", "Episodes", "Seasons", "NextUp", "Upcoming", "Movies", "Recommendations",
+    "Genres", "MusicGenres", "Studios", "Persons", "Artists", "Years", "Tags", "Prefixes", "Views", "Latest",
+    "Resume", "Similar", "Images", "LocalTrailers", "Intros", "PlaybackInfo", "PlayedItems", "FavoriteItems",
+    "PlayingItems", "LiveTv", "Channels", "Programs", "Recordings", "Search", "Hints", "Sessions", "Playing",
+    "Capabilities", "Full", "System", "Info", "Public", "Videos", "Audio", "Subtitles", "Playlists", "Root",
+    "Filters", "Filters2", "ActiveEncodings", "AuthenticateByName", "Refresh", "AlbumArtists", "Plugins",
+    "Progress", "Stopped", "Recommended"]
+
+known_params = [
+    "UserId", "ParentId", "Ids", "Fields", "Filters", "Recursive", "SortBy", "SortOrder", "StartIndex", "Limit",
+    "IncludeItemTypes", "ExcludeItemTypes", "MediaTypes", "ImageTypeLimit", "EnableImageTypes", "EnableImages",
+    "EnableUserData", "EnableTotalRecordCount", "IsMissing", "IsVirtualUnAired", "IsPlayed", "IsFavorite",
+    "IsAiring", "IsFolder", "CollapseBoxSetItems", "GroupItemsIntoCollections", "GroupItems", "NameStartsWith",
+    "NameLessThan", "Years", "Tags", "TagIds", "GenreIds", "Genres", "PersonIds", "StudioIds", "ArtistIds",
+    "SeasonId", "SearchTerm", "IncludePeople", "IncludeMedia", "IncludeGenres", "IncludeStudios", "IncludeArtists",
+    "AnyProviderIdEquals", "Format", "CategoryLimit", "ItemLimit", "MaxWidth", "MaxHeight", "DeviceId",
+    "MediaSourceId", "PlaySessionId", "AudioStreamIndex", "SubtitleStreamIndex", "EnableDirectPlay",
+    "EnableDirectStream", "api_key"]
+
+# params where the order of the comma separated values does not change the result
+unordered_params = ["Fields", "Filters", "IncludeItemTypes", "ExcludeItemTypes", "MediaTypes", "EnableImageTypes",
+                    "Years", "PersonIds"]
+
+# the same for the params the server splits on | as the values can hold commas
+unordered_pipe_params = ["Genres", "Tags", "TagIds", "GenreIds", "StudioIds", "ArtistIds"]
+
+path_parts = dict((name.lower(), name) for name in known_path_parts)
+param_names = dict((name.lower(), name) for name in known_params)
+unordered_separators = dict([(name, ",") for name in unordered_params] +
+                            [(name, "|") for name in unordered_pipe_params])
+
+
+def canonical_url(url):
+    """
+        one string for urls that ask the server the same thing, used as the key for caches,
+        shared requests and counters, it is not meant to be requested
+        the params are sorted, known path parts and param names get one case, other param names are lower case,
+        the scheme, host and true and false are lower case
+        and the values of list params like Fields and IncludeItemTypes (comma) or Genres (pipe) are sorted
+        place holders like {server} are left as they are, expand the url first to key on the real values
+    """
+    if isinstance(url, unicode):
+        url = url.encode("utf-8")
+
+    url = url.strip()
+    fragment_start = url.find("#")
+    if fragment_start != -1:
+        url = url[:fragment_start]
+
+    query_start = url.find("?")
+    if query_start == -1:
+        base, query = url, ""
+    else:
+        base, query = url[:query_start], url[query_start + 1:]
+
+    scheme_end = base.find("://")
+    if scheme_end != -1:
+        host_end = base.find("/", scheme_end + 3)
+        if host_end == -1:
+            host_end = len(base)
+        # the user name and password in front of the host keep their case
+        userinfo, at, host = base[scheme_end + 3:host_end].rpartition("@")
+        prefix = base[:scheme_end + 3].lower() + userinfo + at + host.lower()
+        path = base[host_end:]
+    else:
+        prefix = ""
+        path = base
+    path = "/".join([path_parts.get(part.lower(), part) for part in path.rstrip("/").split("/")])
+
+    params = []
+    for param in query.split("&"):
+        if not param:
+            continue
+        name, equals, value = param.partition("=")
+        name = urllib.unquote_plus(name)
+        name = param_names.get(name.lower(), name.lower())
+        value = urllib.unquote_plus(value)
+        if value.lower() in ("true", "false"):
+            value = value.lower()
+        separator = unordered_separators.get(name)
+        if separator is not None:
+            value = separator.join(sorted(value.split(separator)))
+        params.append((name, value))
+    # stable so repeated params keep their order
+    params.sort(key=lambda param: param[0])
+
+    if not params:
+        return prefix + path
+    return prefix + path + "?" + "&".join(
+        [urllib.quote(name, safe="{}") + "=" + urllib.quote(value, safe="{},:|") for name, value in params])
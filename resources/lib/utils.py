@@ -1,5 +1,4 @@
 # Gnu General Public License - see LICENSE.TXT
-import xbmcaddon
 import xbmc
 
 import string
@@ -17,6 +16,7 @@ import re
 from .downloadutils import DownloadUtils
 from .simple_logging import SimpleLogging
 from .clientinfo import ClientInformation
+from .settings_snapshot import get_settings
 
 # hack to get datetime strptime loaded
 throwaway = time.strptime('20110101','%Y%m%d')
@@ -46,7 +46,7 @@ class PlayUtils():
     def getPlayUrl(self, id, media_source, force_transcode, play_session_id):
         log.debug("getPlayUrl")
 
-        addonSettings = xbmcaddon.Addon()
+        addonSettings = get_settings()
         playback_type = addonSettings.getSetting("playback_type")
         server = downloadUtils.getServer()
         use_https = False
@@ -212,88 +212,69 @@ def getChecksum(item):
     return checksum
 
 
-def getArt(item, server):
-    art = {
-        'thumb': '',
-        'fanart': '',
-        'poster': '',
-        'banner': '',
-        'clearlogo': '',
-        'clearart': '',
-        'discart': '',
-        'landscape': '',
-        'tvshow.fanart': '',
-        'tvshow.poster': '',
-        'tvshow.clearart': '',
-        'tvshow.clearlogo': '',
-        'tvshow.banner': '',
-        'tvshow.landscape': ''
-    }
-    item_id = item["Id"]
-
-    image_id = item_id
-    imageTags = item["ImageTags"]
-    if imageTags is not None and imageTags["Primary"] is not None:
-        image_tag = imageTags["Primary"]
-        art['thumb'] = downloadUtils.getArtwork(item, "Primary", server=server)
-
-    item_type = item["Type"]
-
-    if item_type == "Genre":
-        art['poster'] = downloadUtils.getArtwork(item, "Primary", server=server)
-    elif item_type == "Episode":
-        art['tvshow.poster'] = downloadUtils.getArtwork(item, "Primary", parent=True, server=server)
-        #art['poster'] = downloadUtils.getArtwork(item, "Primary", parent=True, server=server)
-        art['tvshow.clearart'] = downloadUtils.getArtwork(item, "Art", parent=True, server=server)
-        art['clearart'] = downloadUtils.getArtwork(item, "Art", parent=True, server=server)
-        art['tvshow.clearlogo'] = downloadUtils.getArtwork(item, "Logo", parent=True, server=server)
-        art['clearlogo'] = downloadUtils.getArtwork(item, "Logo", parent=True, server=server)
-        art['tvshow.banner'] = downloadUtils.getArtwork(item, "Banner", parent=True, server=server)
-        art['banner'] = downloadUtils.getArtwork(item, "Banner", parent=True, server=server)
-        art['tvshow.landscape'] = downloadUtils.getArtwork(item, "Thumb", parent=True, server=server)
-        art['landscape'] = downloadUtils.getArtwork(item, "Thumb", parent=True, server=server)
-        art['tvshow.fanart'] = downloadUtils.getArtwork(item, "Backdrop", parent=True, server=server)
-        art['fanart'] = downloadUtils.getArtwork(item, "Backdrop", parent=True, server=server)
-    elif item_type == "Season":
-        art['tvshow.poster'] = downloadUtils.getArtwork(item, "Primary", parent=True, server=server)
-        art['season.poster'] = downloadUtils.getArtwork(item, "Primary", parent=False, server=server)
-        art['poster'] = downloadUtils.getArtwork(item, "Primary", parent=False, server=server)
-        art['tvshow.clearart'] = downloadUtils.getArtwork(item, "Art", parent=True, server=server)
-        art['clearart'] = downloadUtils.getArtwork(item, "Art", parent=True, server=server)
-        art['tvshow.clearlogo'] = downloadUtils.getArtwork(item, "Logo", parent=True, server=server)
-        art['clearlogo'] = downloadUtils.getArtwork(item, "Logo", parent=True, server=server)
-        art['tvshow.banner'] = downloadUtils.getArtwork(item, "Banner", parent=True, server=server)
-        art['season.banner'] = downloadUtils.getArtwork(item, "Banner", parent=False, server=server)
-        art['banner'] = downloadUtils.getArtwork(item, "Banner", parent=False, server=server)
-        art['tvshow.landscape'] = downloadUtils.getArtwork(item, "Thumb", parent=True, server=server)
-        art['season.landscape'] = downloadUtils.getArtwork(item, "Thumb", parent=False, server=server)
-        art['landscape'] = downloadUtils.getArtwork(item, "Thumb", parent=False, server=server)
-        art['tvshow.fanart'] = downloadUtils.getArtwork(item, "Backdrop", parent=True, server=server)
-        art['fanart'] = downloadUtils.getArtwork(item, "Backdrop", parent=True, server=server)
-    elif item_type == "Series":
-        art['tvshow.poster'] = downloadUtils.getArtwork(item, "Primary", parent=False, server=server)
-        art['poster'] = downloadUtils.getArtwork(item, "Primary", parent=False, server=server)
-        art['tvshow.clearart'] = downloadUtils.getArtwork(item, "Art", parent=False, server=server)
-        art['clearart'] = downloadUtils.getArtwork(item, "Art", parent=False, server=server)
-        art['tvshow.clearlogo'] = downloadUtils.getArtwork(item, "Logo", parent=False, server=server)
-        art['clearlogo'] = downloadUtils.getArtwork(item, "Logo", parent=False, server=server)
-        art['tvshow.banner'] = downloadUtils.getArtwork(item, "Banner", parent=False, server=server)
-        art['banner'] = downloadUtils.getArtwork(item, "Banner", parent=False, server=server)
-        art['tvshow.landscape'] = downloadUtils.getArtwork(item, "Thumb", parent=False, server=server)
-        art['landscape'] = downloadUtils.getArtwork(item, "Thumb", parent=False, server=server)
-        art['tvshow.fanart'] = downloadUtils.getArtwork(item, "Backdrop", parent=False, server=server)
-        art['fanart'] = downloadUtils.getArtwork(item, "Backdrop", parent=False, server=server)
-    elif item_type == "Movie" or item_type == "BoxSet":
-        art['poster'] = downloadUtils.getArtwork(item, "Primary", server=server)
-        art['landscape'] = downloadUtils.getArtwork(item, "Thumb", server=server)
-        art['banner'] = downloadUtils.getArtwork(item, "Banner", server=server)
-        art['clearlogo'] = downloadUtils.getArtwork(item, "Logo", server=server)
-        art['clearart'] = downloadUtils.getArtwork(item, "Art", server=server)
-        art['discart'] = downloadUtils.getArtwork(item, "Disc", server=server)
-
-    art['fanart'] = downloadUtils.getArtwork(item, "Backdrop", server=server)
+# the art keys getArt() sets for each item type as (art type, parent, art keys),
+# the keys of one entry are the same image so it is looked up once for all of them
+art_sources = {
+    "Genre": [
+        ("Primary", False, ("poster",))],
+    "Episode": [
+        ("Primary", True, ("tvshow.poster",)),
+        ("Art", True, ("tvshow.clearart", "clearart")),
+        ("Logo", True, ("tvshow.clearlogo", "clearlogo")),
+        ("Banner", True, ("tvshow.banner", "banner")),
+        ("Thumb", True, ("tvshow.landscape", "landscape")),
+        ("Backdrop", True, ("tvshow.fanart",))],
+    "Season": [
+        ("Primary", True, ("tvshow.poster",)),
+        ("Primary", False, ("season.poster", "poster")),
+        ("Art", True, ("tvshow.clearart", "clearart")),
+        ("Logo", True, ("tvshow.clearlogo", "clearlogo")),
+        ("Banner", True, ("tvshow.banner",)),
+        ("Banner", False, ("season.banner", "banner")),
+        ("Thumb", True, ("tvshow.landscape",)),
+        ("Thumb", False, ("season.landscape", "landscape")),
+        ("Backdrop", True, ("tvshow.fanart",))],
+    "Series": [
+        ("Primary", False, ("tvshow.poster", "poster")),
+        ("Art", False, ("tvshow.clearart", "clearart")),
+        ("Logo", False, ("tvshow.clearlogo", "clearlogo")),
+        ("Banner", False, ("tvshow.banner", "banner")),
+        ("Thumb", False, ("tvshow.landscape", "landscape")),
+        ("Backdrop", False, ("tvshow.fanart",))],
+    "Movie": [
+        ("Primary", False, ("poster",)),
+        ("Thumb", False, ("landscape",)),
+        ("Banner", False, ("banner",)),
+        ("Logo", False, ("clearlogo",)),
+        ("Art", False, ("clearart",)),
+        ("Disc", False, ("discart",))],
+}
+art_sources["BoxSet"] = art_sources["Movie"]
+
+empty_art = dict.fromkeys(['thumb', 'fanart', 'poster', 'banner', 'clearlogo', 'clearart', 'discart', 'landscape',
+                           'tvshow.fanart', 'tvshow.poster', 'tvshow.clearart', 'tvshow.clearlogo', 'tvshow.banner',
+                           'tvshow.landscape'], '')
+
+
+def getArt(item, server, art_urls=None):
+    """
+        the art dict for an item, art_urls is passed on to getArtwork() so the items of one list
+        share the urls of the images they have in common
+    """
+    if art_urls is None:
+        art_urls = {}
+    art = empty_art.copy()
+
+    art['thumb'] = downloadUtils.getArtwork(item, "Primary", server=server, art_urls=art_urls)
+
+    for art_type, parent, art_keys in art_sources.get(item.get("Type"), ()):
+        artwork = downloadUtils.getArtwork(item, art_type, parent=parent, server=server, art_urls=art_urls)
+        for art_key in art_keys:
+            art[art_key] = artwork
+
+    art['fanart'] = downloadUtils.getArtwork(item, "Backdrop", server=server, art_urls=art_urls)
     if not art['fanart']:
-        art['fanart'] = downloadUtils.getArtwork(item, "Backdrop", parent=True, server=server)
+        art['fanart'] = downloadUtils.getArtwork(item, "Backdrop", parent=True, server=server, art_urls=art_urls)
 
     return art
 
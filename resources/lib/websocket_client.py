@@ -15,6 +15,8 @@ from . import clientinfo
 from . import downloadutils
 from .json_rpc import json_rpc
 from .kodi_utils import HomeWindow
+from .datamanager import update_cached_user_data
+from .cache_store import get_cache_store
 
 log = SimpleLogging(__name__)
 
@@ -53,7 +55,7 @@ class WebSocketClient(threading.Thread):
 
         elif message_type == "UserDataChanged":
             data = result['Data']
-            self._library_changed(data)
+            self._user_data_changed(data)
 
         elif message_type == "LibraryChanged":
             data = result['Data']
@@ -66,8 +68,18 @@ class WebSocketClient(threading.Thread):
         else:
             log.debug("WebSocket Message Type: {0}", message)
 
+    def _user_data_changed(self, data):
+        # watched and favorite changes from any client go straight into the cached items
+        user_id = data.get("UserId")
+        for user_data in data.get("UserDataList", []):
+            item_id = user_data.get("ItemId")
+            if user_id and item_id:
+                update_cached_user_data(user_id, item_id, user_data)
+        self._library_changed(data)
+
     def _library_changed(self, data):
         log.debug("Library_Changed: {0}", data)
+        get_cache_store().expire_content()
         self._library_monitor.check_for_updates()
 
     def _play(cls, data):
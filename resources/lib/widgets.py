@@ -9,7 +9,7 @@ import time
 import random
 import sys
 
-from .downloadutils import DownloadUtils
+from .downloadutils import DownloadUtils, request_executor
 from .utils import getArt, get_emby_url
 from .datamanager import DataManager
 from .simple_logging import SimpleLogging
@@ -136,18 +136,6 @@ def checkForNewContent():
 
     added_url = get_emby_url('{server}/emby/Users/{userid}/Items', url_params)
 
-    added_result = downloadUtils.downloadUrl(added_url, suppress=True)
-    result = json.loads(added_result)
-    log.debug("LATEST_ADDED_ITEM: {0}", result)
-
-    last_added_date = ""
-    if result is not None:
-        items = result.get("Items", [])
-        if len(items) > 0:
-            item = items[0]
-            last_added_date = item.get("Etag", "")
-    log.debug("last_added_date: {0}", last_added_date)
-
     url_params = {}
     url_params["Recursive"] = True
     url_params["limit"] = 1
@@ -160,7 +148,25 @@ def checkForNewContent():
 
     played_url = get_emby_url('{server}/emby/Users/{userid}/Items', url_params)
 
-    played_result = downloadUtils.downloadUrl(played_url, suppress=True)
+    # the two queries do not depend on each other so run them at the same time
+    added_future = request_executor.submit(downloadUtils.downloadUrl, added_url, suppress=True)
+    played_future = request_executor.submit(downloadUtils.downloadUrl, played_url, suppress=True)
+    added_result = added_future.result()
+    played_result = played_future.result()
+    if added_result is None or played_result is None:
+        return False
+
+    result = json.loads(added_result)
+    log.debug("LATEST_ADDED_ITEM: {0}", result)
+
+    last_added_date = ""
+    if result is not None:
+        items = result.get("Items", [])
+        if len(items) > 0:
+            item = items[0]
+            last_added_date = item.get("Etag", "")
+    log.debug("last_added_date: {0}", last_added_date)
+
     result = json.loads(played_result)
     log.debug("LATEST_PLAYED_ITEM: {0}", result)
 
@@ -196,7 +202,8 @@ def get_widget_content_cast(handle, params):
 
     item_id = params["id"]
     data_manager = DataManager()
-    result = data_manager.GetContent("{server}/emby/Users/{userid}/Items/" + item_id + "?format=json")
+    result = data_manager.GetContent("{server}/emby/Users/{userid}/Items/" + item_id + "?format=json",
+                                     use_cache=True)
     log.debug("ItemInfo: {0}", result)
 
     if not result:
@@ -5,10 +5,9 @@ import time
 import traceback
 
 import xbmc
-import xbmcaddon
 import xbmcgui
 
-from resources.lib.downloadutils import DownloadUtils, save_user_details
+from resources.lib.downloadutils import DownloadUtils, save_user_details, connection_pool, request_executor
 from resources.lib.simple_logging import SimpleLogging
 from resources.lib.play_utils import Service, PlaybackService, sendProgress
 from resources.lib.kodi_utils import HomeWindow
@@ -18,11 +17,13 @@ from resources.lib.menu_functions import set_library_window_values
 from resources.lib.context_monitor import ContextMonitor
 from resources.lib.server_detect import checkServer, check_safe_delete_available
 from resources.lib.library_change_monitor import LibraryChangeMonitor
-from resources.lib.datamanager import clear_old_cache_data
+from resources.lib.cache_cleanup import start_cache_cleanup, stop_cache_cleanup
 from resources.lib.tracking import set_timing_enabled
 from resources.lib.image_server import HttpImageServerThread
+from resources.lib.list_cache_server import ListCacheServerThread
+from resources.lib.settings_snapshot import get_settings, invalidate_settings
 
-settings = xbmcaddon.Addon()
+settings = get_settings()
 
 log_timing_data = settings.getSetting('log_timing') == "true"
 if log_timing_data:
@@ -37,11 +38,6 @@ home_window.clearProperty("Params")
 log = SimpleLogging('service')
 monitor = xbmc.Monitor()
 
-try:
-    clear_old_cache_data()
-except Exception as error:
-    log.error("Error in clear_old_cache_data() : {0}", error)
-
 # wait for 10 seconds for the Kodi splash screen to close
 i = 0
 while not monitor.abortRequested():
@@ -51,20 +47,28 @@ while not monitor.abortRequested():
     xbmc.sleep(100)
 
 checkServer()
+# the server details may have been set from another process before the settings monitor is running
+invalidate_settings()
+settings = get_settings()
 
 download_utils = DownloadUtils()
 
-# auth the service
-try:
+
+def service_auth():
     download_utils.authenticate()
     download_utils.getUserId()
-except Exception as error:
-    log.error("Error with initial service auth: {0}", error)
+
+
+# auth the service in the background while the rest of the service starts up
+auth_future = request_executor.submit(service_auth)
 
 
 image_server = HttpImageServerThread()
 image_server.start()
 
+list_cache_server = ListCacheServerThread()
+list_cache_server.start()
+
 # set up all the services
 monitor = Service()
 playback_service = PlaybackService(monitor)
@@ -85,12 +89,24 @@ safe_delete_check = False
 library_change_monitor = LibraryChangeMonitor()
 library_change_monitor.start()
 
+try:
+    auth_future.result()
+except Exception as error:
+    log.error("Error with initial service auth: {0}", error)
+
+# the plugin list check only needs the auth to be done
+request_executor.submit(check_safe_delete_available)
+safe_delete_check = True
+
 # start the WebSocket Client running
 remote_control = settings.getSetting('websocket_enabled') == "true"
 websocket_client = WebSocketClient(library_change_monitor)
 if remote_control:
     websocket_client.start()
 
+# clean up the list cache once the start up is done
+start_cache_cleanup(30)
+
 # Start the context menu monitor
 context_monitor = None
 context_menu = settings.getSetting('override_contextmenu') == "true"
@@ -154,7 +170,7 @@ while not xbmc.abortRequested:
                     websocket_client.start()
 
                 if user_changed or not safe_delete_check:
-                    check_safe_delete_available()
+                    request_executor.submit(check_safe_delete_available)
                     safe_delete_check = True
 
             elif screen_saver_active:
@@ -169,7 +185,9 @@ while not xbmc.abortRequested:
 
     xbmc.sleep(1000)
 
+stop_cache_cleanup()
 image_server.stop()
+list_cache_server.stop()
 
 # call stop on the library update monitor
 library_change_monitor.stop()
@@ -181,6 +199,9 @@ if context_monitor:
 # stop the WebSocket Client
 websocket_client.stop_client()
 
+log.debug("Connection pool stats: {0}", connection_pool.get_stats())
+connection_pool.clear()
+
 # clear user and token when loggin off
 home_window.clearProperty("userid")
 home_window.clearProperty("AccessToken")
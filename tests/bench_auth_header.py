@@ -0,0 +1,63 @@
+# Gnu General Public License - see LICENSE.TXT
+
+# the cost of the auth headers added to every request, read from the cached AuthContext
+# against looking up the user and token and building the headers again like before
+# python tests/bench_auth_header.py [calls]
+
+import os
+import sys
+import time
+
+args = sys.argv[1:]
+addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, addon_dir)
+
+from tests import kodi_stubs
+
+
+def rebuild_headers(download_utils):
+    userid = download_utils.getUserId()
+    token = download_utils.authenticate()
+    return dict(download_utils.build_auth_context(userid, token, True).headers)
+
+
+def time_calls(function, calls):
+    best = None
+    for run in range(5):
+        started = time.time()
+        for call in range(calls):
+            function()
+        elapsed = time.time() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best / calls * 1000000
+
+
+def main():
+    calls = int(args[0]) if args else 20000
+
+    from resources.lib.kodi_utils import HomeWindow
+    from resources.lib.downloadutils import DownloadUtils
+    home_window = HomeWindow()
+    home_window.setProperty("userid", "uid1")
+    home_window.setProperty("AccessToken", "token")
+    home_window.setProperty("userimage", "image")
+
+    download_utils = DownloadUtils()
+    if download_utils.getAuthHeader() != rebuild_headers(download_utils):
+        print("the cached and the rebuilt headers differ")
+        sys.exit(1)
+
+    cached = time_calls(download_utils.getAuthHeader, calls)
+    rebuilt = time_calls(lambda: rebuild_headers(download_utils), calls)
+    public_cached = time_calls(lambda: download_utils.getAuthHeader(authenticate=False), calls)
+    public_rebuilt = time_calls(lambda: dict(download_utils.build_auth_context("", "", False).headers), calls)
+
+    print("%d calls, best of 5" % calls)
+    print("%-16s %14s %14s" % ("", "cached", "rebuilt"))
+    print("%-16s %11.2f us %11.2f us" % ("user headers", cached, rebuilt))
+    print("%-16s %11.2f us %11.2f us" % ("public headers", public_cached, public_rebuilt))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Gnu General Public License - see LICENSE.TXT
+
+# size and load time of a cached item list pickled as ItemDetails instances against the packed columnar form,
+# all rows is the load with every ItemDetails built, the packed list builds them when they are first read
+# python tests/bench_columnar_cache.py [item count]
+
+import os
+import sys
+import json
+import time
+import cPickle
+from collections import defaultdict
+
+args = sys.argv[1:]
+addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, addon_dir)
+
+from tests import kodi_stubs
+from tests import emby_server
+
+from resources.lib.item_functions import extract_item_info, item_defaults
+from resources.lib.datamanager import CacheItem
+
+gui_options = {"server": "http://127.0.0.1:8096", "name_format": None, "name_format_type": None}
+item_types = ["Movie", "Episode", "Series"]
+
+
+def make_items(item_count):
+    items = []
+    for index in range(item_count):
+        item = json.loads(json.dumps(emby_server.make_item(index, item_types[index % len(item_types)])),
+                          object_hook=lambda d: defaultdict(lambda: None, d))
+        items.append(extract_item_info(item, gui_options))
+    return items
+
+
+def get_fields(items):
+    return [[getattr(item, name) for name in sorted(item_defaults)] for item in items]
+
+
+def time_best(function, runs=5):
+    best = None
+    for run in range(runs):
+        started = time.time()
+        function()
+        elapsed = time.time() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main():
+    item_count = int(args[0]) if args else 10000
+    items = make_items(item_count)
+
+    cache_item = CacheItem()
+    cache_item.url_hash = "bench"
+    cache_item.item_list = items
+
+    pickled = cPickle.dumps(items, cPickle.HIGHEST_PROTOCOL)
+    packed = cPickle.dumps(cache_item, cPickle.HIGHEST_PROTOCOL)
+
+    loaded = list(cPickle.loads(packed).item_list)
+    if get_fields(loaded) != get_fields(items):
+        print("the packed list does not load back the same items")
+        sys.exit(1)
+
+    print("%d items, best of 5" % item_count)
+    print("%-8s %10s %10s %10s %10s" % ("", "size", "dump", "load", "all rows"))
+    print("%-8s %8.1fMB %8.3fs %8.3fs %8.3fs" % (
+        "pickled", len(pickled) / 1048576.0,
+        time_best(lambda: cPickle.dumps(items, cPickle.HIGHEST_PROTOCOL)),
+        time_best(lambda: cPickle.loads(pickled)),
+        time_best(lambda: cPickle.loads(pickled))))
+    print("%-8s %8.1fMB %8.3fs %8.3fs %8.3fs" % (
+        "packed", len(packed) / 1048576.0,
+        time_best(lambda: cPickle.dumps(cache_item, cPickle.HIGHEST_PROTOCOL)),
+        time_best(lambda: cPickle.loads(packed)),
+        time_best(lambda: list(cPickle.loads(packed).item_list))))
+
+
+if __name__ == "__main__":
+    main()
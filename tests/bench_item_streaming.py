@@ -0,0 +1,99 @@
+# Gnu General Public License - see LICENSE.TXT
+
+# peak memory and time to first item for a large Items response,
+# read whole and parsed in one go like before against streamed and parsed an item at a time
+# python tests/bench_item_streaming.py [item count]
+
+import os
+import sys
+import json
+import time
+import resource
+import subprocess
+from collections import defaultdict
+
+args = sys.argv[1:]
+addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, addon_dir)
+
+from tests import kodi_stubs
+from tests import emby_server
+
+port = 18096
+items_url = "{server}/emby/Users/{userid}/Items?Recursive=true&format=json"
+gui_options = {"server": "http://127.0.0.1:%d" % port, "name_format": None, "name_format_type": None}
+
+
+def peak_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def load_whole():
+    from resources.lib.downloadutils import DownloadUtils
+    from resources.lib.item_functions import extract_item_info
+    started = time.time()
+    json_data = DownloadUtils().downloadUrl(items_url)
+    result = json.loads(json_data, object_hook=lambda d: defaultdict(lambda: None, d))
+    first_item = None
+    item_list = []
+    for item in result["Items"]:
+        item_list.append(extract_item_info(item, gui_options))
+        if first_item is None:
+            first_item = time.time() - started
+    return item_list, first_item, time.time() - started
+
+
+def load_streamed():
+    from resources.lib.datamanager import DataManager
+    from resources.lib.item_functions import extract_items
+    started = time.time()
+    reader = DataManager().stream_items(items_url)
+    first_item = None
+    item_list = []
+    for item_details in extract_items(reader.items(), gui_options):
+        item_list.append(item_details)
+        if first_item is None:
+            first_item = time.time() - started
+    return item_list, first_item, time.time() - started
+
+
+def run_child(mode):
+    kodi_stubs.settings["port"] = str(port)
+    kodi_stubs.settings["http_timeout"] = "60"
+    from resources.lib.kodi_utils import HomeWindow
+    home_window = HomeWindow()
+    home_window.setProperty("userid", "uid1")
+    home_window.setProperty("AccessToken", "token")
+
+    # the imports and the connection are not part of what is measured
+    from resources.lib.downloadutils import DownloadUtils
+    DownloadUtils().downloadUrl("{server}/emby/System/Info/Public?format=json", authenticate=False)
+    before = peak_kb()
+    if mode == "whole":
+        item_list, first_item, total = load_whole()
+    else:
+        item_list, first_item, total = load_streamed()
+    print(json.dumps({"items": len(item_list), "first_item": first_item, "total": total,
+                      "peak_kb": peak_kb() - before}))
+
+
+def main():
+    if len(args) > 1 and args[0] == "--child":
+        run_child(args[1])
+        return
+
+    item_count = int(args[0]) if args else 20000
+    emby_server.state["items"] = item_count
+    emby_server.start(port)
+
+    print("%d items" % item_count)
+    print("%-10s %12s %12s %14s" % ("", "first item", "all items", "peak memory"))
+    for mode in ("whole", "streamed"):
+        output = subprocess.check_output([sys.executable, os.path.abspath(__file__), "--child", mode], cwd=addon_dir)
+        result = json.loads(output.strip().splitlines()[-1])
+        print("%-10s %10.3f s %10.3f s %11.1f MB" % (mode, result["first_item"], result["total"],
+                                                     result["peak_kb"] / 1024.0))
+
+
+if __name__ == "__main__":
+    main()
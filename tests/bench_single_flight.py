@@ -0,0 +1,82 @@
+# Gnu General Public License - see LICENSE.TXT
+
+# upstream requests made when several plugin processes ask for the same url at the same moment,
+# like the widgets of the home screen do, with single flight and with it turned off like before
+# python tests/bench_single_flight.py [process count] [server delay]
+
+import os
+import sys
+import json
+import time
+import subprocess
+
+args = sys.argv[1:]
+addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, addon_dir)
+
+from tests import kodi_stubs
+from tests import emby_server
+
+port = 18099
+items_url = "{server}/emby/Users/{userid}/Items?Recursive=true&IncludeItemTypes=Movie&format=json"
+
+
+def run_child(mode, request_type, start_at):
+    kodi_stubs.settings["port"] = str(port)
+    kodi_stubs.settings["http_timeout"] = "30"
+    from resources.lib.kodi_utils import HomeWindow
+    from resources.lib.downloadutils import DownloadUtils
+    home_window = HomeWindow()
+    home_window.setProperty("userid", "uid1")
+    home_window.setProperty("AccessToken", "token")
+    home_window.setProperty("userimage", "image")
+    if mode == "off":
+        DownloadUtils.join_flight = lambda self, *args: (None, None)
+
+    download_utils = DownloadUtils()
+    time.sleep(max(0.0, start_at - time.time()))
+    started = time.time()
+    if request_type == "downloadUrl":
+        body = download_utils.downloadUrl(items_url)
+    else:
+        body = "".join(download_utils.stream_url(items_url))
+    print(json.dumps({"length": len(body), "time": time.time() - started}))
+
+
+def run_processes(mode, request_type, process_count):
+    start_at = time.time() + 2.0
+    children = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "--child", mode, request_type,
+                                  repr(start_at)], cwd=addon_dir, stdout=subprocess.PIPE)
+                for index in range(process_count)]
+    before = emby_server.state["requests"]
+    results = [json.loads(child.communicate()[0].strip().splitlines()[-1]) for child in children]
+    requests = emby_server.state["requests"] - before
+    lengths = set(result["length"] for result in results)
+    slowest = max(result["time"] for result in results)
+    return requests, lengths, slowest
+
+
+def main():
+    if len(args) > 3 and args[0] == "--child":
+        run_child(args[1], args[2], float(args[3]))
+        return
+
+    process_count = int(args[0]) if args else 8
+    emby_server.state["delay"] = float(args[1]) if len(args) > 1 else 0.5
+    emby_server.state["items"] = 500
+    emby_server.start(port)
+    os.environ["EMBYCON_TEST_PROFILE"] = kodi_stubs.profile_dir
+
+    print("%d processes, server delay %.1fs" % (process_count, emby_server.state["delay"]))
+    print("%-12s %-18s %9s %14s" % ("", "", "requests", "slowest"))
+    for request_type in ("downloadUrl", "stream_url"):
+        for mode in ("off", "on"):
+            requests, lengths, slowest = run_processes(mode, request_type, process_count)
+            if len(lengths) != 1 or min(lengths) < 1000:
+                print("the processes did not all get the whole list %s" % sorted(lengths))
+                sys.exit(1)
+            print("%-12s %-18s %9d %12.3f s" % (request_type, "single flight " + mode, requests, slowest))
+
+
+if __name__ == "__main__":
+    main()
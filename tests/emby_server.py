@@ -0,0 +1,123 @@
+# Gnu General Public License - see LICENSE.TXT
+
+# a local stand-in for the Emby server api the benchmarks and tests use, it counts the requests it answers
+
+import re
+import json
+import gzip
+import time
+import threading
+from StringIO import StringIO
+from urlparse import urlparse, parse_qs
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+
+state = {
+    "requests": 0,
+    "connections": 0,
+    "items": 50,
+    "delay": 0.0,
+    "etag": None,
+    # send only this many bytes of the body and then drop the connection
+    "truncate": None,
+}
+state_lock = threading.Lock()
+
+
+def make_item(index, item_type="Movie"):
+    return {
+        "Id": "id%05d" % index, "Etag": "e%d" % index, "IsFolder": False, "Type": item_type,
+        "LocationType": "FileSystem", "Name": u"Movie \xe9 %d" % index, "SortName": "movie %05d" % index,
+        "ProductionYear": 2000 + index % 20, "PremiereDate": "2001-01-01T00:00:00.0000000Z",
+        "DateCreated": "2019-01-01T10:00:00.0000000Z", "Genres": ["Action", "Drama"],
+        "Studios": [{"Name": "Studio"}], "Taglines": ["tag"],
+        "ImageTags": {"Primary": "p%d" % index, "Logo": "l%d" % index}, "BackdropImageTags": ["b%d" % index],
+        "People": [{"Name": "Actor %d" % person, "Role": "Role", "Id": "pid%d" % person, "Type": "Actor",
+                    "PrimaryImageTag": "pt%d" % person} for person in range(3)] +
+                  [{"Name": "Director", "Type": "Director", "Id": "did"}],
+        "MediaStreams": [{"Type": "Video", "Codec": "h264", "Height": 1080, "Width": 1920, "AspectRatio": "16:9"},
+                         {"Type": "Audio", "Codec": "ac3", "Channels": 6, "Language": "eng"},
+                         {"Type": "Subtitle", "Language": "eng"}],
+        "UserData": {"Played": index % 3 == 0, "IsFavorite": False, "PlaybackPositionTicks": 0},
+        "RunTimeTicks": 72000000000, "OfficialRating": "PG", "CommunityRating": 7.5,
+        "Overview": "Some text " * 10}
+
+
+class EmbyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        return
+
+    def setup(self):
+        with state_lock:
+            state["connections"] += 1
+        BaseHTTPRequestHandler.setup(self)
+
+    def send_json(self, value, extra_headers=None):
+        body = json.dumps(value)
+        gzipped = "gzip" in (self.headers.get("Accept-Encoding") or "")
+        if gzipped:
+            gzip_data = StringIO()
+            gzip_file = gzip.GzipFile(fileobj=gzip_data, mode="wb")
+            gzip_file.write(body)
+            gzip_file.close()
+            body = gzip_data.getvalue()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if state["truncate"] is not None:
+            self.wfile.write(body[:state["truncate"]])
+            self.wfile.flush()
+            self.close_connection = 1
+            return
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.do_GET()
+
+    def do_GET(self):
+        with state_lock:
+            state["requests"] += 1
+        if state["delay"]:
+            time.sleep(state["delay"])
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/emby/Users/Public":
+            return self.send_json([{"Name": "user", "Id": "uid1", "HasPassword": False}])
+        if url.path == "/emby/Users/AuthenticateByName":
+            return self.send_json({"AccessToken": "token", "User": {"Id": "uid1"}})
+        if url.path == "/emby/System/Info/Public":
+            return self.send_json({"Id": "server"})
+        if state["etag"] is not None and self.headers.get("If-None-Match") == state["etag"]:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        extra_headers = {"ETag": state["etag"]} if state["etag"] is not None else None
+        match = re.match(r"/emby/Users/[^/]+/Items/(id\d+)$", url.path)
+        if match is not None:
+            return self.send_json(make_item(int(match.group(1)[2:])), extra_headers)
+        items = [make_item(index) for index in range(state["items"])]
+        if query.get("Limit") == ["0"]:
+            items = []
+        return self.send_json({"Items": items, "TotalRecordCount": state["items"]}, extra_headers)
+
+
+class EmbyServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start(port=8096):
+    server = EmbyServer(("127.0.0.1", port), EmbyHandler)
+    server_thread = threading.Thread(target=server.serve_forever)
+    server_thread.daemon = True
+    server_thread.start()
+    return server
@@ -0,0 +1,224 @@
+# Gnu General Public License - see LICENSE.TXT
+
+# stand-ins for the Kodi modules so the addon code can be imported and timed outside Kodi,
+# they are only installed when the real modules can not be imported
+
+import os
+import sys
+import time
+import types
+import tempfile
+
+# processes started by a benchmark share the profile dir of the one that started them
+profile_dir = os.environ.get("EMBYCON_TEST_PROFILE") or tempfile.mkdtemp(prefix="embycon_test_")
+
+settings = {
+    "protocol": "0", "ipaddress": "127.0.0.1", "port": "8096", "verify_cert": "false", "http_timeout": "5",
+    "username": "user", "password": "", "save_user_to_settings": "true", "log_debug": "false",
+    "suppressErrors": "true", "include_media": "true", "include_people": "true", "include_overview": "true",
+    "show_x_filtered_items": "20", "deviceName": "EmbyCon", "use_cache": "true", "profile_count": "0"}
+
+addon_info = {
+    "name": "EmbyCon", "version": "1.9.77", "profile": "special://profile/", "icon": "icon.png",
+    "id": "plugin.video.embycon",
+    "path": os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}
+
+window_properties = {}
+
+
+def make_xbmc():
+    module = types.ModuleType("xbmc")
+    module.LOGDEBUG = 0
+    module.LOGINFO = 1
+    module.LOGNOTICE = 2
+    module.LOGWARNING = 3
+    module.LOGERROR = 4
+    module.PLAYLIST_VIDEO = 1
+    module.abortRequested = False
+
+    def translatePath(path):
+        if path.startswith("special://"):
+            rest = path[len("special://"):].split("/", 1)
+            return os.path.join(profile_dir, rest[1] if len(rest) > 1 else "")
+        return path
+
+    class Monitor(object):
+        def abortRequested(self):
+            return False
+
+        def waitForAbort(self, timeout=0):
+            time.sleep(min(timeout, 0.01))
+            return False
+
+    class Player(object):
+        def isPlaying(self):
+            return False
+
+        def isPlayingVideo(self):
+            return False
+
+    class PlayList(object):
+        def __init__(self, *args):
+            pass
+
+    module.log = lambda message, level=0: None
+    module.translatePath = translatePath
+    module.sleep = lambda ms: time.sleep(ms / 1000.0)
+    module.getInfoLabel = lambda label: "18.5" if label == "System.BuildVersion" else ""
+    module.getCondVisibility = lambda condition: False
+    module.executebuiltin = lambda command: None
+    module.executeJSONRPC = lambda command: "{}"
+    module.Monitor = Monitor
+    module.Player = Player
+    module.PlayList = PlayList
+    return module
+
+
+def make_xbmcaddon():
+    module = types.ModuleType("xbmcaddon")
+
+    class Addon(object):
+        def __init__(self, id=None):
+            pass
+
+        def getSetting(self, key):
+            return settings.get(key, "")
+
+        def setSetting(self, key, value):
+            settings[key] = value
+
+        def getAddonInfo(self, key):
+            return addon_info.get(key, "")
+
+        def getLocalizedString(self, string_id):
+            return u"string %d" % string_id
+
+        def openSettings(self):
+            pass
+
+    module.Addon = Addon
+    return module
+
+
+def make_xbmcgui():
+    module = types.ModuleType("xbmcgui")
+
+    class Window(object):
+        def __init__(self, window_id=0):
+            pass
+
+        def getProperty(self, key):
+            return window_properties.get(key, "")
+
+        def setProperty(self, key, value):
+            window_properties[key] = value
+
+        def clearProperty(self, key):
+            window_properties.pop(key, None)
+
+    class AnyCall(object):
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __getattr__(self, name):
+            return lambda *args, **kwargs: None
+
+    class ListItem(AnyCall):
+        def __init__(self, *args, **kwargs):
+            self.properties = {}
+
+        def setProperty(self, key, value):
+            self.properties[key] = value
+
+        def getProperty(self, key):
+            return self.properties.get(key)
+
+    module.Window = Window
+    module.Dialog = AnyCall
+    module.DialogProgress = AnyCall
+    module.DialogProgressBG = AnyCall
+    module.WindowXMLDialog = AnyCall
+    module.WindowXML = AnyCall
+    module.ListItem = ListItem
+    module.NOTIFICATION_INFO = "info"
+    module.NOTIFICATION_WARNING = "warning"
+    module.NOTIFICATION_ERROR = "error"
+    module.ACTION_PREVIOUS_MENU = 10
+    module.ACTION_NAV_BACK = 92
+    module.getCurrentWindowId = lambda: 10000
+    return module
+
+
+def make_xbmcplugin():
+    module = types.ModuleType("xbmcplugin")
+    for name in ("setContent", "addDirectoryItems", "addDirectoryItem", "endOfDirectory", "addSortMethod",
+                 "setResolvedUrl", "setPluginCategory"):
+        setattr(module, name, lambda *args, **kwargs: None)
+    for name in ("UNSORTED", "VIDEO_YEAR", "VIDEO_SORT_TITLE_IGNORE_THE", "EPISODE", "TRACKNUM", "DATEADDED",
+                 "GENRE", "NONE", "VIDEO_RATING", "LABEL", "VIDEO_RUNTIME", "LASTPLAYED", "PLAYCOUNT"):
+        setattr(module, "SORT_METHOD_" + name, 0)
+    return module
+
+
+def make_xbmcvfs():
+    module = types.ModuleType("xbmcvfs")
+
+    def listdir(path):
+        names = os.listdir(path) if os.path.isdir(path) else []
+        return ([name for name in names if os.path.isdir(os.path.join(path, name))],
+                [name for name in names if os.path.isfile(os.path.join(path, name))])
+
+    def delete(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def mkdirs(path):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        return True
+
+    class File(object):
+        def __init__(self, path, mode="r"):
+            self.path = path
+
+        def read(self):
+            try:
+                with open(self.path) as stored:
+                    return stored.read()
+            except IOError:
+                return ""
+
+        def write(self, data):
+            with open(self.path, "w") as stored:
+                stored.write(data)
+            return True
+
+        def close(self):
+            pass
+
+    module.File = File
+    module.listdir = listdir
+    module.delete = delete
+    module.exists = os.path.exists
+    module.mkdirs = mkdirs
+    return module
+
+
+def install():
+    try:
+        import xbmc
+        return False
+    except ImportError:
+        pass
+    for name, make_module in (("xbmc", make_xbmc), ("xbmcaddon", make_xbmcaddon), ("xbmcgui", make_xbmcgui),
+                              ("xbmcplugin", make_xbmcplugin), ("xbmcvfs", make_xbmcvfs)):
+        sys.modules[name] = make_module()
+    # the addon reads its plugin url and handle from the command line, scripts read their own args first
+    sys.argv = ["plugin://plugin.video.embycon/", "1", ""]
+    return True
+
+
+install()
@@ -0,0 +1,232 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import unittest
+
+from tests import kodi_stubs
+
+from resources.lib import utils
+from resources.lib.utils import getArt
+from resources.lib.downloadutils import DownloadUtils
+
+item_types = ["Movie", "BoxSet", "Episode", "Season", "Series", "Genre", "Audio", "MusicAlbum", "Folder", None]
+art_types = ["Primary", "Art", "Logo", "Banner", "Thumb", "Disc"]
+servers = ["http://127.0.0.1:8096", u"https://h\xe9st:8920", u"http://emby.local:8096", "http://h%20st:80", None]
+# (use_https, verify_cert)
+connections = [(False, False), (True, False), (True, True)]
+
+
+def old_get_artwork(data, art_type, parent=False, index=0, server=None, use_https=False, verify_cert=False):
+    """
+        DownloadUtils.getArtwork() as it was before the url templates
+    """
+    id = data.get("Id")
+    item_type = data.get("Type")
+
+    if item_type in ["Episode", "Season"]:
+        if art_type != "Primary" or parent == True:
+            id = data.get("SeriesId")
+
+    imageTag = ""
+    if item_type == "Episode" and art_type == "Backdrop":
+        id = data.get("ParentBackdropItemId")
+        bgItemTags = data.get("ParentBackdropImageTags")
+        if bgItemTags is not None and len(bgItemTags) > 0:
+            imageTag = bgItemTags[0]
+    elif art_type == "Backdrop" and parent is True:
+        id = data.get("ParentBackdropItemId")
+        bgItemTags = data.get("ParentBackdropImageTags")
+        if bgItemTags is not None and len(bgItemTags) > 0:
+            imageTag = bgItemTags[0]
+    elif art_type == "Backdrop":
+        BGTags = data.get("BackdropImageTags")
+        if BGTags is not None and len(BGTags) > index:
+            imageTag = BGTags[index]
+    elif parent is False:
+        image_tags = data.get("ImageTags")
+        if image_tags is not None:
+            image_tag_type = image_tags.get(art_type)
+            if image_tag_type is not None:
+                imageTag = image_tag_type
+    elif parent is True:
+        if (item_type == "Episode" or item_type == "Season") and art_type == 'Primary':
+            tagName = 'SeriesPrimaryImageTag'
+            idName = 'SeriesId'
+        else:
+            tagName = 'Parent%sImageTag' % art_type
+            idName = 'Parent%sItemId' % art_type
+        parent_image_id = data.get(idName)
+        parent_image_tag = data.get(tagName)
+        if parent_image_id is not None and parent_image_tag is not None:
+            id = parent_image_id
+            imageTag = parent_image_tag
+
+    if not imageTag and not ((art_type == 'Banner' or art_type == 'Art') and parent is True):
+        return ""
+
+    artwork = "%s/emby/Items/%s/Images/%s/%s?Format=original&Tag=%s" % (server, id, art_type, index, imageTag)
+
+    if use_https and not verify_cert:
+        artwork += "|verifypeer=false"
+
+    return artwork
+
+
+def old_get_art(item, server, use_https=False, verify_cert=False):
+    """
+        utils.getArt() as it was before the art_sources table
+    """
+    def get_artwork(art_type, parent=False):
+        return old_get_artwork(item, art_type, parent=parent, server=server, use_https=use_https,
+                               verify_cert=verify_cert)
+
+    art = dict.fromkeys(['thumb', 'fanart', 'poster', 'banner', 'clearlogo', 'clearart', 'discart', 'landscape',
+                         'tvshow.fanart', 'tvshow.poster', 'tvshow.clearart', 'tvshow.clearlogo', 'tvshow.banner',
+                         'tvshow.landscape'], '')
+
+    imageTags = item.get("ImageTags")
+    if imageTags is not None and imageTags.get("Primary") is not None:
+        art['thumb'] = get_artwork("Primary")
+
+    item_type = item.get("Type")
+    if item_type == "Genre":
+        art['poster'] = get_artwork("Primary")
+    elif item_type == "Episode":
+        art['tvshow.poster'] = get_artwork("Primary", True)
+        art['tvshow.clearart'] = get_artwork("Art", True)
+        art['clearart'] = get_artwork("Art", True)
+        art['tvshow.clearlogo'] = get_artwork("Logo", True)
+        art['clearlogo'] = get_artwork("Logo", True)
+        art['tvshow.banner'] = get_artwork("Banner", True)
+        art['banner'] = get_artwork("Banner", True)
+        art['tvshow.landscape'] = get_artwork("Thumb", True)
+        art['landscape'] = get_artwork("Thumb", True)
+        art['tvshow.fanart'] = get_artwork("Backdrop", True)
+        art['fanart'] = get_artwork("Backdrop", True)
+    elif item_type == "Season":
+        art['tvshow.poster'] = get_artwork("Primary", True)
+        art['season.poster'] = get_artwork("Primary", False)
+        art['poster'] = get_artwork("Primary", False)
+        art['tvshow.clearart'] = get_artwork("Art", True)
+        art['clearart'] = get_artwork("Art", True)
+        art['tvshow.clearlogo'] = get_artwork("Logo", True)
+        art['clearlogo'] = get_artwork("Logo", True)
+        art['tvshow.banner'] = get_artwork("Banner", True)
+        art['season.banner'] = get_artwork("Banner", False)
+        art['banner'] = get_artwork("Banner", False)
+        art['tvshow.landscape'] = get_artwork("Thumb", True)
+        art['season.landscape'] = get_artwork("Thumb", False)
+        art['landscape'] = get_artwork("Thumb", False)
+        art['tvshow.fanart'] = get_artwork("Backdrop", True)
+        art['fanart'] = get_artwork("Backdrop", True)
+    elif item_type == "Series":
+        art['tvshow.poster'] = get_artwork("Primary", False)
+        art['poster'] = get_artwork("Primary", False)
+        art['tvshow.clearart'] = get_artwork("Art", False)
+        art['clearart'] = get_artwork("Art", False)
+        art['tvshow.clearlogo'] = get_artwork("Logo", False)
+        art['clearlogo'] = get_artwork("Logo", False)
+        art['tvshow.banner'] = get_artwork("Banner", False)
+        art['banner'] = get_artwork("Banner", False)
+        art['tvshow.landscape'] = get_artwork("Thumb", False)
+        art['landscape'] = get_artwork("Thumb", False)
+        art['tvshow.fanart'] = get_artwork("Backdrop", False)
+        art['fanart'] = get_artwork("Backdrop", False)
+    elif item_type == "Movie" or item_type == "BoxSet":
+        art['poster'] = get_artwork("Primary")
+        art['landscape'] = get_artwork("Thumb")
+        art['banner'] = get_artwork("Banner")
+        art['clearlogo'] = get_artwork("Logo")
+        art['clearart'] = get_artwork("Art")
+        art['discart'] = get_artwork("Disc")
+
+    art['fanart'] = get_artwork("Backdrop")
+    if not art['fanart']:
+        art['fanart'] = get_artwork("Backdrop", True)
+
+    return art
+
+
+def make_items(item_type):
+    """
+        items of the type with every tag, and with the image, backdrop, parent and series tags missing or empty
+    """
+    full = {"Id": u"id1", "Type": item_type, "SeriesId": u"series1", "SeriesPrimaryImageTag": u"sp1",
+            "ImageTags": dict((art_type, u"%s1" % art_type) for art_type in art_types),
+            "BackdropImageTags": [u"b1", u"b2"],
+            "ParentBackdropItemId": u"series1", "ParentBackdropImageTags": [u"pb1"]}
+    for art_type in ["Logo", "Thumb", "Art", "Banner", "Primary"]:
+        full["Parent%sItemId" % art_type] = u"series1"
+        full["Parent%sImageTag" % art_type] = u"p%s1" % art_type
+
+    items = [full, {"Id": "id2", "Type": item_type}, {"Id": u"id3", "Type": item_type, "ImageTags": {}}]
+    items.append(dict(full, ImageTags={"Primary": u"", "Logo": None}, BackdropImageTags=[]))
+    items.append(dict(full, ImageTags=None, BackdropImageTags=None))
+    items.append(dict(full, ParentBackdropImageTags=[], ParentBackdropItemId=None))
+    items.append(dict((key, value) for key, value in full.items() if not key.startswith("Parent")))
+    items.append(dict((key, value) for key, value in full.items() if not key.startswith("Series")))
+    items.append(dict(full, SeriesPrimaryImageTag=u"", ParentLogoImageTag=None, ParentThumbItemId=None,
+                      ParentArtImageTag=u""))
+    items.append(dict(full, Id="str_id", SeriesId="str_series", ImageTags={"Primary": "str_tag"}))
+    return items
+
+
+def typed(art):
+    return sorted((key, type(value), value) for key, value in art.items())
+
+
+class ArtworkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.download_utils = utils.downloadUtils
+        self.connection = (self.download_utils.use_https, self.download_utils.verify_cert)
+
+    def tearDown(self):
+        self.download_utils.use_https, self.download_utils.verify_cert = self.connection
+
+    def test_get_art(self):
+        for server in servers:
+            for use_https, verify_cert in connections:
+                self.download_utils.use_https = use_https
+                self.download_utils.verify_cert = verify_cert
+                art_urls = {}
+                for item_type in item_types:
+                    for item in make_items(item_type):
+                        expected = typed(old_get_art(item, server, use_https, verify_cert))
+                        case = (server, use_https, verify_cert, item)
+                        self.assertEqual(typed(getArt(item, server)), expected, case)
+                        # the urls shared between the items of one list
+                        self.assertEqual(typed(getArt(item, server, art_urls)), expected, case)
+
+    def test_get_artwork(self):
+        download_utils = DownloadUtils()
+        for server in servers:
+            for use_https, verify_cert in connections:
+                download_utils.use_https = use_https
+                download_utils.verify_cert = verify_cert
+                for item_type in item_types:
+                    for item in make_items(item_type):
+                        for art_type in art_types + ["Backdrop"]:
+                            for parent in (False, True):
+                                for index in (0, 1):
+                                    expected = old_get_artwork(item, art_type, parent, index, server, use_https,
+                                                               verify_cert)
+                                    artwork = download_utils.getArtwork(item, art_type, parent, index, server)
+                                    self.assertEqual((type(artwork), artwork), (type(expected), expected))
+
+    def test_artwork_template(self):
+        download_utils = DownloadUtils()
+        url_args = (u"id1", "Primary", 0, "tag1")
+        for server in servers:
+            for use_https, verify_cert in connections:
+                download_utils.use_https = use_https
+                download_utils.verify_cert = verify_cert
+                expected = old_get_artwork({"Id": u"id1", "ImageTags": {"Primary": "tag1"}}, "Primary",
+                                           server=server, use_https=use_https, verify_cert=verify_cert)
+                artwork = download_utils.get_artwork_template(server) % url_args
+                self.assertEqual((type(artwork), artwork), (type(expected), expected))
+        # a str server after the equal unicode one still gets a str template
+        self.assertEqual(type(download_utils.get_artwork_template("http://emby.local:8096")), str)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import sys
+import time
+import random
+import threading
+import unittest
+
+from tests import kodi_stubs
+
+from resources.lib.list_cache_server import ListCacheServerThread, memory_list_cache, list_cache_request
+from resources.lib.datamanager import CacheItem, CacheManagerThread
+from resources.lib.item_functions import ItemDetails
+from resources.lib.cache_store import get_cache_store
+
+list_keys = (1, 2, 3)
+writer_count = 4
+reader_count = 4
+
+
+def make_cache_item(list_key, version, item_count=500):
+    """
+        a list with every item named after the version, so a load that mixes two saves shows up,
+        the lists do not share items
+    """
+    cache_item = CacheItem()
+    cache_item.url_hash = "stress%d" % list_key
+    cache_item.user_id = "uid1"
+    cache_item.server = "http://127.0.0.1:8096"
+    cache_item.items_url = "{server}/emby/Users/{userid}/Items?ParentId=%d&format=json" % list_key
+    cache_item.item_list = []
+    for index in range(item_count):
+        item = ItemDetails()
+        item.id = "id%d_%d" % (list_key, index)
+        item.name = "v%r" % version
+        cache_item.item_list.append(item)
+    cache_item.item_ids = [item.id for item in cache_item.item_list]
+    cache_item.item_hashes = [CacheManagerThread.get_item_hash(item) for item in cache_item.item_list]
+    cache_item.date_saved = cache_item.date_last_used = time.time()
+    cache_item.version = version
+    return cache_item
+
+
+def percentile(times, fraction):
+    times = sorted(times)
+    return times[max(0, int(len(times) * fraction) - 1)] * 1000
+
+
+class CacheStoreStressTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server_thread = ListCacheServerThread()
+        cls.server_thread.daemon = True
+        cls.server_thread.start()
+        time.sleep(0.3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server_thread.stop()
+        cls.server_thread.join()
+
+    def setUp(self):
+        get_cache_store().clear_all()
+
+    def test_older_save_ignored(self):
+        cache_store = get_cache_store()
+        cache_store.save(make_cache_item(0, 200.0))
+        cache_store.save(make_cache_item(0, 100.0))
+        cache_item = cache_store.load("stress0")
+        self.assertEqual(cache_item.version, 200.0)
+        self.assertEqual(cache_item.item_list[0].name, "v200.0")
+
+    def test_concurrent_save_and_load(self):
+        cache_store = get_cache_store()
+        newest = {}
+        save_times = []
+        load_times = []
+        errors = []
+        lock = threading.Lock()
+
+        def writer(seed):
+            rand = random.Random(seed)
+            for index in range(15):
+                list_key = rand.choice(list_keys)
+                version = rand.random() * 1000
+                cache_item = make_cache_item(list_key, version)
+                started = time.time()
+                cache_store.save(cache_item)
+                save_times.append(time.time() - started)
+                with lock:
+                    newest[list_key] = max(newest.get(list_key, 0), version)
+
+        def reader(seed):
+            rand = random.Random(seed)
+            for index in range(60):
+                list_key = rand.choice(list_keys)
+                started = time.time()
+                try:
+                    cache_item = cache_store.load("stress%d" % list_key)
+                    if cache_item is not None:
+                        names = set(item.name for item in cache_item.item_list)
+                        if names != set(["v%r" % cache_item.version]) or len(cache_item.item_list) != 500:
+                            errors.append("list %d mixes saves %s" % (list_key, sorted(names)[:3]))
+                except Exception as error:
+                    errors.append(repr(error))
+                load_times.append(time.time() - started)
+
+        threads = ([threading.Thread(target=writer, args=(seed,)) for seed in range(writer_count)] +
+                   [threading.Thread(target=reader, args=(100 + seed,)) for seed in range(reader_count)])
+        started = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - started
+
+        self.assertEqual(errors, [])
+        for list_key, version in newest.items():
+            url_hash = "stress%d" % list_key
+            stored = cache_store.get_db().execute("SELECT version FROM list_cache WHERE url_hash = ?",
+                                                  (url_hash,)).fetchone()[0]
+            self.assertEqual(stored, version)
+            self.assertEqual(memory_list_cache.versions.get(url_hash), version)
+            self.assertEqual(cache_store.load(url_hash).version, version)
+            self.assertTrue(list_cache_request("GET", url_hash) is not None)
+
+        sys.stderr.write("\n%d saves p50 %.1fms p95 %.1fms, %d loads p50 %.1fms p95 %.1fms, %.2fs ... " % (
+            len(save_times), percentile(save_times, 0.5), percentile(save_times, 0.95),
+            len(load_times), percentile(load_times, 0.5), percentile(load_times, 0.95), elapsed))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import threading
+import unittest
+
+from tests import kodi_stubs
+from tests import emby_server
+
+from resources.lib.kodi_utils import HomeWindow
+from resources.lib.settings_snapshot import invalidate_settings
+from resources.lib.downloadutils import DownloadUtils
+from resources.lib.datamanager import DataManager, CacheManagerThread, get_url_hash, check_cached_content
+from resources.lib.cache_store import get_cache_store
+
+port = 18097
+items_url = "{server}/emby/Users/{userid}/Items?Recursive=true&format=json"
+content_url = "{server}/emby/Genres?UserId={userid}&Recursive=true&format=json"
+gui_options = {"server": "http://127.0.0.1:%d" % port, "name_format": None, "name_format_type": None}
+
+
+class CutOffResponseTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        kodi_stubs.settings["port"] = str(port)
+        invalidate_settings()
+        cls.server = emby_server.start(port)
+        home_window = HomeWindow()
+        home_window.setProperty("userid", "uid1")
+        home_window.setProperty("AccessToken", "token")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        emby_server.state["items"] = 200
+        emby_server.state["truncate"] = None
+        emby_server.state["etag"] = None
+        get_cache_store().clear_all()
+
+    def test_item_list(self):
+        emby_server.state["truncate"] = 5000
+        validators = {}
+        item_list, total_records = DataManager().load_item_list(items_url, gui_options, validators)
+        self.assertEqual((item_list, total_records), ([], 0))
+        self.assertTrue(validators["failed"])
+
+        emby_server.state["truncate"] = None
+        item_list, total_records = DataManager().load_item_list(items_url, gui_options, validators)
+        self.assertEqual((len(item_list), total_records), (200, 200))
+        self.assertFalse(validators["failed"])
+
+    def test_get_items(self):
+        emby_server.state["truncate"] = 5000
+        item_list, total_records = DataManager().get_items(items_url, gui_options, use_cache=True)
+        self.assertEqual((item_list, total_records), ([], 0))
+
+    def test_reload_keeps_cached_list(self):
+        emby_server.state["etag"] = '"one"'
+        DataManager().get_items(items_url, gui_options, use_cache=True)
+        wait_for_threads()
+        cache_store = get_cache_store()
+        cached_item = cache_store.load(get_items_url_hash())
+        self.assertEqual(len(cached_item.item_list), 200)
+
+        emby_server.state["etag"] = '"two"'
+        emby_server.state["truncate"] = 5000
+        cache_thread = CacheManagerThread()
+        cache_thread.gui_options = gui_options
+        cache_thread.cached_item = cached_item
+        cache_thread.send_refresh = False
+        cache_thread.run()
+
+        cached_item = cache_store.load(get_items_url_hash())
+        self.assertEqual(len(cached_item.item_list), 200)
+        self.assertEqual(cached_item.validators.get("etag"), '"one"')
+
+    def test_content_keeps_cached_copy(self):
+        emby_server.state["etag"] = '"one"'
+        url_hash = get_url_hash_for(content_url)
+        user_id = DownloadUtils().getUserId()
+        server = DownloadUtils().getServer()
+        cache_store = get_cache_store()
+        self.assertEqual(len(DataManager().GetContent(content_url, use_cache=True)["Items"]), 200)
+        json_data, date_checked, validators = cache_store.load_content(url_hash)
+
+        emby_server.state["etag"] = '"two"'
+        emby_server.state["truncate"] = 5000
+        self.assertEqual(check_cached_content(content_url, url_hash, user_id, server, validators), None)
+        self.assertTrue(cache_store.load_content(url_hash)[0] == json_data)
+        self.assertEqual(cache_store.load_content(url_hash)[2].get("etag"), '"one"')
+
+    def test_content_not_cached(self):
+        emby_server.state["truncate"] = 5000
+        self.assertEqual(DataManager().GetContent(content_url, use_cache=True), None)
+        self.assertEqual(get_cache_store().load_content(get_url_hash_for(content_url)), None)
+
+
+def get_url_hash_for(url):
+    download_utils = DownloadUtils()
+    return get_url_hash(download_utils.getUserId(), download_utils.getServer(), download_utils.get_url_key(url))
+
+
+def get_items_url_hash():
+    return get_url_hash_for(items_url)
+
+
+def wait_for_threads():
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread() and not thread.daemon:
+            thread.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
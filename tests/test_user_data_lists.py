@@ -0,0 +1,77 @@
+# Gnu General Public License - see LICENSE.TXT
+
+import unittest
+
+from tests import kodi_stubs
+from tests import emby_server
+from tests.test_cut_off_responses import get_url_hash_for, wait_for_threads
+
+from resources.lib.kodi_utils import HomeWindow
+from resources.lib.settings_snapshot import invalidate_settings
+from resources.lib.datamanager import DataManager, update_cached_user_data
+from resources.lib.cache_store import ListCacheStore, get_cache_store
+
+port = 18098
+items_url = "{server}/emby/Users/{userid}/Items?Recursive=true&format=json"
+unplayed_url = "{server}/emby/Users/{userid}/Items?Recursive=true&Filters=IsUnplayed&format=json"
+gui_options = {"server": "http://127.0.0.1:%d" % port, "name_format": None, "name_format_type": None}
+
+
+class UserDataListsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        kodi_stubs.settings["port"] = str(port)
+        invalidate_settings()
+        cls.server = emby_server.start(port)
+        home_window = HomeWindow()
+        home_window.setProperty("userid", "uid1")
+        home_window.setProperty("AccessToken", "token")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        emby_server.state["items"] = 50
+        emby_server.state["truncate"] = None
+        emby_server.state["etag"] = None
+        get_cache_store().clear_all()
+
+    def load_lists(self):
+        item_lists = {}
+        for url in (items_url, unplayed_url):
+            item_lists[url] = DataManager().get_items(url, gui_options, use_cache=True)[0]
+        wait_for_threads()
+        return item_lists
+
+    def test_filtered_list_reloaded(self):
+        self.load_lists()
+        cache_store = get_cache_store()
+        self.assertNotEqual(cache_store.load(get_url_hash_for(unplayed_url)), None)
+
+        changed = update_cached_user_data("uid1", "id00001", {"Played": True, "IsFavorite": False,
+                                                              "PlaybackPositionTicks": 0})
+        self.assertEqual(changed, 1)
+        self.assertEqual(cache_store.load(get_url_hash_for(unplayed_url)), None)
+
+        cached_item = cache_store.load(get_url_hash_for(items_url))
+        self.assertEqual(len(cached_item.item_list), 50)
+        item = [item for item in cached_item.item_list if item.id == "id00001"][0]
+        self.assertEqual((item.play_count, item.overlay), (1, "6"))
+
+    def test_records_round_trip(self):
+        item_list = self.load_lists()[items_url]
+        # a new store reads the shared strings back from the database
+        cached_item = ListCacheStore().load(get_url_hash_for(items_url))
+        loaded = dict((item.id, item) for item in cached_item.item_list)
+        self.assertEqual(len(loaded), len(item_list))
+        for item in item_list:
+            for name, value in item.get_values().items():
+                loaded_value = getattr(loaded[item.id], name)
+                self.assertEqual(loaded_value, value, name)
+                self.assertEqual(type(loaded_value), type(value), name)
+
+
+if __name__ == "__main__":
+    unittest.main()